@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Load-test the LLM client stack against the simulated mock provider.
+
+Runs concurrent "chats" (embed the question, stream an answer) through
+the same wrappers the app uses (coalescing, batching, adaptive limiter)
+on top of ``MockLLMProvider`` in simulation mode, and reports time to
+first token, end-to-end latency, throughput and rejections.
+
+Usage:
+    PYTHONPATH=src python scripts/bench_llm.py
+    PYTHONPATH=src python scripts/bench_llm.py -c 200 --max-concurrency 32
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from somaai.exceptions import OverloadedError, RateLimitError
+from somaai.providers.batching import BatchingLLMClient
+from somaai.providers.coalescing import CoalescingLLMClient
+from somaai.providers.limiter import with_concurrency_limit
+from somaai.providers.llm import MockLLMProvider, MockSimulation
+from somaai.settings import Settings
+
+
+async def chat(llm, question: str) -> tuple[float, float]:
+    """Return (time to first token, total time) for one chat turn."""
+    start = time.monotonic()
+    await llm.embed([question])
+    first = None
+    async for _ in llm.generate_stream(question):
+        if first is None:
+            first = time.monotonic() - start
+    total = time.monotonic() - start
+    return first if first is not None else total, total
+
+
+def percentiles(values: list[float]) -> str:
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+    return f"p50 {p50:7.1f} ms  p95 {p95:7.1f} ms  p99 {p99:7.1f} ms"
+
+
+async def run(args: argparse.Namespace) -> None:
+    mock = MockLLMProvider(
+        MockSimulation(
+            ttft_ms=args.ttft_ms,
+            token_ms=args.token_ms,
+            answer_tokens=args.answer_tokens,
+            rate_limit_probability=args.rate_limit,
+            max_concurrency=args.max_concurrency,
+            seed=args.seed,
+        )
+    )
+    limited = with_concurrency_limit(mock, Settings())
+    llm = CoalescingLLMClient(BatchingLLMClient(limited))
+    questions = [f"question {i % args.distinct}" for i in range(args.requests)]
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(question: str):
+        async with semaphore:
+            return await chat(llm, question)
+
+    start = time.monotonic()
+    results = await asyncio.gather(*(one(q) for q in questions), return_exceptions=True)
+    elapsed = time.monotonic() - start
+
+    ok = [r for r in results if not isinstance(r, BaseException)]
+    rejected = sum(isinstance(r, OverloadedError) for r in results)
+    rate_limited = sum(isinstance(r, RateLimitError) for r in results)
+    print(f"requests {args.requests}  concurrency {args.concurrency}")
+    print(f"ok {len(ok)}  overloaded {rejected}  rate limited {rate_limited}")
+    if ok:
+        print(f"ttft   {percentiles([r[0] for r in ok])}")
+        print(f"total  {percentiles([r[1] for r in ok])}")
+    print(f"generation limiter {limited.generation.stats()}")
+    print(f"throughput {len(ok) / elapsed:.1f} chats/s  coalesced {llm.coalesced}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--requests", type=int, default=500)
+    parser.add_argument("-c", "--concurrency", type=int, default=100)
+    parser.add_argument("--distinct", type=int, default=200, help="unique prompts")
+    parser.add_argument("--ttft-ms", type=float, default=400.0)
+    parser.add_argument("--token-ms", type=float, default=25.0)
+    parser.add_argument("--answer-tokens", type=int, default=60)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="429 rate")
+    parser.add_argument("--max-concurrency", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Benchmark recall@k versus memory for vector quantization modes.
+
+Compares float32, int8 and PQ storage on the same data. Each mode is
+scored by a full scan over its codes (isolating quantization loss from
+graph approximation), with and without exact float re-scoring of the
+top candidates. Pass --hnsw to also build an HNSW index per mode.
+
+Usage:
+    PYTHONPATH=src python scripts/bench_quantization.py
+    PYTHONPATH=src python scripts/bench_quantization.py --data vectors.npy
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from somaai.modules.knowledge.hnsw import HNSWIndex
+from somaai.modules.knowledge.quantization import ProductQuantizer, ScalarQuantizer
+
+
+def synthetic_embeddings(n: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Clustered unit vectors, closer to real embeddings than pure noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    assignment = rng.integers(0, clusters, size=n)
+    noise = 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    vectors = centers[assignment] + noise
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def scan(quantizer, codes, vectors, queries, k, rescore_k):
+    """Top-k per query by code scan, optionally re-scored with floats."""
+    results = []
+    for q in queries:
+        sims = quantizer.similarities(quantizer.prepare(q), codes)
+        if rescore_k:
+            cand = np.argpartition(-sims, rescore_k)[:rescore_k]
+            exact = vectors[cand] @ q
+            results.append(cand[np.argsort(-exact)[:k]])
+        else:
+            results.append(np.argsort(-sims)[:k])
+    return np.array(results)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", help=".npy file of embeddings (n, dim)")
+    parser.add_argument("-n", type=int, default=20000, help="synthetic vectors")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--rescore", type=int, default=50, help="candidates re-scored")
+    parser.add_argument("--pq-subvectors", type=int, default=96)
+    parser.add_argument("--hnsw", action="store_true", help="also benchmark HNSW")
+    args = parser.parse_args()
+
+    if args.data:
+        vectors = np.load(args.data).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    else:
+        vectors = synthetic_embeddings(args.n, args.dim, clusters=64, seed=0)
+    n, dim = vectors.shape
+
+    rng = np.random.default_rng(1)
+    picks = rng.choice(n, size=args.queries, replace=False)
+    queries = vectors[picks] + 0.05 * rng.standard_normal((args.queries, dim))
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(
+        np.float32
+    )
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, : args.k]
+
+    quantizers = {
+        "int8": ScalarQuantizer(dim).fit(vectors),
+        "pq": ProductQuantizer(dim, n_subvectors=args.pq_subvectors).fit(
+            vectors[rng.choice(n, size=min(n, 10000), replace=False)]
+        ),
+    }
+
+    float_bytes = vectors.nbytes
+    print(f"{n} vectors x {dim} dims, k={args.k}, rescore={args.rescore}")
+    print(f"{'mode':<16}{'bytes/vec':>10}{'total MB':>10}{'ratio':>8}{'recall':>8}")
+    print(f"{'float32':<16}{dim * 4:>10}{float_bytes / 1e6:>10.1f}{1:>8.1f}{1:>8.3f}")
+
+    for name, quantizer in quantizers.items():
+        codes = quantizer.encode(vectors)
+        ratio = float_bytes / codes.nbytes
+        for rescore_k in (0, args.rescore):
+            label = f"{name}+rescore" if rescore_k else name
+            start = time.perf_counter()
+            found = scan(quantizer, codes, vectors, queries, args.k, rescore_k)
+            ms = (time.perf_counter() - start) / len(queries) * 1000
+            print(
+                f"{label:<16}{quantizer.code_size:>10}{codes.nbytes / 1e6:>10.1f}"
+                f"{ratio:>8.1f}{recall(found, truth):>8.3f}   ({ms:.2f} ms/query)"
+            )
+
+    if args.hnsw:
+        print("\nHNSW (graph + storage)")
+        for name, quantizer in [("float32", None), *quantizers.items()]:
+            index = HNSWIndex(dim, seed=0, quantizer=quantizer, rescore=True)
+            for vec in vectors:
+                index.add(vec)
+            found = np.array([index.search(q, args.k)[0] for q in queries])
+            usage = index.memory_usage()
+            print(
+                f"{name:<16}codes={usage['codes'] / 1e6:.1f}MB"
+                f" floats={usage['vectors'] / 1e6:.1f}MB"
+                f" graph={usage['graph'] / 1e6:.1f}MB"
+                f" recall={recall(found, truth):.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
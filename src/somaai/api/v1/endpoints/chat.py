@@ -1,13 +1,21 @@
 """Chat endpoints for student and teacher interactions."""
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette.background import BackgroundTask
 
+from somaai.cache.semantic import SemanticCache
 from somaai.contracts.chat import (
     ChatRequest,
     ChatResponse,
     CitationResponse,
     MessageResponse,
 )
+from somaai.db.session import get_session_factory
+from somaai.deps import get_actor_id, get_rag_pipeline, get_semantic_cache
+from somaai.modules.chat.service import AnswerStream, ChatService
+from somaai.modules.rag.pipelines import RAGPipeline
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
@@ -44,6 +52,38 @@ async def ask_question(data: ChatRequest):
     pass
 
 
+@router.post("/ask/stream")
+async def ask_question_stream(
+    data: ChatRequest,
+    pipeline: RAGPipeline = Depends(get_rag_pipeline),
+    session_factory: async_sessionmaker[AsyncSession] = Depends(get_session_factory),
+    actor_id: str = Depends(get_actor_id),
+    cache: SemanticCache | None = Depends(get_semantic_cache),
+) -> StreamingResponse:
+    """Ask a question and stream the answer as Server-Sent Events.
+
+    Same request body as /chat/ask. Events:
+    - citations: message_id, sufficiency and citations, sent as soon as
+      retrieval finishes
+    - token: {"text": ...} for each generated fragment
+    - done: {"message_id": ...} once the answer is complete
+    - error: {"detail": ...} if generation fails
+
+    The message and its citations are saved once the stream closes, so
+    generation never waits on the database. A paraphrase of a recently
+    answered question (same grade, subject, role and preferences) is
+    answered from the semantic cache as a single token event.
+    """
+    service = ChatService(pipeline, session_factory, cache)
+    state = AnswerStream(request=data, actor_id=actor_id)
+    return StreamingResponse(
+        service.stream_answer(state),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(service.save_answer, state),
+    )
+
+
 @router.get("/messages/{message_id}", response_model=MessageResponse)
 async def get_message(message_id: str):
     """Get a specific message by ID.
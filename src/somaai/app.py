@@ -1,28 +1,164 @@
 """FastAPI application factory."""
 
+import asyncio
+import contextlib
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 
 from somaai.api.router import api_router
+from somaai.cache.connection import REDIS_AVAILABLE, close_redis, init_redis
+from somaai.cache.decorators import close_tiered_caches
+from somaai.cache.semantic import SemanticCache, init_semantic_cache
 from somaai.db.session import close_db
+from somaai.exceptions import DeadlineExceededError, OverloadedError
 from somaai.health import health_router
+from somaai.logging_conf import get_logger
 from somaai.middleware import setup_middleware
-from somaai.providers.llm import get_llm
+from somaai.modules.knowledge.embeddings import (
+    LocalEmbeddingLLMClient,
+    get_embedding_model,
+)
+from somaai.modules.knowledge.lexical import BM25Index, get_lexical_index
+from somaai.modules.knowledge.vectorstore import VectorStore, get_vector_store
+from somaai.modules.rag.reranker import get_reranker
+from somaai.modules.telemetry.metrics import metrics
+from somaai.providers.batching import BatchingLLMClient
+from somaai.providers.coalescing import CoalescingLLMClient
+from somaai.providers.hedging import HedgedLLMClient
+from somaai.providers.http import create_http_client
+from somaai.providers.instrumented import InstrumentedLLMClient
+from somaai.providers.limiter import with_concurrency_limit
+from somaai.providers.llm import LLMClient, get_llm
 from somaai.settings import settings
 
+logger = get_logger(__name__)
+
+
+async def _refresh_indexes(
+    store: VectorStore | None,
+    lexical: BM25Index | None,
+    interval: float,
+    semantic_cache: SemanticCache | None = None,
+) -> None:
+    """Periodically swap in newly published index segments.
+
+    Cached answers were built from the old segments, so a swap also
+    clears the semantic cache.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        for index, kind in ((store, "vector"), (lexical, "lexical")):
+            if index is None:
+                continue
+            try:
+                if not await asyncio.to_thread(index.refresh):
+                    continue
+            except Exception:
+                logger.exception("Failed to refresh %s index", kind)
+                continue
+            logger.info("Loaded newly published %s index", kind)
+            if semantic_cache is not None:
+                semantic_cache.invalidate()
+
+
+def _wrap_provider(provider: LLMClient) -> LLMClient:
+    """Per-backend wrappers: limiter -> telemetry -> provider."""
+    name = getattr(provider, "name", type(provider).__name__).lower()
+    if settings.llm_telemetry:
+        provider = InstrumentedLLMClient(provider, backend=name)
+    limited = with_concurrency_limit(provider, settings)
+    metrics.register_gauge(f"llm_limiter.{name}.generation", limited.generation.stats)
+    metrics.register_gauge(f"llm_limiter.{name}.embedding", limited.embedding.stats)
+    return limited
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan."""
     ## We create the LLM instance here to ensure it's ready when needed.
-    app.state.llm = get_llm(settings)
+    app.state.http_client = create_http_client(settings)
+    # Wrappers, outermost first:
+    # coalescing -> batching -> hedging -> limiter -> telemetry -> provider
+    # (with EMBEDDING_BACKEND=local, embed skips the provider stack)
+    llm = get_llm(settings, app.state.http_client, wrap=_wrap_provider)
+    if isinstance(llm, HedgedLLMClient):
+        metrics.register_gauge("llm_hedging", llm.stats)
+    app.state.embedding_model = get_embedding_model(settings)
+    if app.state.embedding_model is not None:
+        llm = LocalEmbeddingLLMClient(llm, app.state.embedding_model)
+    if settings.embed_batching:
+        llm = BatchingLLMClient(
+            llm,
+            max_batch_size=settings.embed_batch_max_size,
+            max_wait=settings.embed_batch_max_wait_ms / 1000,
+        )
+    if settings.llm_coalescing:
+        llm = coalescing = CoalescingLLMClient(llm)
+        metrics.register_gauge(
+            "llm_coalescing", lambda: {"coalesced": coalescing.coalesced}
+        )
+    app.state.llm = llm
+    app.state.vector_store = get_vector_store(settings)
+    app.state.lexical_index = get_lexical_index(settings)
+    app.state.reranker = get_reranker(settings)
+    # Connects lazily, so startup does not wait on (or require) Redis.
+    app.state.redis = init_redis() if REDIS_AVAILABLE else None
+    app.state.semantic_cache = init_semantic_cache()
+    if app.state.semantic_cache is not None:
+        metrics.register_gauge("semantic_cache", app.state.semantic_cache.stats)
+
+    refresher = None
+    if settings.vector_index_path or settings.lexical_index_path:
+        refresher = asyncio.create_task(
+            _refresh_indexes(
+                app.state.vector_store if settings.vector_index_path else None,
+                app.state.lexical_index,
+                settings.vector_index_refresh_seconds,
+                app.state.semantic_cache,
+            )
+        )
 
     try:
         yield
     finally:
+        if refresher is not None:
+            refresher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await refresher
         await close_db()
+        await close_tiered_caches()
+        await close_redis()
+        app.state.redis = None
+        if app.state.embedding_model is not None:
+            app.state.embedding_model.close()
+        if app.state.reranker is not None:
+            app.state.reranker.close()
+        await app.state.http_client.aclose()
+        app.state.http_client = None
         app.state.llm = None
+        app.state.vector_store = None
+        app.state.lexical_index = None
+        app.state.reranker = None
+        app.state.semantic_cache = None
+
+
+async def _overloaded_handler(request: Request, exc: Exception) -> JSONResponse:
+    """Shed load with 503 + Retry-After instead of queueing forever."""
+    retry_after = max(1, round(getattr(exc, "retry_after", None) or 1))
+    return JSONResponse(
+        {"detail": str(exc)},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+async def _deadline_handler(request: Request, exc: Exception) -> JSONResponse:
+    """Report an LLM call that ran past the request deadline."""
+    return JSONResponse(
+        {"detail": str(exc)}, status_code=status.HTTP_504_GATEWAY_TIMEOUT
+    )
 
 
 def create_app() -> FastAPI:
@@ -35,6 +171,8 @@ def create_app() -> FastAPI:
     )
 
     setup_middleware(app)
+    app.add_exception_handler(OverloadedError, _overloaded_handler)
+    app.add_exception_handler(DeadlineExceededError, _deadline_handler)
     app.include_router(health_router)
     app.include_router(api_router, prefix="/api")
 
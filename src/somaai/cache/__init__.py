@@ -1,23 +1,44 @@
 """SomaAI caching module.
 
 Uses:
-- aiocache: General-purpose async caching with Redis backend
-- gptcache: Semantic caching for LLM responses
+- One shared Redis connection pool for caches and sessions
+- Two-tier caching decorators: in-process L1 over Redis L2 with
+  pub/sub invalidation
+- In-process semantic answer cache
 """
 
 from somaai.cache.config import CacheConfig, get_cache_config
-from somaai.cache.decorators import cached_embedding, cached_query, cached_retrieval
+from somaai.cache.connection import close_redis, get_redis, init_redis
+from somaai.cache.decorators import (
+    cached_embedding,
+    cached_query,
+    cached_retrieval,
+    close_tiered_caches,
+)
 from somaai.cache.semantic import SemanticCache, init_semantic_cache
+from somaai.cache.serializers import JsonSerializer, VectorSerializer
 from somaai.cache.session import SessionManager
+from somaai.cache.tiered import LocalCache, TieredCache
 
 __all__ = [
     # Config
     "CacheConfig",
     "get_cache_config",
+    # Connection
+    "init_redis",
+    "get_redis",
+    "close_redis",
     # Decorators
     "cached_query",
     "cached_embedding",
     "cached_retrieval",
+    "close_tiered_caches",
+    # Tiers
+    "LocalCache",
+    "TieredCache",
+    # Serializers
+    "JsonSerializer",
+    "VectorSerializer",
     # Semantic
     "SemanticCache",
     "init_semantic_cache",
@@ -16,19 +16,34 @@ class CacheConfig:
         default_factory=lambda: os.getenv("REDIS_PASSWORD")
     )
 
+    # Shared connection pool
+    redis_max_connections: int = 50
+    redis_socket_timeout: float = 5.0
+    redis_connect_timeout: float = 2.0
+    redis_health_check_interval: int = 30
+
     # TTL defaults (in seconds)
     query_ttl: int = 86400  # 24 hours
     embedding_ttl: int = 604800  # 7 days
     retrieval_ttl: int = 3600  # 1 hour
     session_ttl: int = 3600  # 1 hour
 
+    # Redis encoding of cached embeddings: float32 | float16 | int8
+    embedding_encoding: str = "float32"
+
+    # In-process L1 in front of Redis for the caching decorators
+    l1_max_entries: int = 10000
+    l1_ttl: int = 300
+
     # Semantic cache settings
     semantic_enabled: bool = True
     similarity_threshold: float = 0.92
-    embedding_dimension: int = 768
+    semantic_max_entries: int = 10000
 
     # Cache namespace
     namespace: str = "somaai"
+    # Part of every decorator cache key; bump to invalidate them all
+    key_version: str = "1"
 
     @classmethod
     def from_env(cls) -> "CacheConfig":
@@ -36,15 +51,25 @@ class CacheConfig:
         return cls(
             redis_url=os.getenv("REDIS_URL", "redis://localhost:6379/0"),
             redis_password=os.getenv("REDIS_PASSWORD"),
+            redis_max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", "50")),
+            redis_socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT", "5")),
+            redis_connect_timeout=float(os.getenv("REDIS_CONNECT_TIMEOUT", "2")),
+            redis_health_check_interval=int(
+                os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30")
+            ),
             query_ttl=int(os.getenv("CACHE_QUERY_TTL", "86400")),
             embedding_ttl=int(os.getenv("CACHE_EMBEDDING_TTL", "604800")),
             retrieval_ttl=int(os.getenv("CACHE_RETRIEVAL_TTL", "3600")),
             session_ttl=int(os.getenv("CACHE_SESSION_TTL", "3600")),
+            embedding_encoding=os.getenv("CACHE_EMBEDDING_ENCODING", "float32"),
+            l1_max_entries=int(os.getenv("CACHE_L1_MAX_ENTRIES", "10000")),
+            l1_ttl=int(os.getenv("CACHE_L1_TTL", "300")),
             semantic_enabled=os.getenv("CACHE_SEMANTIC_ENABLED", "true").lower()
             == "true",
             similarity_threshold=float(os.getenv("CACHE_SIMILARITY_THRESHOLD", "0.92")),
-            embedding_dimension=int(os.getenv("CACHE_EMBEDDING_DIM", "768")),
+            semantic_max_entries=int(os.getenv("CACHE_SEMANTIC_MAX_ENTRIES", "10000")),
             namespace=os.getenv("CACHE_NAMESPACE", "somaai"),
+            key_version=os.getenv("CACHE_KEY_VERSION", "1"),
         )
 
 
@@ -0,0 +1,78 @@
+"""Shared Redis connection pool.
+
+One pool per process, created in the app lifespan (or lazily by the
+first user outside the app, e.g. a worker script) and shared by the
+caching decorators and ``SessionManager``. Connection settings come
+entirely from ``REDIS_URL`` (host, port, database, credentials) plus
+``REDIS_PASSWORD``; pool size, socket timeouts and the idle-connection
+health check are tunable via ``REDIS_*`` variables.
+"""
+
+try:
+    import redis.asyncio as redis
+
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+from somaai.cache.config import CacheConfig, get_cache_config
+from somaai.logging_conf import get_logger
+
+logger = get_logger(__name__)
+
+_client = None
+
+
+def create_redis_client(config: CacheConfig | None = None):
+    """Build a ``redis.asyncio.Redis`` over a new bounded connection pool.
+
+    No connection is opened until the first command.
+
+    Raises:
+        ImportError: If redis is not installed
+    """
+    if not REDIS_AVAILABLE:
+        raise ImportError("redis is required for caching. Install with: uv add redis")
+    config = config or get_cache_config()
+    options = {}
+    if config.redis_password:
+        options["password"] = config.redis_password
+    pool = redis.ConnectionPool.from_url(
+        config.redis_url,
+        max_connections=config.redis_max_connections,
+        socket_timeout=config.redis_socket_timeout,
+        socket_connect_timeout=config.redis_connect_timeout,
+        socket_keepalive=True,
+        health_check_interval=config.redis_health_check_interval,
+        retry_on_timeout=True,
+        **options,
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+def init_redis(config: CacheConfig | None = None):
+    """Create the process-wide client if it does not exist yet."""
+    global _client
+    if _client is None:
+        _client = create_redis_client(config)
+        pool = _client.connection_pool
+        logger.info(
+            "Redis pool for %s (max %d connections)",
+            pool.connection_kwargs.get("host", "?"),
+            pool.max_connections,
+        )
+    return _client
+
+
+def get_redis():
+    """The shared client, created on first use if the lifespan did not."""
+    return _client if _client is not None else init_redis()
+
+
+async def close_redis() -> None:
+    """Close the shared client and disconnect its pool."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        await _client.connection_pool.disconnect()
+        _client = None
@@ -1,54 +1,174 @@
-"""Caching decorators using aiocache.
+"""Caching decorators with a two-tier (in-process L1 + Redis L2) cache.
 
-aiocache provides:
-- Multi-backend support (Redis, Memcached, in-memory)
-- Async-first design
-- Key builders and serializers
-- Decorator-based caching
+A hit in L1 costs a dict lookup; a miss there falls back to Redis and
+fills L1. Writes invalidate other workers' L1 copies over Redis pub/sub
+(see ``cache.tiered``). Redis errors degrade to calling the function.
+Embeddings are stored in Redis as packed binary vectors, encoded per
+``CACHE_EMBEDDING_ENCODING`` (see ``cache.serializers``).
 
-Install: uv add aiocache[redis]
+Install: uv add redis
 """
 
+import dataclasses
+import hashlib
+import inspect
+import json
 from collections.abc import Callable
-from functools import wraps
+from functools import lru_cache, wraps
+from typing import Any
 
-try:
-    from aiocache import Cache, cached
-    from aiocache.serializers import JsonSerializer
-
-    AIOCACHE_AVAILABLE = True
-except ImportError:
-    AIOCACHE_AVAILABLE = False
-    cached = None
+from pydantic import BaseModel
 
 from somaai.cache.config import get_cache_config
+from somaai.cache.connection import REDIS_AVAILABLE, get_redis
+from somaai.cache.serializers import VectorSerializer
+from somaai.cache.tiered import MISSING, LocalCache, TieredCache
+from somaai.logging_conf import get_logger
+from somaai.modules.telemetry.metrics import metrics
+
+logger = get_logger(__name__)
+
+_caches: dict[str, TieredCache] = {}
 
 
-def _ensure_aiocache():
-    """Raise ImportError if aiocache is not installed."""
-    if not AIOCACHE_AVAILABLE:
+def _ensure_redis():
+    """Raise ImportError if redis is not installed."""
+    if not REDIS_AVAILABLE:
         raise ImportError(
-            "aiocache is required for caching decorators. "
-            "Install with: uv add aiocache[redis]"
+            "redis is required for caching decorators. Install with: uv add redis"
         )
 
 
-def _build_key(func_name: str, *args, **kwargs) -> str:
-    """Build a cache key from function name and arguments."""
+@lru_cache(maxsize=1024)
+def _signature(func: Callable) -> tuple[inspect.Signature | None, str | None]:
+    """Signature for argument binding, and the self/cls parameter if any."""
+    try:
+        signature = inspect.signature(func)
+    except (TypeError, ValueError):
+        return None, None
+    first = next(iter(signature.parameters), None)
+    return signature, first if first in ("self", "cls") else None
+
+
+def _canonical(value: Any) -> Any:
+    """JSON-ready form of an argument, equal for equal content.
+
+    Mappings become sorted key/value pairs (so int, str and tuple keys
+    all work) and non-JSON types are tagged, so no two different
+    arguments encode alike.
+
+    Raises:
+        TypeError: For objects without a content-based repr, whose only
+            identity is their address (they could never hit the cache)
+    """
+    if value is None or isinstance(value, str | int | float):
+        return value
+    if isinstance(value, list | tuple):
+        return [_canonical(item) for item in value]
+    if isinstance(value, dict):
+        pairs = [(_dumps(_canonical(k)), _canonical(v)) for k, v in value.items()]
+        return {"map": sorted(pairs, key=lambda pair: pair[0])}
+    if isinstance(value, BaseModel):
+        return _canonical(value.model_dump(mode="json"))
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return _canonical(dataclasses.asdict(value))
+    if isinstance(value, set | frozenset):
+        return {"set": sorted(_dumps(_canonical(item)) for item in value)}
+    if isinstance(value, bytes):
+        return {"bytes": value.hex()}
+    if hasattr(value, "tolist"):  # numpy arrays and scalars
+        return _canonical(value.tolist())
+    if type(value).__repr__ is object.__repr__:
+        raise TypeError(f"No stable cache key for {type(value).__qualname__}")
+    return {"object": f"{type(value).__qualname__}:{value!r}"}
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+def _build_key(func: Callable, *args, **kwargs) -> str:
+    """Build a cache key from the function and the full argument content.
+
+    Arguments are bound to the signature (so positional and keyword
+    spellings of a call share a key), the bound ``self``/``cls`` is
+    dropped, and the canonical encoding is hashed with BLAKE2b.
+    Bumping ``CACHE_KEY_VERSION`` invalidates every existing key.
+
+    Raises:
+        TypeError: If an argument has no stable encoding
+    """
     config = get_cache_config()
-    key_parts = [config.namespace, func_name]
+    signature, instance = _signature(func)
+    payload: Any = [args[1:] if instance else args, kwargs]
+    if signature is not None:
+        try:
+            bound = signature.bind(*args, **kwargs)
+        except TypeError:
+            pass
+        else:
+            bound.apply_defaults()
+            payload = dict(bound.arguments)
+            payload.pop(instance, None)
+    encoded = _dumps(_canonical(payload))
+    digest = hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
+    name = f"{func.__module__}.{func.__qualname__}"
+    return f"{config.namespace}:{name}:v{config.key_version}:{digest}"
+
+
+def _try_key(build: Callable, func: Callable, *args, **kwargs) -> str | None:
+    """Cache key, or None to call ``func`` uncached."""
+    try:
+        return build(func, *args, **kwargs)
+    except TypeError:
+        logger.debug("No cache key for %s call; not caching", func.__qualname__)
+        return None
+
+
+def get_tiered_cache(kind: str) -> TieredCache:
+    """Shared two-tier cache for one decorator kind (query/embed/retrieval)."""
+    cache = _caches.get(kind)
+    if cache is None:
+        config = get_cache_config()
+        cache = _caches[kind] = TieredCache(
+            get_redis(),
+            namespace=f"{config.namespace}:{kind}",
+            l1=LocalCache(config.l1_max_entries, config.l1_ttl),
+            serializer=(
+                VectorSerializer(config.embedding_encoding) if kind == "embed" else None
+            ),
+        )
+    return cache
 
-    # Add positional args (skip 'self' if present)
-    for arg in args:
-        if hasattr(arg, "__class__") and arg.__class__.__name__ in ("self", "cls"):
-            continue
-        key_parts.append(str(arg)[:50])  # Truncate long args
 
-    # Add keyword args
-    for k, v in sorted(kwargs.items()):
-        key_parts.append(f"{k}={str(v)[:50]}")
+async def close_tiered_caches() -> None:
+    """Stop the invalidation listeners (the shared pool is closed separately)."""
+    for cache in _caches.values():
+        await cache.aclose()
+    _caches.clear()
 
-    return ":".join(key_parts)
+
+def _tiered(kind: str, ttl: int, key_builder: Callable | None):
+    _ensure_redis()
+    build = key_builder or _build_key
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = _try_key(build, func, *args, **kwargs)
+            if key is None:
+                return await func(*args, **kwargs)
+            cache = get_tiered_cache(kind)
+            value = await cache.get(key)
+            if value is not MISSING:
+                return value
+            result = await func(*args, **kwargs)
+            await cache.set(key, result, ttl)
+            return result
+
+        return wrapper
+
+    return decorator
 
 
 def cached_query(
@@ -62,23 +182,7 @@ def cached_query(
         async def generate_response(query: str, context: list) -> str:
             ...
     """
-    _ensure_aiocache()
-    config = get_cache_config()
-
-    return cached(
-        ttl=ttl or config.query_ttl,
-        cache=Cache.REDIS,
-        endpoint=config.redis_url.split("://")[1].split(":")[0]
-        if "://" in config.redis_url
-        else "localhost",
-        port=int(config.redis_url.split(":")[-1].split("/")[0])
-        if ":" in config.redis_url
-        else 6379,
-        namespace=f"{config.namespace}:query",
-        serializer=JsonSerializer(),
-        key_builder=key_builder
-        or (lambda f, *a, **kw: _build_key(f.__name__, *a, **kw)),
-    )
+    return _tiered("query", ttl or get_cache_config().query_ttl, key_builder)
 
 
 def cached_embedding(
@@ -92,23 +196,7 @@ def cached_embedding(
         async def embed_text(text: str) -> list[float]:
             ...
     """
-    _ensure_aiocache()
-    config = get_cache_config()
-
-    return cached(
-        ttl=ttl or config.embedding_ttl,
-        cache=Cache.REDIS,
-        endpoint=config.redis_url.split("://")[1].split(":")[0]
-        if "://" in config.redis_url
-        else "localhost",
-        port=int(config.redis_url.split(":")[-1].split("/")[0])
-        if ":" in config.redis_url
-        else 6379,
-        namespace=f"{config.namespace}:embed",
-        serializer=JsonSerializer(),
-        key_builder=key_builder
-        or (lambda f, *a, **kw: _build_key(f.__name__, *a, **kw)),
-    )
+    return _tiered("embed", ttl or get_cache_config().embedding_ttl, key_builder)
 
 
 def cached_retrieval(
@@ -122,23 +210,7 @@ def cached_retrieval(
         async def retrieve_documents(query: str, top_k: int = 10) -> list[dict]:
             ...
     """
-    _ensure_aiocache()
-    config = get_cache_config()
-
-    return cached(
-        ttl=ttl or config.retrieval_ttl,
-        cache=Cache.REDIS,
-        endpoint=config.redis_url.split("://")[1].split(":")[0]
-        if "://" in config.redis_url
-        else "localhost",
-        port=int(config.redis_url.split(":")[-1].split("/")[0])
-        if ":" in config.redis_url
-        else 6379,
-        namespace=f"{config.namespace}:retrieval",
-        serializer=JsonSerializer(),
-        key_builder=key_builder
-        or (lambda f, *a, **kw: _build_key(f.__name__, *a, **kw)),
-    )
+    return _tiered("retrieval", ttl or get_cache_config().retrieval_ttl, key_builder)
 
 
 # Fallback in-memory cache for development without Redis
@@ -154,9 +226,20 @@ class SimpleCache:
         def decorator(func):
             @wraps(func)
             async def wrapper(*args, **kwargs):
-                key = _build_key(func.__name__, *args, **kwargs)
+                key = _try_key(_build_key, func, *args, **kwargs)
+                if key is None:
+                    return await func(*args, **kwargs)
                 if key in self._cache:
+                    metrics.increment(
+                        "cache_lookups",
+                        cache="fallback",
+                        name=func.__name__,
+                        result="hit",
+                    )
                     return self._cache[key]
+                metrics.increment(
+                    "cache_lookups", cache="fallback", name=func.__name__, result="miss"
+                )
                 result = await func(*args, **kwargs)
                 self._cache[key] = result
                 return result
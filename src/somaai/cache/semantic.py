@@ -0,0 +1,263 @@
+"""Semantic answer cache.
+
+Caches full answers keyed by the question's embedding plus the context
+that shapes the answer (grade, subject, role, preferences). A lookup is
+one matrix-vector product over the unit vectors of the matching context
+partition; the nearest entry at or above ``similarity_threshold`` is a
+hit, so paraphrased repeat questions skip retrieval and generation.
+
+Entries expire after their TTL and the least recently used entry is
+evicted once ``max_entries`` is reached. The cache lives in process
+memory and is used from the event loop thread only.
+"""
+
+import json
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+from pydantic import BaseModel
+
+from somaai.cache.config import CacheConfig, get_cache_config
+from somaai.logging_conf import get_logger
+from somaai.modules.telemetry.metrics import metrics
+from somaai.settings import settings
+
+logger = get_logger(__name__)
+
+# A new entry this close to a live one replaces it instead of adding a row.
+DUPLICATE_SIMILARITY = 0.99
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "partition", "row")
+
+    def __init__(self, value: Any, expires_at: float, partition: "_Partition"):
+        self.value = value
+        self.expires_at = expires_at
+        self.partition = partition
+        self.row = -1
+
+
+class _Partition:
+    """Dense matrix of unit vectors for one context key."""
+
+    def __init__(self, key: str, dimension: int, capacity: int = 64) -> None:
+        self.key = key
+        self.vectors = np.zeros((capacity, dimension), dtype=np.float32)
+        self.entries: list[_Entry] = []
+
+    def similarities(self, query: np.ndarray) -> np.ndarray:
+        return self.vectors[: len(self.entries)] @ query
+
+    def add(self, vector: np.ndarray, entry: _Entry) -> None:
+        size = len(self.entries)
+        if size == len(self.vectors):
+            grown = np.zeros((size * 2, self.vectors.shape[1]), dtype=np.float32)
+            grown[:size] = self.vectors
+            self.vectors = grown
+        self.vectors[size] = vector
+        entry.row = size
+        self.entries.append(entry)
+
+    def remove(self, entry: _Entry) -> None:
+        # Swap the last row into the hole to keep the matrix dense.
+        last = self.entries.pop()
+        if last is not entry:
+            self.vectors[entry.row] = self.vectors[last.row]
+            self.entries[entry.row] = last
+            last.row = entry.row
+        entry.row = -1
+
+
+class SemanticCache:
+    """Nearest-neighbour answer cache with TTL and LRU eviction."""
+
+    def __init__(
+        self,
+        dimension: int | None = None,
+        similarity_threshold: float = 0.92,
+        ttl: float = 86400,
+        max_entries: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize cache.
+
+        Args:
+            dimension: Embedding dimension (None adopts the first one seen)
+            similarity_threshold: Minimum cosine similarity for a hit
+            ttl: Default seconds an entry stays valid
+            max_entries: Entries kept before evicting the least recent
+            clock: Time source (monotonic seconds)
+        """
+        self.dimension = dimension
+        self.similarity_threshold = similarity_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._partitions: dict[str, _Partition] = {}
+        self._lru: OrderedDict[_Entry, None] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    @staticmethod
+    def context_key(
+        grade: str | None = None,
+        subject: str | None = None,
+        role: str | None = None,
+        preferences: BaseModel | dict | None = None,
+    ) -> str:
+        """Key of the answer-shaping context; only equal keys can match."""
+        if isinstance(preferences, BaseModel):
+            preferences = preferences.model_dump()
+        return json.dumps(
+            [grade, subject, role, preferences or {}], sort_keys=True, default=str
+        )
+
+    def get(self, embedding: list[float] | np.ndarray, context: str) -> Any | None:
+        """Cached value for the nearest live question, or None."""
+        vector = self._normalize(embedding)
+        partition = self._partitions.get(context)
+        found = None
+        if partition is not None:
+            found = self._nearest(partition, vector, self.similarity_threshold)
+
+        if found is None:
+            self.misses += 1
+            metrics.increment("cache_lookups", cache="semantic", result="miss")
+            return None
+        self.hits += 1
+        metrics.increment("cache_lookups", cache="semantic", result="hit")
+        self._lru.move_to_end(found)
+        return found.value
+
+    def set(
+        self,
+        embedding: list[float] | np.ndarray,
+        context: str,
+        value: Any,
+        ttl: float | None = None,
+    ) -> None:
+        """Cache value for this question, replacing a near-identical one."""
+        vector = self._normalize(embedding)
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        partition = self._partitions.get(context)
+        existing = None
+        if partition is not None:
+            threshold = max(self.similarity_threshold, DUPLICATE_SIMILARITY)
+            existing = self._nearest(partition, vector, threshold)
+        if existing is not None:
+            existing.value = value
+            existing.expires_at = expires_at
+            self._lru.move_to_end(existing)
+            return
+
+        # Looked up again: expiring the last entry above drops the partition.
+        partition = self._partitions.get(context)
+        if partition is None:
+            partition = self._partitions[context] = _Partition(context, len(vector))
+        entry = _Entry(value, expires_at, partition)
+        partition.add(vector, entry)
+        self._lru[entry] = None
+        while len(self._lru) > self.max_entries:
+            self._remove(next(iter(self._lru)))
+
+    def invalidate(self, context: str | None = None) -> int:
+        """Drop one context's entries (or everything); returns the count."""
+        if context is None:
+            removed = len(self._lru)
+            self._partitions.clear()
+            self._lru.clear()
+            return removed
+        partition = self._partitions.get(context)
+        if partition is None:
+            return 0
+        entries = list(partition.entries)
+        for entry in entries:
+            self._remove(entry)
+        return len(entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._lru),
+            "partitions": len(self._partitions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _nearest(
+        self, partition: _Partition, vector: np.ndarray, threshold: float
+    ) -> _Entry | None:
+        similarities = partition.similarities(vector)
+        rows = np.flatnonzero(similarities >= threshold)
+        now = self._clock()
+        expired = []
+        found = None
+        for row in rows[np.argsort(-similarities[rows])]:
+            entry = partition.entries[row]
+            if entry.expires_at <= now:
+                expired.append(entry)
+                continue
+            found = entry
+            break
+        for entry in expired:
+            self._remove(entry)
+        return found
+
+    def _normalize(self, embedding: list[float] | np.ndarray) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        if self.dimension is None and vector.ndim == 1:
+            self.dimension = len(vector)
+        if vector.shape != (self.dimension,):
+            raise ValueError(
+                f"Expected a {self.dimension}-dim embedding, got {vector.shape}"
+            )
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def _remove(self, entry: _Entry) -> None:
+        partition = entry.partition
+        partition.remove(entry)
+        self._lru.pop(entry, None)
+        if not partition.entries:
+            self._partitions.pop(partition.key, None)
+
+
+_semantic_cache: SemanticCache | None = None
+
+
+def init_semantic_cache(config: CacheConfig | None = None) -> SemanticCache | None:
+    """Create the process-wide semantic cache (None if disabled).
+
+    Sized to ``settings.embedding_dimension``, the width every embedder
+    and vector store in the app is checked against.
+    """
+    global _semantic_cache
+    config = config or get_cache_config()
+    if not config.semantic_enabled:
+        _semantic_cache = None
+        return None
+    _semantic_cache = SemanticCache(
+        dimension=settings.embedding_dimension,
+        similarity_threshold=config.similarity_threshold,
+        ttl=config.query_ttl,
+        max_entries=config.semantic_max_entries,
+    )
+    logger.info(
+        "Semantic cache enabled (threshold %.2f, %d entries)",
+        config.similarity_threshold,
+        config.semantic_max_entries,
+    )
+    return _semantic_cache
+
+
+def get_semantic_cache() -> SemanticCache | None:
+    """The cache created by ``init_semantic_cache``, if any."""
+    return _semantic_cache
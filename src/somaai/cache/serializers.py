@@ -0,0 +1,128 @@
+"""Value serializers for the Redis cache tier.
+
+``JsonSerializer`` handles arbitrary JSON values. ``VectorSerializer``
+stores embeddings as one packed binary blob instead of decimal text: a
+12-byte header followed by the raw little-endian array, so a 768-dim
+vector takes 3KB as float32 (about 15KB as JSON), 1.5KB as float16 or
+under 1KB as int8. A batch (``list[list[float]]``) is packed into a
+single blob rather than one entry per vector.
+
+Layout::
+
+    magic (2s) | encoding (B) | ndim (B) | rows (I) | dim (I)
+    [int8 only: rows x float32 scale] | rows x dim values
+
+int8 is symmetric per-row quantization (``value ≈ q * scale``), which
+keeps cosine similarities to within about 1%. Payloads that are not
+float vectors, and entries written by ``JsonSerializer``, are read
+back as JSON, so the two formats can share a namespace.
+"""
+
+import json
+import struct
+from typing import Any, Protocol
+
+import numpy as np
+
+# 0xff never starts valid UTF-8, so JSON payloads cannot look like this.
+MAGIC = b"\xffV"
+_HEADER = struct.Struct("<2sBBII")
+
+ENCODINGS: dict[str, tuple[int, np.dtype]] = {
+    "float32": (1, np.dtype("<f4")),
+    "float16": (2, np.dtype("<f2")),
+    "int8": (3, np.dtype("i1")),
+}
+_BY_CODE = {code: (name, dtype) for name, (code, dtype) in ENCODINGS.items()}
+
+
+class Serializer(Protocol):
+    """Converts cached values to and from Redis payloads."""
+
+    def dumps(self, value: Any) -> bytes: ...
+
+    def loads(self, raw: bytes) -> Any: ...
+
+
+class JsonSerializer:
+    """UTF-8 JSON for arbitrary values."""
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value).encode()
+
+    def loads(self, raw: bytes) -> Any:
+        return json.loads(raw)
+
+
+class VectorSerializer:
+    """Packed binary encoding for embeddings and embedding batches."""
+
+    def __init__(self, encoding: str = "float32") -> None:
+        """Initialize serializer.
+
+        Args:
+            encoding: ``float32`` (lossless), ``float16`` or ``int8``
+
+        Raises:
+            ValueError: For an unknown encoding
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError(
+                f"Unknown vector encoding {encoding!r}; "
+                f"expected one of {', '.join(ENCODINGS)}"
+            )
+        self.encoding = encoding
+        self._code, self._dtype = ENCODINGS[encoding]
+        self._json = JsonSerializer()
+
+    def dumps(self, value: Any) -> bytes:
+        array = _as_vectors(value)
+        if array is None:
+            return self._json.dumps(value)
+        matrix = array.reshape(-1, array.shape[-1])
+        rows, dim = matrix.shape
+        header = _HEADER.pack(MAGIC, self._code, array.ndim, rows, dim)
+        if self.encoding != "int8":
+            return header + matrix.astype(self._dtype).tobytes()
+        scales = np.abs(matrix).max(axis=1) / 127
+        scales[scales == 0] = 1
+        quantized = np.rint(matrix / scales[:, None]).astype(self._dtype)
+        return header + scales.astype("<f4").tobytes() + quantized.tobytes()
+
+    def loads(self, raw: bytes) -> Any:
+        if raw[:2] != MAGIC:
+            return self._json.loads(raw)
+        _, code, ndim, rows, dim = _HEADER.unpack_from(raw)
+        encoding, dtype = _BY_CODE[code]
+        offset = _HEADER.size
+        if encoding == "int8":
+            scales = np.frombuffer(raw, "<f4", rows, offset)
+            offset += 4 * rows
+            matrix = np.frombuffer(raw, dtype, rows * dim, offset).reshape(rows, dim)
+            matrix = matrix * scales[:, None]
+        else:
+            matrix = np.frombuffer(raw, dtype, rows * dim, offset).reshape(rows, dim)
+        matrix = matrix.astype(np.float32)
+        return matrix[0].tolist() if ndim == 1 else matrix.tolist()
+
+
+def _as_vectors(value: Any) -> np.ndarray | None:
+    """A 1-D or 2-D float32 array for float vector payloads, else None."""
+    if isinstance(value, np.ndarray):
+        first = value.flat[0] if value.size else None
+    elif isinstance(value, list | tuple) and value:
+        first = value[0]
+        if isinstance(first, list | tuple):
+            first = first[0] if first else None
+    else:
+        return None
+    # Only floats: ints or bools would silently come back as floats.
+    if not isinstance(first, float | np.floating):
+        return None
+    try:
+        array = np.asarray(value, dtype=np.float32)
+    except (TypeError, ValueError):
+        return None
+    if array.ndim not in (1, 2) or array.shape[-1] == 0:
+        return None
+    return array
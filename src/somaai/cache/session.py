@@ -2,6 +2,8 @@
 
 Uses redis-py directly for session operations as it's simpler
 than aiocache for session-style data with complex structures.
+Sessions share the process-wide connection pool from
+``somaai.cache.connection`` unless given their own ``redis_url``.
 """
 
 import json
@@ -16,6 +18,7 @@ except ImportError:
     REDIS_AVAILABLE = False
 
 from somaai.cache.config import get_cache_config
+from somaai.cache.connection import get_redis
 
 
 @dataclass
@@ -56,7 +59,7 @@ class Session:
         )
 
     @classmethod
-    def from_json(cls, data: str) -> "Session":
+    def from_json(cls, data: str | bytes) -> "Session":
         d = json.loads(data)
         messages = [Message.from_dict(m) for m in d.get("messages", [])]
         return cls(
@@ -102,7 +105,8 @@ class SessionManager:
         """Initialize session manager.
 
         Args:
-            redis_url: Redis connection URL.
+            redis_url: Redis connection URL for a dedicated client
+                (default: the shared connection pool).
             ttl: Session timeout in seconds.
             max_messages: Maximum messages to retain per session.
         """
@@ -112,10 +116,11 @@ class SessionManager:
             )
 
         self.config = get_cache_config()
-        self._redis_url = redis_url or self.config.redis_url
+        self._redis_url = redis_url
         self._ttl = ttl or self.config.session_ttl
         self._max_messages = max_messages
         self._client: redis.Redis | None = None
+        self._owns_client = False
 
     def _key(self, user_id: str, session_id: str) -> str:
         """Generate Redis key for session."""
@@ -124,13 +129,18 @@ class SessionManager:
     async def connect(self) -> None:
         """Connect to Redis."""
         if self._client is None:
-            self._client = redis.from_url(self._redis_url, decode_responses=True)
+            if self._redis_url:
+                self._client = redis.from_url(self._redis_url)
+                self._owns_client = True
+            else:
+                self._client = get_redis()
 
     async def disconnect(self) -> None:
-        """Disconnect from Redis."""
-        if self._client:
-            await self._client.close()
-            self._client = None
+        """Disconnect from Redis (the shared pool stays open)."""
+        if self._client and self._owns_client:
+            await self._client.aclose()
+        self._client = None
+        self._owns_client = False
 
     async def get(self, user_id: str, session_id: str) -> Session | None:
         """Get a session by user and session ID."""
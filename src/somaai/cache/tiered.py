@@ -0,0 +1,199 @@
+"""Two-tier cache: in-process L1 in front of Redis L2.
+
+``LocalCache`` is a bounded LRU with per-entry expiry, so a hot key is
+served from process memory without a network round trip or JSON
+decode. ``TieredCache`` reads L1, then Redis, then fills L1; writes go
+to both. Every write or delete is announced on a Redis pub/sub channel
+and the other workers drop their L1 copy of that key, so L1 copies stay
+coherent across processes. L1 entries also expire after ``l1_ttl`` to
+bound staleness if an invalidation message is ever lost.
+
+Values are stored in Redis by a ``Serializer`` (JSON unless given
+another, e.g. the packed ``VectorSerializer`` for embeddings). L1 holds
+decoded values and hands out the same object to every caller, so treat
+cached values as read-only.
+"""
+
+import asyncio
+import contextlib
+import math
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from somaai.cache.serializers import JsonSerializer, Serializer
+from somaai.logging_conf import get_logger
+from somaai.modules.telemetry.metrics import metrics
+
+logger = get_logger(__name__)
+
+MISSING = object()
+
+
+class LocalCache:
+    """Bounded in-process LRU cache with per-entry TTL."""
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl: float = 300,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        """Cached value, or ``MISSING``."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._entries[key] = (self._clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class TieredCache:
+    """L1 ``LocalCache`` over a Redis L2 with pub/sub invalidation."""
+
+    def __init__(
+        self,
+        client: Any,
+        namespace: str,
+        l1: LocalCache | None = None,
+        channel: str | None = None,
+        serializer: Serializer | None = None,
+    ) -> None:
+        """Initialize cache.
+
+        Args:
+            client: ``redis.asyncio.Redis`` client (bytes responses)
+            namespace: Prefix for Redis keys, e.g. ``somaai:embed``
+            l1: In-process tier (a default-sized one if None)
+            channel: Invalidation channel (default ``<namespace>:invalidate``)
+            serializer: Redis value encoding (default JSON)
+        """
+        self.client = client
+        self.namespace = namespace
+        self.l1 = l1 or LocalCache()
+        self.channel = channel or f"{namespace}:invalidate"
+        self.serializer = serializer or JsonSerializer()
+        self._origin = uuid.uuid4().hex
+        self._listener: asyncio.Task | None = None
+        self._invalidations = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Any:
+        """Value from L1, else Redis (filling L1), else ``MISSING``."""
+        self._ensure_listener()
+        value = self.l1.get(key)
+        if value is not MISSING:
+            self._count("l1_hit")
+            return value
+        invalidations = self._invalidations
+        try:
+            raw = await self.client.get(self._key(key))
+        except Exception:
+            logger.warning("Redis read failed for %s", key, exc_info=True)
+            raw = None
+        if raw is None:
+            self._count("miss")
+            return MISSING
+        self._count("l2_hit")
+        value = self.serializer.loads(raw)
+        if invalidations == self._invalidations:
+            # Otherwise the value read may predate an invalidation.
+            self.l1.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        """Write both tiers and tell other workers to drop their copy."""
+        self._ensure_listener()
+        self.l1.set(key, value, ttl)
+        try:
+            await self.client.set(
+                self._key(key),
+                self.serializer.dumps(value),
+                ex=math.ceil(ttl) if ttl else None,
+            )
+            await self._publish(key)
+        except Exception:
+            logger.warning("Redis write failed for %s", key, exc_info=True)
+
+    async def delete(self, key: str) -> None:
+        """Remove a key from both tiers in every worker."""
+        self.l1.delete(key)
+        await self.client.delete(self._key(key))
+        await self._publish(key)
+
+    async def aclose(self) -> None:
+        """Stop listening for invalidations."""
+        if self._listener is not None:
+            self._listener.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+
+    async def _publish(self, key: str) -> None:
+        await self.client.publish(self.channel, f"{self._origin}:{key}")
+
+    def _ensure_listener(self) -> None:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.ensure_future(self._listen())
+
+    async def _listen(self) -> None:
+        """Drop L1 entries that another worker changed, reconnecting on error."""
+        while True:
+            pubsub = self.client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                # Writes we missed while disconnected cannot be replayed.
+                self._invalidations += 1
+                self.l1.clear()
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    data = message["data"]
+                    if isinstance(data, bytes):
+                        data = data.decode()
+                    origin, _, key = data.partition(":")
+                    if origin != self._origin:
+                        self._invalidations += 1
+                        self.l1.delete(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Cache invalidation listener failed", exc_info=True)
+                self._invalidations += 1
+                self.l1.clear()
+                await asyncio.sleep(1.0)
+            finally:
+                with contextlib.suppress(Exception):
+                    await pubsub.aclose()
+
+    def _count(self, result: str) -> None:
+        metrics.increment("cache_lookups", cache=self.namespace, result=result)
@@ -47,6 +47,15 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Get the session factory.
+
+    For work that outlives the request, such as saving a streamed
+    answer after the response closes.
+    """
+    return async_session_maker
+
+
 async def init_db() -> None:
     """Initialize database tables.
 
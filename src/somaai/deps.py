@@ -2,6 +2,12 @@
 
 from fastapi import Header, Request
 
+from somaai.cache.semantic import SemanticCache
+from somaai.modules.knowledge.vectorstore import VectorStore
+from somaai.modules.rag.context import ContextPacker, context_budget
+from somaai.modules.rag.generator import CombinedGenerator
+from somaai.modules.rag.pipelines import RAGPipeline
+from somaai.modules.rag.retriever import Retriever
 from somaai.providers.llm import LLMClient
 from somaai.settings import Settings, settings
 from somaai.utils.ids import generate_short_id
@@ -17,6 +23,33 @@ def get_llm_dep(request: Request) -> LLMClient:
     return request.app.state.llm
 
 
+def get_vector_store_dep(request: Request) -> VectorStore:
+    """Get vector store dependency."""
+    return request.app.state.vector_store
+
+
+def get_rag_pipeline(request: Request) -> RAGPipeline:
+    """Get a RAG pipeline over the shared indexes, reranker and LLM."""
+    llm = request.app.state.llm
+    return RAGPipeline(
+        Retriever(
+            store=request.app.state.vector_store,
+            llm=llm,
+            lexical=request.app.state.lexical_index,
+        ),
+        reranker=request.app.state.reranker,
+        packer=ContextPacker(context_budget(settings)),
+        generator=CombinedGenerator(
+            llm, branch_timeout=settings.rag_branch_timeout_seconds
+        ),
+    )
+
+
+def get_semantic_cache(request: Request) -> SemanticCache | None:
+    """Get the semantic answer cache (None when disabled)."""
+    return getattr(request.app.state, "semantic_cache", None)
+
+
 def get_actor_id(x_actor_id: str | None = Header(None, alias="X-Actor-Id")) -> str:
     """Get actor ID from request header.
 
@@ -27,6 +27,36 @@ class ConflictError(SomaAIError):
     pass
 
 
+class LLMProviderError(SomaAIError):
+    """LLM provider request failed."""
+
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class RateLimitError(LLMProviderError):
+    """LLM provider rejected the request for rate limiting (HTTP 429)."""
+
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message, status_code=429)
+        self.retry_after = retry_after
+
+
+class OverloadedError(SomaAIError):
+    """Call rejected because the LLM queue is full or would miss its deadline."""
+
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(SomaAIError):
+    """LLM call could not finish before the request deadline."""
+
+    pass
+
+
 def not_found_exception(detail: str = "Resource not found") -> HTTPException:
     """Create a not found HTTP exception."""
     return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
@@ -2,6 +2,8 @@
 
 from fastapi import APIRouter
 
+from somaai.modules.telemetry.metrics import metrics
+
 health_router = APIRouter(tags=["health"])
 
 
@@ -9,3 +11,9 @@ health_router = APIRouter(tags=["health"])
 async def health_check() -> dict:
     """Check application health."""
     return {"status": "healthy"}
+
+
+@health_router.get("/metrics")
+async def get_metrics() -> dict:
+    """LLM token, cost and latency histograms plus limiter/hedge state."""
+    return metrics.get_metrics()
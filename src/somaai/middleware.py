@@ -2,10 +2,48 @@
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from somaai.providers.context import llm_deadline
+from somaai.settings import settings
+
+DEADLINE_HEADER = b"x-request-timeout-ms"
+
+
+class DeadlineMiddleware:
+    """Give every request a deadline that LLM calls inherit.
+
+    The deadline is ``REQUEST_DEADLINE_SECONDS``; clients may shorten
+    (never extend) it with an ``X-Request-Timeout-Ms`` header. It flows
+    to the limiter queue and hedged provider calls through
+    ``providers.context``.
+    """
+
+    def __init__(self, app: ASGIApp, deadline_seconds: float = 30.0) -> None:
+        self.app = app
+        self.deadline_seconds = deadline_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        seconds = self.deadline_seconds
+        for name, value in scope["headers"]:
+            if name == DEADLINE_HEADER:
+                try:
+                    seconds = min(seconds, max(int(value) / 1000, 0.0))
+                except ValueError:
+                    pass
+        with llm_deadline(seconds):
+            await self.app(scope, receive, send)
 
 
 def setup_middleware(app: FastAPI) -> None:
     """Set up application middleware."""
+    app.add_middleware(
+        DeadlineMiddleware, deadline_seconds=settings.request_deadline_seconds
+    )
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -29,7 +29,30 @@ class CitationExtractor:
             2. Deduplicate by doc_id + page
             3. Format with view URLs
         """
-        pass
+        citations = []
+        seen: set[tuple[str, int, int]] = set()
+        for chunk in sorted(chunks, key=lambda c: c.get("score", 0.0), reverse=True):
+            metadata = chunk.get("metadata", {})
+            doc_id = str(metadata.get("doc_id", chunk["id"]))
+            page_start = int(metadata.get("page_start", 1))
+            page_end = int(metadata.get("page_end", page_start))
+            if (doc_id, page_start, page_end) in seen:
+                continue
+            seen.add((doc_id, page_start, page_end))
+            citations.append(
+                CitationResponse(
+                    doc_id=doc_id,
+                    doc_title=metadata.get("doc_title") or doc_id,
+                    page_start=page_start,
+                    page_end=page_end,
+                    chunk_preview=chunk.get("content", "")[:200],
+                    view_url=self._format_view_url(doc_id, page_start),
+                    relevance_score=min(max(chunk.get("score", 0.0), 0.0), 1.0),
+                )
+            )
+            if len(citations) == top_k:
+                break
+        return citations
 
     async def get_message_citations(
         self,
@@ -72,4 +95,4 @@ class CitationExtractor:
         Returns:
             URL to view the cited page
         """
-        pass
+        return f"/api/v1/docs/{doc_id}/view?page={page_number}"
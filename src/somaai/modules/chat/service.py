@@ -1,9 +1,260 @@
 """Chat module service."""
 
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from somaai.cache.semantic import SemanticCache
+from somaai.contracts.chat import ChatRequest
+from somaai.contracts.common import Sufficiency
+from somaai.db.models import Message, MessageCitation
+from somaai.logging_conf import get_logger
+from somaai.modules.chat.citations import CitationExtractor
+from somaai.modules.rag.pipelines import RAGPipeline
+from somaai.providers.instrumented import record_cache_hit
+from somaai.utils.ids import generate_id
+
+logger = get_logger(__name__)
+
+INSUFFICIENT_CONTEXT_ANSWER = (
+    "I could not find this in the curriculum materials for your grade and "
+    "subject. Try rephrasing the question or ask your teacher."
+)
+
+
+@dataclass
+class AnswerStream:
+    """State of one streamed answer, persisted once the stream closes."""
+
+    request: ChatRequest
+    actor_id: str | None = None
+    message_id: str = field(default_factory=generate_id)
+    documents: list[dict] = field(default_factory=list)
+    tokens: list[str] = field(default_factory=list)
+    analogy: str | None = None
+    realworld_context: str | None = None
+    completed: bool = False
+
+    @property
+    def answer(self) -> str:
+        return "".join(self.tokens)
+
+    @property
+    def sufficiency(self) -> Sufficiency:
+        if self.documents:
+            return Sufficiency.SUFFICIENT
+        return Sufficiency.INSUFFICIENT
+
+
+@dataclass
+class CachedAnswer:
+    """A finished answer as stored in the semantic cache."""
+
+    answer: str
+    documents: list[dict]
+    analogy: str | None = None
+    realworld_context: str | None = None
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 
 class ChatService:
     """Chat service."""
 
+    def __init__(
+        self,
+        pipeline: RAGPipeline | None = None,
+        session_factory: async_sessionmaker[AsyncSession] | None = None,
+        cache: SemanticCache | None = None,
+    ) -> None:
+        """Initialize service.
+
+        Args:
+            pipeline: RAG pipeline answering questions
+            session_factory: Opens the session used to save streamed
+                answers (the request's own session is closed by then)
+            cache: Semantic answer cache; a hit replays the cached answer
+                without retrieval or generation
+        """
+        self.pipeline = pipeline
+        self.session_factory = session_factory
+        self.cache = cache
+        self.citations = CitationExtractor()
+
     async def process_message(self, message: str) -> str:
         """Process a chat message."""
         return f"Response to: {message}"
+
+    async def stream_answer(self, state: AnswerStream) -> AsyncIterator[str]:
+        """Answer a question as Server-Sent Events.
+
+        Events, in order:
+            citations: message_id, sufficiency and citations, sent as
+                soon as retrieval finishes
+            token: one per generated text fragment
+            analogy, realworld: {"text": ...} for each enabled extra that
+                finished within its timeout (generated alongside the
+                answer, sent after its last token)
+            done: the stream completed
+            error: generation failed (no further events follow)
+        """
+        request = state.request
+        embedding = cached = None
+        try:
+            if self.cache is not None and self.pipeline.retriever.llm is not None:
+                [embedding] = await self.pipeline.retriever.llm.embed(
+                    [request.question]
+                )
+                cached = self._cache_get(embedding, request)
+            if cached is not None:
+                state.documents = cached.documents
+            else:
+                state.documents = await self.pipeline.prepare(
+                    request.question,
+                    grade=request.grade.value,
+                    subject=request.subject.value,
+                    embedding=embedding,
+                )
+            citations = await self.citations.extract_citations(state.documents)
+            yield sse_event(
+                "citations",
+                {
+                    "message_id": state.message_id,
+                    "sufficiency": state.sufficiency.value,
+                    "citations": [c.model_dump() for c in citations],
+                },
+            )
+
+            if cached is not None:
+                record_cache_hit("stream", "semantic")
+                state.tokens.append(cached.answer)
+                yield sse_event("token", {"text": cached.answer})
+                state.analogy = cached.analogy
+                state.realworld_context = cached.realworld_context
+            else:
+                extras = self._start_extras(state)
+                if state.documents:
+                    tokens = self.pipeline.stream(request.question, state.documents)
+                else:
+                    tokens = _single(INSUFFICIENT_CONTEXT_ANSWER)
+                try:
+                    async for token in tokens:
+                        state.tokens.append(token)
+                        yield sse_event("token", {"text": token})
+                    state.analogy, state.realworld_context = await extras
+                finally:
+                    extras.cancel()
+            if state.analogy is not None:
+                yield sse_event("analogy", {"text": state.analogy})
+            if state.realworld_context is not None:
+                yield sse_event("realworld", {"text": state.realworld_context})
+        except Exception:
+            logger.exception("Streaming answer %s failed", state.message_id)
+            yield sse_event("error", {"detail": "Answer generation failed"})
+            return
+
+        state.completed = True
+        if embedding is not None and cached is None and state.documents:
+            self._cache_set(embedding, state)
+        yield sse_event("done", {"message_id": state.message_id})
+
+    def _cache_get(
+        self, embedding: list[float], request: ChatRequest
+    ) -> CachedAnswer | None:
+        """Cached answer for a paraphrase of this question, if any."""
+        try:
+            return self.cache.get(embedding, _cache_context(request))
+        except Exception:
+            # A broken cache must never fail the answer.
+            logger.exception("Semantic cache lookup failed")
+            return None
+
+    def _cache_set(self, embedding: list[float], state: AnswerStream) -> None:
+        answer = CachedAnswer(
+            answer=state.answer,
+            documents=state.documents,
+            analogy=state.analogy,
+            realworld_context=state.realworld_context,
+        )
+        try:
+            self.cache.set(embedding, _cache_context(state.request), answer)
+        except Exception:
+            logger.exception("Semantic cache store failed")
+
+    def _start_extras(self, state: AnswerStream) -> asyncio.Future:
+        """Start the enabled analogy/real-world branches in the background."""
+        generator = self.pipeline.generator
+        preferences = state.request.preferences
+        context = [doc["content"] for doc in state.documents]
+        has_context = bool(state.documents)
+        return asyncio.gather(
+            generator.branch(
+                generator.analogy,
+                state.request.question,
+                context,
+                enabled=has_context and preferences.enable_analogy,
+            ),
+            generator.branch(
+                generator.realworld,
+                state.request.question,
+                context,
+                enabled=has_context and preferences.enable_realworld,
+            ),
+        )
+
+    async def save_answer(self, state: AnswerStream) -> None:
+        """Persist a completed streamed answer with its citations."""
+        if not state.completed or self.session_factory is None:
+            return
+
+        request = state.request
+        async with self.session_factory() as session:
+            session.add(
+                Message(
+                    id=state.message_id,
+                    session_id=request.session_id,
+                    actor_id=state.actor_id,
+                    user_role=request.user_role.value,
+                    question=request.question,
+                    answer=state.answer,
+                    sufficiency=state.sufficiency.value,
+                    grade=request.grade.value,
+                    subject=request.subject.value,
+                    analogy=state.analogy,
+                    realworld_context=state.realworld_context,
+                )
+            )
+            order = 0
+            for doc in state.documents:
+                for chunk_id in doc.get("merged_ids", [doc["id"]]):
+                    session.add(
+                        MessageCitation(
+                            id=generate_id(),
+                            message_id=state.message_id,
+                            chunk_id=chunk_id,
+                            relevance_score=doc.get("score", 0.0),
+                            order=order,
+                            snippet=doc.get("content", "")[:200],
+                        )
+                    )
+                    order += 1
+            await session.commit()
+
+
+def _cache_context(request: ChatRequest) -> str:
+    return SemanticCache.context_key(
+        request.grade.value,
+        request.subject.value,
+        request.user_role.value,
+        request.preferences,
+    )
+
+
+async def _single(text: str) -> AsyncIterator[str]:
+    yield text
@@ -1,4 +1,37 @@
-"""Embeddings module."""
+"""Embeddings module.
+
+``LocalEmbeddingModel`` runs a sentence-embedding model on CPU so
+ingestion does not pay per-call network costs or hit provider rate
+limits. Batches run in a ``ProcessPoolExecutor``: inference never
+blocks the event loop, and each worker loads the model once (in the
+pool initializer) and keeps it for its lifetime.
+
+The default encoder is an exported ONNX model directory containing
+``model.onnx`` and ``tokenizer.json`` (e.g. a MiniLM or multilingual E5
+export), pooled by attention-masked mean and L2-normalised.
+
+Install: uv add onnxruntime tokenizers
+"""
+
+import asyncio
+import multiprocessing
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Protocol
+
+import numpy as np
+
+from somaai.providers.llm import LLMClient
+from somaai.settings import Settings
+
+try:
+    import onnxruntime
+    from tokenizers import Tokenizer
+
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
 
 
 class EmbeddingModel:
@@ -7,3 +40,183 @@ class EmbeddingModel:
     async def embed(self, texts: list[str]) -> list[list[float]]:
         """Generate embeddings for texts."""
         pass
+
+
+class SentenceEncoder(Protocol):
+    """Synchronous batch encoder living inside a pool worker."""
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        """Return a (len(texts), dim) float32 array."""
+        ...
+
+
+class OnnxSentenceEncoder:
+    """Sentence embeddings from an ONNX transformer export."""
+
+    def __init__(self, model_dir: str, max_length: int = 256, threads: int = 1):
+        """Load the model.
+
+        Args:
+            model_dir: Directory with ``model.onnx`` and ``tokenizer.json``
+            max_length: Tokens per text; longer texts are truncated
+            threads: Intra-op threads per worker process
+
+        Raises:
+            ImportError: If onnxruntime or tokenizers is not installed
+        """
+        if not ONNX_AVAILABLE:
+            raise ImportError(
+                "onnxruntime and tokenizers are required for EMBEDDING_BACKEND=local"
+            )
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            str(Path(model_dir) / "model.onnx"),
+            options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.tokenizer = Tokenizer.from_file(str(Path(model_dir) / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding()
+        self.input_names = {node.name for node in self.session.get_inputs()}
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+
+        hidden = self.session.run(None, feeds)[0]
+        weights = mask[..., None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        norms = np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return (pooled / norms).astype(np.float32)
+
+
+# Set once per worker process by the pool initializer.
+_encoder: SentenceEncoder | None = None
+
+
+def _load_encoder(loader: Callable[..., SentenceEncoder], args: tuple) -> None:
+    global _encoder
+    _encoder = loader(*args)
+
+
+def _encode_batch(texts: list[str]) -> np.ndarray:
+    return _encoder.encode(texts)
+
+
+class LocalEmbeddingModel(EmbeddingModel):
+    """CPU embedding model served from a process pool."""
+
+    def __init__(
+        self,
+        loader: Callable[..., SentenceEncoder] = OnnxSentenceEncoder,
+        loader_args: tuple[Any, ...] = (),
+        workers: int = 2,
+        batch_size: int = 32,
+        executor: Executor | None = None,
+        dimension: int | None = None,
+    ) -> None:
+        """Initialize model.
+
+        Args:
+            loader: Picklable callable building the encoder in a worker
+            loader_args: Arguments for ``loader``
+            workers: Worker processes (each holds its own model copy)
+            batch_size: Texts per inference call
+            executor: Pre-built executor (the loader is then not used)
+            dimension: Expected embedding width (None skips the check)
+        """
+        self.batch_size = batch_size
+        self.dimension = dimension
+        self._executor = executor or ProcessPoolExecutor(
+            max_workers=workers,
+            # Never fork the running server (event loop, sockets, threads).
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_load_encoder,
+            initargs=(loader, loader_args),
+        )
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts, batching similar lengths together to cut padding.
+
+        Raises:
+            ValueError: If the encoder's width is not ``dimension``
+        """
+        if not texts:
+            return []
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        loop = asyncio.get_running_loop()
+        parts = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    self._executor,
+                    _encode_batch,
+                    [texts[i] for i in order[start : start + self.batch_size]],
+                )
+                for start in range(0, len(order), self.batch_size)
+            )
+        )
+        vectors = np.concatenate(parts)
+        if self.dimension is not None and vectors.shape[1] != self.dimension:
+            raise ValueError(
+                f"Local embedding model returns {vectors.shape[1]}-dim embeddings,"
+                f" expected {self.dimension}; set EMBEDDING_DIMENSION to match"
+            )
+        result: list[list[float]] = [[] for _ in texts]
+        for position, index in enumerate(order):
+            result[index] = vectors[position].tolist()
+        return result
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class LocalEmbeddingLLMClient:
+    """``LLMClient`` generating with a provider but embedding locally."""
+
+    def __init__(self, llm: LLMClient, embeddings: EmbeddingModel) -> None:
+        self.llm = llm
+        self.embeddings = embeddings
+
+    async def generate(self, prompt: str) -> str:
+        return await self.llm.generate(prompt)
+
+    def generate_stream(self, prompt: str) -> AsyncIterator[str]:
+        return self.llm.generate_stream(prompt)
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        return await self.embeddings.embed(texts)
+
+
+def get_embedding_model(settings: Settings) -> LocalEmbeddingModel | None:
+    """Local embedding model per ``EMBEDDING_BACKEND`` (None = use the LLM)."""
+    backend = settings.embedding_backend.lower()
+    if backend == "llm":
+        return None
+    if backend != "local":
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+    if not ONNX_AVAILABLE:
+        raise ImportError(
+            "onnxruntime and tokenizers are required for EMBEDDING_BACKEND=local"
+        )
+    if not settings.local_embedding_model_dir:
+        raise ValueError(
+            "LOCAL_EMBEDDING_MODEL_DIR is required when EMBEDDING_BACKEND=local"
+        )
+    return LocalEmbeddingModel(
+        OnnxSentenceEncoder,
+        (
+            settings.local_embedding_model_dir,
+            settings.local_embedding_max_length,
+            settings.local_embedding_threads,
+        ),
+        workers=settings.local_embedding_workers,
+        batch_size=settings.local_embedding_batch_size,
+        dimension=settings.embedding_dimension,
+    )
@@ -0,0 +1,520 @@
+"""Hierarchical Navigable Small World (HNSW) graph index.
+
+Pure NumPy implementation of approximate nearest-neighbour search
+(Malkov & Yashunin). Vectors are L2-normalised on insert so the
+similarity used everywhere is cosine (inner product).
+
+The index works with dense integer labels (0..n-1). Mapping labels to
+chunk IDs and metadata is the job of the vector store that owns it.
+
+With a quantizer the graph is traversed using compact codes and the
+final candidates are re-scored against the exact float vectors (unless
+``rescore=False``, in which case floats are not kept at all).
+"""
+
+import heapq
+import math
+
+import numpy as np
+
+from somaai.modules.knowledge.quantization import Quantizer
+
+
+class HNSWIndex:
+    """In-memory HNSW graph over float32 vectors.
+
+    Level 0 neighbours live in a dense ``(capacity, 2 * m)`` int32 array
+    padded with ``-1``; the sparse upper levels are stored as one dict
+    per level mapping label -> neighbour array.
+
+    Deletion is a tombstone: deleted nodes are still traversed (so the
+    graph stays connected) but never returned.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        m: int = 16,
+        ef_construction: int = 100,
+        ef_search: int = 64,
+        initial_capacity: int = 1024,
+        seed: int | None = None,
+        quantizer: Quantizer | None = None,
+        rescore: bool = True,
+    ) -> None:
+        """Initialize an empty index.
+
+        Args:
+            dim: Vector dimension
+            m: Max neighbours per node on upper levels (2*m on level 0)
+            ef_construction: Candidate list size while inserting
+            ef_search: Default candidate list size while searching
+            initial_capacity: Preallocated node slots (grows by doubling)
+            seed: Seed for level assignment (for reproducible graphs)
+            quantizer: Optional trained int8/PQ quantizer for stored codes
+            rescore: Keep float vectors to re-score the final candidates
+                exactly (only meaningful with a quantizer)
+        """
+        if quantizer is not None and not quantizer.is_trained:
+            raise ValueError("Quantizer must be trained before building the index")
+
+        self.dim = dim
+        self.m = m
+        self.m0 = 2 * m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self._level_mult = 1.0 / math.log(m)
+        self._rng = np.random.default_rng(seed)
+        self.quantizer = quantizer
+        self.rescore = rescore or quantizer is None
+
+        capacity = max(initial_capacity, 1)
+        self._vectors: np.ndarray | None = None
+        self._codes: np.ndarray | None = None
+        if self.rescore:
+            self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        if quantizer is not None:
+            code_dtype = np.int8 if quantizer.kind == "int8" else np.uint8
+            self._codes = np.zeros((capacity, quantizer.code_size), dtype=code_dtype)
+        self._neighbors0 = np.full((capacity, self.m0), -1, dtype=np.int32)
+        self._levels = np.zeros(capacity, dtype=np.int8)
+        self._deleted = np.zeros(capacity, dtype=bool)
+        self._upper: list[dict[int, np.ndarray]] = []
+
+        self._count = 0
+        self._num_deleted = 0
+        self._entry_point = -1
+        self._max_level = -1
+
+    def __len__(self) -> int:
+        """Number of live (non-deleted) vectors."""
+        return self._count - self._num_deleted
+
+    @property
+    def capacity(self) -> int:
+        """Number of preallocated node slots."""
+        return self._levels.shape[0]
+
+    def memory_usage(self) -> dict[str, int]:
+        """Bytes used by the filled part of each array."""
+        n = self._count
+        upper = sum(len(level) for level in self._upper) * self.m * 4
+        return {
+            "vectors": 0 if self._vectors is None else self._vectors[:n].nbytes,
+            "codes": 0 if self._codes is None else self._codes[:n].nbytes,
+            "graph": self._neighbors0[:n].nbytes + upper,
+        }
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def add(self, vector: np.ndarray | list[float]) -> int:
+        """Insert a vector and return its label."""
+        vec = self._normalize(np.asarray(vector, dtype=np.float32))
+        if vec.shape != (self.dim,):
+            raise ValueError(
+                f"Expected vector of dimension {self.dim}, got {vec.shape}"
+            )
+
+        if self._count == self.capacity:
+            self._grow(self.capacity * 2)
+
+        label = self._count
+        level = int(-math.log(1.0 - self._rng.random()) * self._level_mult)
+        if self._vectors is not None:
+            self._vectors[label] = vec
+        if self._codes is not None:
+            self._codes[label] = self.quantizer.encode(vec[None, :])[0]
+        self._levels[label] = level
+        self._count += 1
+
+        while len(self._upper) < level:
+            self._upper.append({})
+
+        if self._entry_point < 0:
+            for lvl in range(1, level + 1):
+                self._upper[lvl - 1][label] = np.full(self.m, -1, dtype=np.int32)
+            self._entry_point = label
+            self._max_level = level
+            return label
+
+        state = self._prepare(vec)
+        entry = self._entry_point
+        for lvl in range(self._max_level, level, -1):
+            entry = self._greedy_closest(state, entry, lvl)
+
+        entries = [entry]
+        for lvl in range(min(level, self._max_level), -1, -1):
+            candidates = self._search_layer(state, entries, self.ef_construction, lvl)
+            max_links = self.m0 if lvl == 0 else self.m
+            selected = self._select_neighbors(candidates, max_links)
+            self._set_neighbors(label, lvl, selected)
+            for neighbor in selected:
+                self._link(int(neighbor), label, lvl)
+            entries = [c for _, c in candidates]
+
+        # Levels above the old maximum only contain the new node.
+        for lvl in range(self._max_level + 1, level + 1):
+            self._upper[lvl - 1][label] = np.full(self.m, -1, dtype=np.int32)
+
+        if level > self._max_level:
+            self._entry_point = label
+            self._max_level = level
+
+        return label
+
+    def mark_deleted(self, label: int) -> None:
+        """Tombstone a label so it is excluded from search results."""
+        if not 0 <= label < self._count:
+            raise KeyError(label)
+        if not self._deleted[label]:
+            self._deleted[label] = True
+            self._num_deleted += 1
+
+    def is_deleted(self, label: int) -> bool:
+        """Return True if the label has been tombstoned."""
+        return bool(self._deleted[label])
+
+    def get_vector(self, label: int) -> np.ndarray:
+        """Return the stored (normalised) vector for a label.
+
+        Without float storage this is the quantizer's reconstruction.
+        """
+        return self._vectors_of([label])[0]
+
+    def get_vectors(self, labels: list[int] | np.ndarray) -> np.ndarray:
+        """Return stored (normalised) vectors for many labels at once."""
+        return self._vectors_of(np.asarray(labels, dtype=np.int64))
+
+    def search(
+        self,
+        query: np.ndarray | list[float],
+        k: int,
+        ef: int | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Find the k nearest live neighbours of a query.
+
+        Args:
+            query: Query vector (normalised internally)
+            k: Number of results
+            ef: Candidate list size (defaults to max(ef_search, k))
+
+        Returns:
+            Tuple of (labels, cosine similarities), best first
+        """
+        if len(self) == 0 or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        q = self._normalize(np.asarray(query, dtype=np.float32))
+        ef = max(ef or self.ef_search, k)
+        state = self._prepare(q)
+
+        entry = self._entry_point
+        for lvl in range(self._max_level, 0, -1):
+            entry = self._greedy_closest(state, entry, lvl)
+
+        candidates = self._search_layer(state, [entry], ef, 0)
+        hits = [(sim, c) for sim, c in candidates if not self._deleted[c]]
+        if self.quantizer is not None and self._vectors is not None and hits:
+            found = [c for _, c in hits]
+            exact = (self._vectors[found] @ q).tolist()
+            hits = sorted(zip(exact, found), reverse=True)
+        hits = hits[:k]
+
+        labels = np.fromiter((c for _, c in hits), dtype=np.int64, count=len(hits))
+        sims = np.fromiter((s for s, _ in hits), dtype=np.float32, count=len(hits))
+        return labels, sims
+
+    def search_batch(
+        self,
+        queries: np.ndarray,
+        k: int,
+        exact_threshold: int = 50_000,
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Find the k nearest live neighbours for many queries at once.
+
+        Indexes up to ``exact_threshold`` vectors (with float storage)
+        are scored exactly with a single matrix multiply, which beats
+        walking the graph once per query; larger ones fall back to
+        per-query graph search.
+
+        Returns:
+            One (labels, similarities) pair per query, best first
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        if len(self) == 0 or k <= 0 or len(queries) == 0:
+            empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+            return [empty for _ in range(len(queries))]
+
+        if self._vectors is None or self._count > exact_threshold:
+            return [self.search(q, k) for q in queries]
+
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms > 0, norms, 1.0)
+        sims = queries @ self._vectors[: self._count].T
+        sims[:, self._deleted[: self._count]] = -np.inf
+
+        k = min(k, len(self))
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_sims, axis=1)
+        labels = np.take_along_axis(top, order, axis=1).astype(np.int64)
+        scores = np.take_along_axis(top_sims, order, axis=1)
+        return list(zip(labels, scores))
+
+    # ------------------------------------------------------------------
+    # Serialization
+    # ------------------------------------------------------------------
+
+    def to_arrays(self) -> tuple[dict[str, np.ndarray], dict]:
+        """Export the index as flat arrays plus a small JSON-able header.
+
+        Upper levels are stored as parallel ``upper<l>_nodes`` /
+        ``upper<l>_neighbors`` arrays.
+        """
+        n = self._count
+        arrays: dict[str, np.ndarray] = {
+            "neighbors0": self._neighbors0[:n],
+            "levels": self._levels[:n],
+            "deleted": self._deleted[:n],
+        }
+        if self._vectors is not None:
+            arrays["vectors"] = self._vectors[:n]
+        if self._codes is not None:
+            arrays["codes"] = self._codes[:n]
+        for lvl, nodes in enumerate(self._upper, start=1):
+            labels = sorted(nodes)
+            arrays[f"upper{lvl}_nodes"] = np.asarray(labels, dtype=np.int32)
+            arrays[f"upper{lvl}_neighbors"] = (
+                np.stack([nodes[label] for label in labels])
+                if labels
+                else np.empty((0, self.m), dtype=np.int32)
+            )
+
+        header = {
+            "dim": self.dim,
+            "m": self.m,
+            "ef_construction": self.ef_construction,
+            "ef_search": self.ef_search,
+            "count": n,
+            "num_deleted": self._num_deleted,
+            "entry_point": self._entry_point,
+            "max_level": self._max_level,
+            "upper_levels": len(self._upper),
+        }
+        return arrays, header
+
+    @classmethod
+    def from_arrays(
+        cls,
+        arrays: dict[str, np.ndarray],
+        header: dict,
+        quantizer: Quantizer | None = None,
+    ) -> "HNSWIndex":
+        """Rebuild an index from ``to_arrays`` output.
+
+        Arrays may be read-only memory maps; such an index can be
+        searched but not modified.
+        """
+        index = cls(
+            dim=header["dim"],
+            m=header["m"],
+            ef_construction=header["ef_construction"],
+            ef_search=header["ef_search"],
+            initial_capacity=1,
+            quantizer=quantizer,
+            rescore="vectors" in arrays,
+        )
+        index._neighbors0 = arrays["neighbors0"]
+        index._levels = arrays["levels"]
+        index._deleted = arrays["deleted"]
+        index._vectors = arrays.get("vectors")
+        index._codes = arrays.get("codes")
+        index._upper = [
+            dict(
+                zip(
+                    arrays[f"upper{lvl}_nodes"].tolist(),
+                    arrays[f"upper{lvl}_neighbors"],
+                )
+            )
+            for lvl in range(1, header["upper_levels"] + 1)
+        ]
+        index._count = header["count"]
+        index._num_deleted = header["num_deleted"]
+        index._entry_point = header["entry_point"]
+        index._max_level = header["max_level"]
+        return index
+
+    # ------------------------------------------------------------------
+    # Graph internals
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _normalize(vec: np.ndarray) -> np.ndarray:
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm > 0 else vec
+
+    def _prepare(self, q: np.ndarray) -> np.ndarray:
+        """Per-query scoring state (the query itself for float storage)."""
+        return q if self.quantizer is None else self.quantizer.prepare(q)
+
+    def _score(self, state: np.ndarray, labels) -> np.ndarray:
+        """Similarities between a prepared query and stored nodes."""
+        if self.quantizer is None:
+            assert self._vectors is not None
+            return self._vectors[labels] @ state
+        assert self._codes is not None
+        return self.quantizer.similarities(state, self._codes[labels])
+
+    def _vectors_of(self, labels) -> np.ndarray:
+        """Float vectors for graph maintenance (decoded if not stored)."""
+        if self._vectors is not None:
+            return self._vectors[labels]
+        assert self.quantizer is not None and self._codes is not None
+        return self.quantizer.decode(self._codes[labels])
+
+    def _grow(self, new_capacity: int) -> None:
+        extra = new_capacity - self.capacity
+        if self._vectors is not None:
+            self._vectors = np.vstack(
+                [self._vectors, np.zeros((extra, self.dim), dtype=np.float32)]
+            )
+        if self._codes is not None:
+            codes = np.zeros((extra, self._codes.shape[1]), dtype=self._codes.dtype)
+            self._codes = np.vstack([self._codes, codes])
+        self._neighbors0 = np.vstack(
+            [self._neighbors0, np.full((extra, self.m0), -1, dtype=np.int32)]
+        )
+        self._levels = np.concatenate([self._levels, np.zeros(extra, np.int8)])
+        self._deleted = np.concatenate([self._deleted, np.zeros(extra, bool)])
+
+    def _neighbors(self, label: int, level: int) -> np.ndarray:
+        row = self._neighbors0[label] if level == 0 else self._upper[level - 1][label]
+        return row[row >= 0]
+
+    def _set_neighbors(self, label: int, level: int, neighbors: np.ndarray) -> None:
+        width = self.m0 if level == 0 else self.m
+        row = np.full(width, -1, dtype=np.int32)
+        row[: len(neighbors)] = neighbors
+        if level == 0:
+            self._neighbors0[label] = row
+        else:
+            self._upper[level - 1][label] = row
+
+    def _link(self, src: int, dst: int, level: int) -> None:
+        """Add dst to src's neighbour list, pruning if it overflows."""
+        current = self._neighbors(src, level)
+        max_links = self.m0 if level == 0 else self.m
+        if len(current) < max_links:
+            self._set_neighbors(src, level, np.append(current, dst))
+            return
+
+        pool = np.append(current, dst)
+        sims = self._vectors_of(pool) @ self._vectors_of([src])[0]
+        if sims[-1] <= sims[:-1].min():
+            # The new node would be pruned first; skip the heuristic.
+            return
+        order = np.argsort(-sims)
+        candidates = [(float(sims[i]), int(pool[i])) for i in order]
+        self._set_neighbors(src, level, self._select_neighbors(candidates, max_links))
+
+    def _select_neighbors(
+        self,
+        candidates: list[tuple[float, int]],
+        max_links: int,
+    ) -> np.ndarray:
+        """Pick diverse neighbours (HNSW heuristic, algorithm 4).
+
+        ``candidates`` must be sorted by similarity, best first. A
+        candidate is kept only if it is closer to the base node than to
+        every neighbour already kept; remaining slots are back-filled
+        with the closest discarded candidates.
+        """
+        if len(candidates) <= max_links:
+            return np.asarray([c for _, c in candidates], dtype=np.int32)
+
+        labels = np.asarray([c for _, c in candidates], dtype=np.int64)
+        base_sims = np.asarray([s for s, _ in candidates], dtype=np.float32)
+        vecs = self._vectors_of(labels)
+        pairwise = vecs @ vecs.T
+
+        # closest[i] = max similarity from candidate i to any kept neighbour
+        closest = np.full(len(labels), -np.inf, dtype=np.float32)
+        selected: list[int] = []
+        discarded: list[int] = []
+        for i in range(len(labels)):
+            if len(selected) >= max_links:
+                break
+            if closest[i] > base_sims[i]:
+                discarded.append(i)
+                continue
+            selected.append(i)
+            np.maximum(closest, pairwise[i], out=closest)
+
+        for i in discarded:
+            if len(selected) >= max_links:
+                break
+            selected.append(i)
+
+        return labels[selected].astype(np.int32)
+
+    def _greedy_closest(self, state: np.ndarray, entry: int, level: int) -> int:
+        best = entry
+        best_sim = float(self._score(state, [entry])[0])
+        improved = True
+        while improved:
+            improved = False
+            neighbors = self._neighbors(best, level)
+            if len(neighbors) == 0:
+                break
+            sims = self._score(state, neighbors)
+            i = int(np.argmax(sims))
+            if sims[i] > best_sim:
+                best_sim = float(sims[i])
+                best = int(neighbors[i])
+                improved = True
+        return best
+
+    def _search_layer(
+        self,
+        state: np.ndarray,
+        entries: list[int],
+        ef: int,
+        level: int,
+    ) -> list[tuple[float, int]]:
+        """Best-first beam search on one level.
+
+        Returns up to ``ef`` (similarity, label) pairs, best first.
+        """
+        visited = set(entries)
+        entry_sims = self._score(state, entries)
+
+        # candidates: max-heap on similarity; results: min-heap (worst on top)
+        candidates = [(-float(s), e) for s, e in zip(entry_sims, entries)]
+        results = [(float(s), e) for s, e in zip(entry_sims, entries)]
+        heapq.heapify(candidates)
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            neg_sim, current = heapq.heappop(candidates)
+            if -neg_sim < results[0][0] and len(results) >= ef:
+                break
+
+            neighbors = self._neighbors(current, level).tolist()
+            fresh = [n for n in neighbors if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+
+            sims = self._score(state, fresh)
+            for sim, node in zip(sims.tolist(), fresh):
+                if len(results) < ef or sim > results[0][0]:
+                    heapq.heappush(candidates, (-sim, node))
+                    heapq.heappush(results, (sim, node))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return sorted(results, reverse=True)
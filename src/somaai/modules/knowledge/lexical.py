@@ -0,0 +1,532 @@
+"""BM25 lexical index over chunk content.
+
+Documents are stored in immutable segments, one set per (grade, subject)
+partition. Each segment keeps a sorted term dictionary and its posting
+lists as delta + varint encoded bytes in flat NumPy arrays (see
+``postings``), so the index stays compact and can be written to disk and
+memory-mapped like the vector index segments.
+
+New documents become new segments; once a partition has more than
+``merge_factor`` segments the smallest are merged, which also purges
+deleted documents. Top-k queries use WAND: documents whose summed
+per-term score upper bounds cannot beat the current k-th best are
+skipped without being scored.
+"""
+
+import heapq
+import itertools
+import math
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from somaai.modules.knowledge import segments
+from somaai.modules.knowledge.postings import decode_postings, encode_postings
+from somaai.modules.knowledge.tokenize import tokenize
+from somaai.modules.knowledge.vectorstore import (
+    PartitionKey,
+    partition_key,
+    validate_filters,
+)
+from somaai.settings import Settings
+
+# Breaks score ties in the result heap so segments are never compared.
+_tiebreak = itertools.count()
+
+
+class _Segment:
+    """Immutable block of documents from one partition.
+
+    Only the ``deleted`` bitmap changes after construction.
+    """
+
+    def __init__(
+        self,
+        key: PartitionKey,
+        arrays: dict[str, np.ndarray],
+        doc_ids: list[str],
+        metadatas: list[dict],
+    ) -> None:
+        self.key = key
+        self.terms = arrays["terms"]
+        self.term_offsets = arrays["term_offsets"]
+        self.postings = arrays["postings"]
+        self.doc_freqs = arrays["doc_freqs"]
+        self.max_tfs = arrays["max_tfs"]
+        self.min_lengths = arrays["min_lengths"]
+        self.lengths = arrays["lengths"]
+        self.deleted = arrays["deleted"]
+        self.text_data = arrays["text_data"]
+        self.text_offsets = arrays["text_offsets"]
+        self.texts = segments.MappedTexts(self.text_data, self.text_offsets)
+        self.doc_ids = doc_ids
+        self.metadatas = metadatas
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @property
+    def arrays(self) -> dict[str, np.ndarray]:
+        return {
+            "terms": self.terms,
+            "term_offsets": self.term_offsets,
+            "postings": self.postings,
+            "doc_freqs": self.doc_freqs,
+            "max_tfs": self.max_tfs,
+            "min_lengths": self.min_lengths,
+            "lengths": self.lengths,
+            "deleted": self.deleted,
+            "text_data": self.text_data,
+            "text_offsets": self.text_offsets,
+        }
+
+    @classmethod
+    def build(
+        cls,
+        key: PartitionKey,
+        doc_ids: list[str],
+        texts: list[str],
+        metadatas: list[dict],
+        term_freqs: list[Counter] | None = None,
+    ) -> "_Segment":
+        """Build a segment from raw documents."""
+        term_freqs = term_freqs or [Counter(tokenize(text)) for text in texts]
+        postings: dict[str, tuple[list[int], list[int]]] = defaultdict(lambda: ([], []))
+        for doc, counts in enumerate(term_freqs):
+            for term, tf in counts.items():
+                docs, tfs = postings[term]
+                docs.append(doc)
+                tfs.append(tf)
+
+        lengths = np.array([sum(c.values()) for c in term_freqs], dtype=np.int32)
+        return cls._from_postings(key, postings, lengths, doc_ids, texts, metadatas)
+
+    @classmethod
+    def merge(cls, key: PartitionKey, parts: list["_Segment"]) -> "_Segment":
+        """Merge segments into one, dropping deleted documents."""
+        remaps = []
+        doc_ids: list[str] = []
+        texts: list[str] = []
+        metadatas: list[dict] = []
+        lengths = []
+        for seg in parts:
+            live = np.flatnonzero(~seg.deleted)
+            remap = np.full(len(seg), -1, dtype=np.int64)
+            remap[live] = np.arange(len(doc_ids), len(doc_ids) + len(live))
+            remaps.append(remap)
+            rows = live.tolist()
+            doc_ids.extend(seg.doc_ids[i] for i in rows)
+            texts.extend(seg.texts[i] for i in rows)
+            metadatas.extend(seg.metadatas[i] for i in rows)
+            lengths.append(seg.lengths[live])
+
+        postings: dict[str, tuple[list[int], list[int]]] = {}
+        vocabulary = sorted(set().union(*(seg.terms.tolist() for seg in parts)))
+        for term in vocabulary:
+            docs, tfs = [], []
+            for seg, remap in zip(parts, remaps):
+                i = seg.lookup(term)
+                if i < 0:
+                    continue
+                seg_docs, seg_tfs = seg.term_postings(i)
+                mapped = remap[seg_docs]
+                keep = mapped >= 0
+                docs.extend(mapped[keep].tolist())
+                tfs.extend(seg_tfs[keep].tolist())
+            if docs:
+                postings[term] = (docs, tfs)
+
+        all_lengths = (
+            np.concatenate(lengths).astype(np.int32)
+            if lengths
+            else np.empty(0, dtype=np.int32)
+        )
+        return cls._from_postings(key, postings, all_lengths, doc_ids, texts, metadatas)
+
+    @classmethod
+    def _from_postings(
+        cls,
+        key: PartitionKey,
+        postings: dict[str, tuple[list[int], list[int]]],
+        lengths: np.ndarray,
+        doc_ids: list[str],
+        texts: list[str],
+        metadatas: list[dict],
+    ) -> "_Segment":
+        terms = sorted(postings)
+        blobs = []
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        doc_freqs = np.zeros(len(terms), dtype=np.int32)
+        max_tfs = np.zeros(len(terms), dtype=np.int32)
+        min_lengths = np.zeros(len(terms), dtype=np.int32)
+        for i, term in enumerate(terms):
+            docs, tfs = postings[term]
+            blob = encode_postings(np.asarray(docs), np.asarray(tfs))
+            blobs.append(blob)
+            offsets[i + 1] = offsets[i] + len(blob)
+            doc_freqs[i] = len(docs)
+            max_tfs[i] = max(tfs)
+            min_lengths[i] = lengths[docs].min()
+
+        arrays = {
+            "terms": np.array(terms, dtype=str),
+            "term_offsets": offsets,
+            "postings": np.concatenate(blobs) if blobs else np.empty(0, np.uint8),
+            "doc_freqs": doc_freqs,
+            "max_tfs": max_tfs,
+            "min_lengths": min_lengths,
+            "lengths": lengths,
+            "deleted": np.zeros(len(doc_ids), dtype=bool),
+            **segments.encode_texts(texts),
+        }
+        return cls(key, arrays, list(doc_ids), list(metadatas))
+
+    def lookup(self, term: str) -> int:
+        """Index of a term in the dictionary, or -1."""
+        i = int(np.searchsorted(self.terms, term))
+        return i if i < len(self.terms) and self.terms[i] == term else -1
+
+    def term_postings(self, i: int) -> tuple[np.ndarray, np.ndarray]:
+        """Decoded (doc numbers, term frequencies) for dictionary entry i."""
+        return decode_postings(
+            self.postings[self.term_offsets[i] : self.term_offsets[i + 1]]
+        )
+
+
+class _Cursor:
+    """Position in one decoded posting list during WAND."""
+
+    __slots__ = ("docs", "tfs", "pos", "idf", "upper_bound")
+
+    def __init__(self, docs: list[int], tfs: list[int], idf: float, ub: float):
+        self.docs = docs
+        self.tfs = tfs
+        self.pos = 0
+        self.idf = idf
+        self.upper_bound = ub
+
+    @property
+    def doc(self) -> int:
+        return self.docs[self.pos]
+
+
+class BM25Index:
+    """Segmented, compressed inverted index scored with Okapi BM25.
+
+    Catches exact curriculum terms (names, formulas, Kinyarwanda
+    vocabulary) that embeddings tend to blur. Results use the same dict
+    shape as ``VectorStore.search`` and honour the same grade/subject
+    filters.
+    """
+
+    def __init__(
+        self,
+        k1: float = 1.2,
+        b: float = 0.75,
+        merge_factor: int = 8,
+    ) -> None:
+        """Initialize index.
+
+        Args:
+            k1: Term frequency saturation
+            b: Document length normalisation strength
+            merge_factor: Segments per partition before a merge
+        """
+        self.k1 = k1
+        self.b = b
+        self.merge_factor = merge_factor
+        self.read_only = False
+        self.root: Path | None = None
+        self.segment: str | None = None
+        self._lock = threading.Lock()
+        self._segments: dict[PartitionKey, list[_Segment]] = defaultdict(list)
+        self._locations: dict[str, tuple[_Segment, int]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        """Number of live documents."""
+        return len(self._locations)
+
+    @property
+    def segment_count(self) -> int:
+        """Number of segments across all partitions."""
+        return sum(len(segs) for segs in self._segments.values())
+
+    def add(
+        self,
+        texts: list[str],
+        ids: list[str],
+        metadatas: list[dict] | None = None,
+    ) -> None:
+        """Index documents as new segments (re-adding an ID replaces it)."""
+        self._check_writable()
+        metadatas = metadatas or [{} for _ in texts]
+        groups: dict[PartitionKey, list[int]] = defaultdict(list)
+        for i, metadata in enumerate(metadatas):
+            groups[partition_key(metadata)].append(i)
+
+        term_freqs = [Counter(tokenize(text)) for text in texts]
+        with self._lock:
+            self._remove_all(ids)
+            for key, rows in groups.items():
+                segment = _Segment.build(
+                    key,
+                    [ids[i] for i in rows],
+                    [texts[i] for i in rows],
+                    [metadatas[i] for i in rows],
+                    [term_freqs[i] for i in rows],
+                )
+                self._attach(segment)
+                self._maybe_merge(key)
+
+    def delete(self, ids: list[str]) -> None:
+        """Remove documents (tombstoned until their segment is merged)."""
+        self._check_writable()
+        with self._lock:
+            self._remove_all(ids)
+
+    def compact(self) -> None:
+        """Merge every partition down to a single segment."""
+        self._check_writable()
+        with self._lock:
+            for key, segs in list(self._segments.items()):
+                if len(segs) > 1 or any(seg.deleted.any() for seg in segs):
+                    self._replace(key, segs, _Segment.merge(key, segs))
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        filters: dict | None = None,
+    ) -> list[dict]:
+        """Return the top_k documents by BM25 score, best first."""
+        validate_filters(filters)
+        wanted = partition_key(filters or {})
+        terms = sorted(set(tokenize(query)))
+
+        with self._lock:
+            n_docs = len(self._locations)
+            if not n_docs or not terms or top_k <= 0:
+                return []
+            avg_length = self._total_length / n_docs
+            idfs = self._idfs(terms, n_docs)
+
+            heap: list[tuple[float, int, _Segment, int]] = []
+            for key, segs in self._segments.items():
+                if all(w is None or w == k for w, k in zip(wanted, key)):
+                    for seg in segs:
+                        self._wand(seg, idfs, top_k, avg_length, heap)
+
+            best = sorted(heap, key=lambda item: item[0], reverse=True)
+            return [
+                {
+                    "id": seg.doc_ids[doc],
+                    "content": seg.texts[doc],
+                    "score": score,
+                    "metadata": seg.metadatas[doc],
+                }
+                for score, _, seg, doc in best
+            ]
+
+    def save(self, root: str | Path, keep_segments: int = 2) -> str:
+        """Publish the index as an on-disk segment set (see ``segments``).
+
+        Returns:
+            Name of the published snapshot
+        """
+        build_dir = segments.create_segment_dir(root)
+        manifest: dict = {"k1": self.k1, "b": self.b, "segments": []}
+        with self._lock:
+            for i, seg in enumerate(
+                seg for segs in self._segments.values() for seg in segs
+            ):
+                segments.save_arrays(build_dir / f"segment-{i}", seg.arrays)
+                manifest["segments"].append(
+                    {
+                        "key": list(seg.key),
+                        "dir": f"segment-{i}",
+                        "doc_ids": seg.doc_ids,
+                        "metadatas": seg.metadatas,
+                    }
+                )
+        segments.write_manifest(build_dir, manifest)
+        name = segments.publish_segment(root, build_dir)
+        segments.remove_stale_segments(root, keep=keep_segments)
+        return name
+
+    @classmethod
+    def open(cls, root: str | Path, writable: bool = False) -> "BM25Index":
+        """Open the current snapshot under ``root``, memory-mapped unless writable.
+
+        Raises:
+            FileNotFoundError: If nothing has been published
+        """
+        name = segments.current_segment(root)
+        if name is None:
+            raise FileNotFoundError(f"No published lexical index under {root}")
+
+        directory = segments.segment_path(root, name)
+        manifest = segments.read_manifest(directory)
+        index = cls(k1=manifest["k1"], b=manifest["b"])
+        index.read_only = not writable
+        for entry in manifest["segments"]:
+            arrays = segments.load_arrays(directory / entry["dir"], mmap=not writable)
+            seg = _Segment(
+                tuple(entry["key"]), arrays, entry["doc_ids"], entry["metadatas"]
+            )
+            index._attach(seg)
+        index.root = Path(root)
+        index.segment = name
+        return index
+
+    def refresh(self) -> bool:
+        """Swap in the newest published snapshot if it changed.
+
+        Returns:
+            True if a new snapshot was loaded
+        """
+        if self.root is None or segments.current_segment(self.root) == self.segment:
+            return False
+
+        fresh = BM25Index.open(self.root, writable=not self.read_only)
+        with self._lock:
+            self.k1 = fresh.k1
+            self.b = fresh.b
+            self._segments = fresh._segments
+            self._locations = fresh._locations
+            self._total_length = fresh._total_length
+            self.segment = fresh.segment
+        return True
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise RuntimeError(
+                "Lexical index is a read-only mapped snapshot; "
+                "open it with writable=True to modify it"
+            )
+
+    def _idfs(self, terms: list[str], n_docs: int) -> dict[str, float]:
+        doc_freq: dict[str, int] = defaultdict(int)
+        for segs in self._segments.values():
+            for seg in segs:
+                for term in terms:
+                    i = seg.lookup(term)
+                    if i >= 0:
+                        doc_freq[term] += int(seg.doc_freqs[i])
+        # Tombstoned docs still count towards df until merged; clamp so
+        # idf stays positive.
+        return {
+            term: math.log(1 + (n_docs - min(df, n_docs) + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    def _term_score(self, tf: float, length: float, avg_length: float) -> float:
+        norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+        return tf * (self.k1 + 1) / (tf + norm)
+
+    def _wand(
+        self,
+        seg: _Segment,
+        idfs: dict[str, float],
+        top_k: int,
+        avg_length: float,
+        heap: list,
+    ) -> None:
+        """Add the segment's best documents to a shared top-k min-heap."""
+        cursors = []
+        for term, idf in idfs.items():
+            i = seg.lookup(term)
+            if i < 0:
+                continue
+            docs, tfs = seg.term_postings(i)
+            bound = idf * self._term_score(
+                float(seg.max_tfs[i]), float(seg.min_lengths[i]), avg_length
+            )
+            cursors.append(_Cursor(docs.tolist(), tfs.tolist(), idf, bound))
+
+        threshold = heap[0][0] if len(heap) >= top_k else 0.0
+        while cursors:
+            cursors.sort(key=lambda c: c.doc)
+
+            # Pivot: first cursor where the summed upper bounds beat the
+            # threshold. Docs before the pivot doc cannot make the top k.
+            bound = 0.0
+            pivot = -1
+            for i, cursor in enumerate(cursors):
+                bound += cursor.upper_bound
+                if bound > threshold:
+                    pivot = i
+                    break
+            if pivot < 0:
+                return
+            pivot_doc = cursors[pivot].doc
+
+            if cursors[0].doc == pivot_doc:
+                length = float(seg.lengths[pivot_doc])
+                score = 0.0
+                for cursor in cursors:
+                    if cursor.doc != pivot_doc:
+                        break
+                    tf = cursor.tfs[cursor.pos]
+                    score += cursor.idf * self._term_score(tf, length, avg_length)
+                    cursor.pos += 1
+                if not seg.deleted[pivot_doc] and score > threshold:
+                    entry = (score, next(_tiebreak), seg, pivot_doc)
+                    if len(heap) < top_k:
+                        heapq.heappush(heap, entry)
+                    else:
+                        heapq.heapreplace(heap, entry)
+                    if len(heap) >= top_k:
+                        threshold = heap[0][0]
+            else:
+                for cursor in cursors[:pivot]:
+                    cursor.pos = bisect_left(cursor.docs, pivot_doc, cursor.pos)
+
+            cursors = [c for c in cursors if c.pos < len(c.docs)]
+
+    def _attach(self, seg: _Segment) -> None:
+        self._segments[seg.key].append(seg)
+        for doc, doc_id in enumerate(seg.doc_ids):
+            if not seg.deleted[doc]:
+                self._locations[doc_id] = (seg, doc)
+                self._total_length += int(seg.lengths[doc])
+
+    def _replace(self, key: PartitionKey, old: list[_Segment], new: _Segment) -> None:
+        self._segments[key] = [seg for seg in self._segments[key] if seg not in old]
+        for doc_id in new.doc_ids:
+            seg, doc = self._locations.pop(doc_id)
+            self._total_length -= int(seg.lengths[doc])
+        self._attach(new)
+
+    def _maybe_merge(self, key: PartitionKey) -> None:
+        segs = self._segments[key]
+        if len(segs) <= self.merge_factor:
+            return
+        smallest = sorted(segs, key=len)[: self.merge_factor]
+        self._replace(key, smallest, _Segment.merge(key, smallest))
+
+    def _remove_all(self, ids: list[str]) -> None:
+        for doc_id in ids:
+            location = self._locations.pop(doc_id, None)
+            if location is None:
+                continue
+            seg, doc = location
+            seg.deleted[doc] = True
+            self._total_length -= int(seg.lengths[doc])
+
+
+def get_lexical_index(settings: Settings) -> BM25Index | None:
+    """Return the published BM25 index, or None without a lexical index path."""
+    path = settings.lexical_index_path
+    if not path:
+        return None
+    if segments.current_segment(path):
+        return BM25Index.open(path)
+    # Serve an empty read-only index until the ingest side publishes one.
+    index = BM25Index()
+    index.root = Path(path)
+    index.read_only = True
+    return index
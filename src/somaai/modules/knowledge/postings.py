@@ -0,0 +1,67 @@
+"""Compressed posting lists.
+
+A posting list for one term is the sorted doc numbers containing it plus
+the term frequency in each. It is stored as::
+
+    varint(doc gap)... varint(tf)...
+
+Doc numbers are delta-encoded (gaps between consecutive docs) so most
+values fit in one byte, then written as LEB128 varints: seven payload
+bits per byte, high bit set on every byte except the last of a value.
+Encoding and decoding are vectorised with NumPy.
+"""
+
+import numpy as np
+
+_PAYLOAD = np.uint64(0x7F)
+_CONTINUE = np.uint8(0x80)
+
+
+def encode_varints(values: np.ndarray) -> np.ndarray:
+    """Encode non-negative integers as a LEB128 byte array."""
+    values = np.asarray(values, dtype=np.uint64)
+    if len(values) == 0:
+        return np.empty(0, dtype=np.uint8)
+
+    n_bytes = np.ones(len(values), dtype=np.int64)
+    for shift in range(7, 64, 7):
+        n_bytes += values >= np.uint64(1 << shift)
+
+    owner = np.repeat(np.arange(len(values)), n_bytes)
+    starts = np.cumsum(n_bytes) - n_bytes
+    position = np.arange(len(owner)) - starts[owner]
+
+    shifted = values[owner] >> (np.uint64(7) * position.astype(np.uint64))
+    out = (shifted & _PAYLOAD).astype(np.uint8)
+    out[position < n_bytes[owner] - 1] |= _CONTINUE
+    return out
+
+
+def decode_varints(data: np.ndarray) -> np.ndarray:
+    """Decode a LEB128 byte array back to uint64 integers."""
+    data = np.asarray(data, dtype=np.uint8)
+    if len(data) == 0:
+        return np.empty(0, dtype=np.uint64)
+
+    ends = np.flatnonzero(data < _CONTINUE)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    owner = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    position = np.arange(len(data)) - starts[owner]
+
+    payload = (data & np.uint8(0x7F)).astype(np.uint64)
+    parts = payload << (np.uint64(7) * position.astype(np.uint64))
+    return np.add.reduceat(parts, starts)
+
+
+def encode_postings(docs: np.ndarray, tfs: np.ndarray) -> np.ndarray:
+    """Encode sorted doc numbers and their term frequencies."""
+    docs = np.asarray(docs, dtype=np.int64)
+    gaps = np.diff(docs, prepend=0)
+    return encode_varints(np.concatenate([gaps, np.asarray(tfs, dtype=np.int64)]))
+
+
+def decode_postings(data: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Decode a posting list into (doc numbers, term frequencies)."""
+    values = decode_varints(data).astype(np.int64)
+    half = len(values) // 2
+    return np.cumsum(values[:half]), values[half:]
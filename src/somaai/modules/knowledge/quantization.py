@@ -0,0 +1,239 @@
+"""Vector quantization for compact embedding storage.
+
+Two codecs are provided:
+
+- ``ScalarQuantizer``: one signed byte per dimension (4x smaller than
+  float32).
+- ``ProductQuantizer``: splits vectors into sub-vectors and stores one
+  byte per sub-vector, the index of the nearest k-means centroid
+  (e.g. 768 dims / 8 dims per sub-vector = 96 bytes, 32x smaller).
+
+Both score a float query against stored codes without decoding them:
+``prepare()`` turns the query into a per-query state once, then
+``similarities()`` computes inner products against any number of codes.
+"""
+
+import numpy as np
+
+
+class ScalarQuantizer:
+    """Symmetric per-dimension int8 quantizer.
+
+    Without training the scale assumes unit-normalised vectors (every
+    component in [-1, 1]); ``fit`` tightens it to the observed range,
+    which improves precision for typical embeddings.
+    """
+
+    kind = "int8"
+
+    def __init__(self, dim: int) -> None:
+        """Initialize quantizer.
+
+        Args:
+            dim: Vector dimension
+        """
+        self.dim = dim
+        self.scale = np.full(dim, 1.0 / 127.0, dtype=np.float32)
+
+    @property
+    def is_trained(self) -> bool:
+        """Scalar quantization works untrained."""
+        return True
+
+    @property
+    def code_size(self) -> int:
+        """Bytes per encoded vector."""
+        return self.dim
+
+    def fit(self, vectors: np.ndarray) -> "ScalarQuantizer":
+        """Fit per-dimension scales to the absolute max of a sample."""
+        max_abs = np.abs(np.asarray(vectors, dtype=np.float32)).max(axis=0)
+        self.scale = np.where(max_abs > 0, max_abs / 127.0, 1.0 / 127.0).astype(
+            np.float32
+        )
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Encode float vectors of shape (n, dim) to int8 codes."""
+        codes = np.rint(np.asarray(vectors, dtype=np.float32) / self.scale)
+        return np.clip(codes, -127, 127).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Reconstruct approximate float vectors from codes."""
+        return codes.astype(np.float32) * self.scale
+
+    def prepare(self, query: np.ndarray) -> np.ndarray:
+        """Fold the scales into the query so scoring is one matmul."""
+        return np.asarray(query, dtype=np.float32) * self.scale
+
+    def similarities(self, state: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Approximate inner products between a prepared query and codes."""
+        return codes.astype(np.float32) @ state
+
+    def state_dict(self) -> dict[str, np.ndarray]:
+        """Arrays needed to rebuild this quantizer."""
+        return {"scale": self.scale}
+
+    @classmethod
+    def from_state(cls, state: dict[str, np.ndarray]) -> "ScalarQuantizer":
+        """Rebuild a quantizer from ``state_dict`` output."""
+        quantizer = cls(dim=len(state["scale"]))
+        quantizer.scale = np.asarray(state["scale"], dtype=np.float32)
+        return quantizer
+
+
+class ProductQuantizer:
+    """Product quantizer with 256 centroids per sub-space (uint8 codes).
+
+    Must be trained with ``fit`` on a representative sample before
+    encoding. Scoring uses asymmetric distance computation: the query
+    stays in float and is compared against centroid lookup tables.
+    """
+
+    kind = "pq"
+
+    def __init__(
+        self,
+        dim: int,
+        n_subvectors: int = 96,
+        n_centroids: int = 256,
+        seed: int | None = 0,
+    ) -> None:
+        """Initialize quantizer.
+
+        Args:
+            dim: Vector dimension (must be divisible by n_subvectors)
+            n_subvectors: Number of sub-spaces (= bytes per vector)
+            n_centroids: Centroids per sub-space (max 256)
+            seed: Seed for k-means initialisation
+        """
+        if dim % n_subvectors:
+            raise ValueError(
+                f"dim ({dim}) must be divisible by n_subvectors ({n_subvectors})"
+            )
+        if not 1 <= n_centroids <= 256:
+            raise ValueError("n_centroids must be between 1 and 256")
+
+        self.dim = dim
+        self.n_subvectors = n_subvectors
+        self.n_centroids = n_centroids
+        self.sub_dim = dim // n_subvectors
+        self.seed = seed
+        self.centroids: np.ndarray | None = None  # (n_sub, n_centroids, sub_dim)
+
+    @property
+    def is_trained(self) -> bool:
+        """True once centroids have been fitted."""
+        return self.centroids is not None
+
+    @property
+    def code_size(self) -> int:
+        """Bytes per encoded vector."""
+        return self.n_subvectors
+
+    def fit(self, vectors: np.ndarray, n_iter: int = 20) -> "ProductQuantizer":
+        """Run k-means independently in every sub-space."""
+        data = np.asarray(vectors, dtype=np.float32)
+        if len(data) < self.n_centroids:
+            raise ValueError(
+                f"Need at least {self.n_centroids} training vectors, got {len(data)}"
+            )
+
+        rng = np.random.default_rng(self.seed)
+        subs = data.reshape(len(data), self.n_subvectors, self.sub_dim)
+        centroids = np.empty(
+            (self.n_subvectors, self.n_centroids, self.sub_dim), dtype=np.float32
+        )
+        for j in range(self.n_subvectors):
+            centroids[j] = _kmeans(subs[:, j, :], self.n_centroids, n_iter, rng)
+
+        self.centroids = centroids
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Encode float vectors of shape (n, dim) to uint8 codes."""
+        centroids = self._require_trained()
+        data = np.asarray(vectors, dtype=np.float32)
+        subs = data.reshape(len(data), self.n_subvectors, self.sub_dim)
+        codes = np.empty((len(data), self.n_subvectors), dtype=np.uint8)
+        for j in range(self.n_subvectors):
+            codes[:, j] = _nearest(subs[:, j, :], centroids[j])
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Reconstruct approximate float vectors from codes."""
+        centroids = self._require_trained()
+        parts = centroids[np.arange(self.n_subvectors), codes]
+        return parts.reshape(len(codes), self.dim)
+
+    def prepare(self, query: np.ndarray) -> np.ndarray:
+        """Build the (n_subvectors, n_centroids) inner-product lookup table."""
+        centroids = self._require_trained()
+        q = np.asarray(query, dtype=np.float32).reshape(self.n_subvectors, 1, -1)
+        return (centroids * q).sum(axis=2)
+
+    def similarities(self, state: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Approximate inner products via table lookups."""
+        return state[np.arange(self.n_subvectors), codes].sum(axis=1)
+
+    def state_dict(self) -> dict[str, np.ndarray]:
+        """Arrays needed to rebuild this quantizer."""
+        return {"centroids": self._require_trained()}
+
+    @classmethod
+    def from_state(cls, state: dict[str, np.ndarray]) -> "ProductQuantizer":
+        """Rebuild a quantizer from ``state_dict`` output."""
+        centroids = np.asarray(state["centroids"], dtype=np.float32)
+        n_sub, n_centroids, sub_dim = centroids.shape
+        quantizer = cls(
+            dim=n_sub * sub_dim, n_subvectors=n_sub, n_centroids=n_centroids
+        )
+        quantizer.centroids = centroids
+        return quantizer
+
+    def _require_trained(self) -> np.ndarray:
+        if self.centroids is None:
+            raise ValueError("ProductQuantizer must be trained with fit() first")
+        return self.centroids
+
+
+Quantizer = ScalarQuantizer | ProductQuantizer
+
+
+def get_quantizer(kind: str, dim: int, pq_subvectors: int = 96) -> Quantizer | None:
+    """Return a quantizer for a storage mode: none | int8 | pq."""
+    kind = (kind or "none").lower()
+    if kind == "none":
+        return None
+    if kind == "int8":
+        return ScalarQuantizer(dim)
+    if kind == "pq":
+        return ProductQuantizer(dim, n_subvectors=pq_subvectors)
+    raise ValueError(f"Unknown quantization mode: {kind}")
+
+
+def _nearest(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    # argmin ||p - c||^2 == argmin (||c||^2 - 2 p.c)
+    dists = (centroids**2).sum(axis=1) - 2.0 * points @ centroids.T
+    return dists.argmin(axis=1)
+
+
+def _kmeans(
+    points: np.ndarray,
+    k: int,
+    n_iter: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    centroids = points[rng.choice(len(points), size=k, replace=False)].copy()
+    for _ in range(n_iter):
+        assignment = _nearest(points, centroids)
+        counts = np.bincount(assignment, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, points)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Re-seed empty clusters with random points.
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = points[rng.choice(len(points), size=len(empty))]
+    return centroids
@@ -0,0 +1,156 @@
+"""On-disk vector index segments.
+
+A published index lives under a root directory:
+
+    <root>/
+        CURRENT                 # name of the live segment
+        segments/<name>/        # immutable once published
+            manifest.json
+            quantizer/*.npy
+            shard-<i>/*.npy
+
+Arrays are plain ``.npy`` files opened with ``mmap_mode="r"`` so every
+uvicorn worker (and the job worker) maps the same pages from the OS page
+cache instead of holding its own copy. A writer builds a new segment in
+a temporary directory, renames it into place and then atomically
+replaces ``CURRENT``; readers notice the new name and swap over.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from somaai.utils.ids import generate_short_id
+
+CURRENT_FILE = "CURRENT"
+SEGMENTS_DIR = "segments"
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+
+
+def create_segment_dir(root: str | Path) -> Path:
+    """Create a private temporary directory to build a segment in."""
+    segments = Path(root) / SEGMENTS_DIR
+    segments.mkdir(parents=True, exist_ok=True)
+    return Path(tempfile.mkdtemp(prefix=".tmp-", dir=segments))
+
+
+def publish_segment(root: str | Path, build_dir: Path) -> str:
+    """Move a finished segment into place and make it current.
+
+    Both steps are atomic renames, so readers see either the old or the
+    new segment, never a partial one.
+
+    Returns:
+        Name of the published segment
+    """
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{generate_short_id()}"
+    final_dir = Path(root) / SEGMENTS_DIR / name
+    os.chmod(build_dir, 0o755)  # mkdtemp creates it private
+    os.rename(build_dir, final_dir)
+
+    tmp_current = Path(root) / f".{CURRENT_FILE}.{name}"
+    tmp_current.write_text(name)
+    os.replace(tmp_current, Path(root) / CURRENT_FILE)
+    return name
+
+
+def current_segment(root: str | Path) -> str | None:
+    """Return the name of the live segment, or None if nothing is published."""
+    try:
+        return (Path(root) / CURRENT_FILE).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def segment_path(root: str | Path, name: str) -> Path:
+    """Directory of a published segment."""
+    return Path(root) / SEGMENTS_DIR / name
+
+
+def remove_stale_segments(root: str | Path, keep: int = 2) -> list[str]:
+    """Delete old segments, keeping the newest ``keep`` and the current one.
+
+    Workers that still map a removed segment keep working (the files
+    stay alive until unmapped) but should refresh soon after.
+
+    Returns:
+        Names of removed segments
+    """
+    segments = Path(root) / SEGMENTS_DIR
+    if not segments.exists():
+        return []
+
+    live = current_segment(root)
+    names = sorted(
+        p.name for p in segments.iterdir() if p.is_dir() and not p.name.startswith(".")
+    )
+    candidates = names[:-keep] if keep else names
+    stale = [name for name in candidates if name != live]
+    for name in stale:
+        shutil.rmtree(segments / name, ignore_errors=True)
+    return stale
+
+
+def save_arrays(directory: Path, arrays: dict[str, np.ndarray]) -> None:
+    """Write each array as ``<directory>/<name>.npy``."""
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(directory / f"{name}.npy", np.ascontiguousarray(array))
+
+
+def load_arrays(directory: Path, mmap: bool = True) -> dict[str, np.ndarray]:
+    """Load every ``.npy`` file in a directory, memory-mapped by default."""
+    arrays = {}
+    for path in sorted(directory.glob("*.npy")):
+        try:
+            arrays[path.stem] = np.load(path, mmap_mode="r" if mmap else None)
+        except ValueError:
+            # Empty arrays cannot be mapped.
+            arrays[path.stem] = np.load(path)
+    return arrays
+
+
+def write_manifest(directory: Path, manifest: dict) -> None:
+    """Write the segment manifest."""
+    manifest = {"format": FORMAT_VERSION, **manifest}
+    (directory / MANIFEST_FILE).write_text(json.dumps(manifest))
+
+
+def read_manifest(directory: Path) -> dict:
+    """Read and validate a segment manifest."""
+    manifest = json.loads((directory / MANIFEST_FILE).read_text())
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported segment format {manifest.get('format')} in {directory}"
+        )
+    return manifest
+
+
+def encode_texts(texts: list[str]) -> dict[str, np.ndarray]:
+    """Pack strings into one UTF-8 byte array plus offsets."""
+    encoded = [text.encode("utf-8") for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return {"text_data": data, "text_offsets": offsets}
+
+
+class MappedTexts:
+    """Read-only sequence of strings backed by (mapped) byte arrays."""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray) -> None:
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return self._data[start:end].tobytes().decode("utf-8")
@@ -0,0 +1,444 @@
+"""In-process HNSW vector store implementation."""
+
+import asyncio
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from somaai.modules.knowledge import segments
+from somaai.modules.knowledge.hnsw import HNSWIndex
+from somaai.modules.knowledge.quantization import (
+    ProductQuantizer,
+    ScalarQuantizer,
+    get_quantizer,
+)
+from somaai.modules.knowledge.vectorstore import (
+    PartitionKey,
+    VectorStore,
+    partition_key,
+    validate_filters,
+)
+from somaai.utils.ids import generate_id
+
+
+class _Shard:
+    """One HNSW graph plus the documents stored in it."""
+
+    def __init__(self, index: HNSWIndex) -> None:
+        self.index = index
+        self.ids: list[str] = []
+        self.texts: list[str] | segments.MappedTexts = []
+        self.metadatas: list[dict] = []
+
+    def to_result(self, label: int, score: float) -> dict:
+        return {
+            "id": self.ids[label],
+            "content": self.texts[label],
+            "score": score,
+            "metadata": self.metadatas[label],
+        }
+
+
+class HNSWStore(VectorStore):
+    """HNSW vector store living inside the app process.
+
+    Avoids a network hop per query and lets small deployments run
+    retrieval without Qdrant. Documents are partitioned into one graph
+    per (grade, subject) taken from their metadata, so a filtered query
+    only walks the matching shard instead of the whole corpus.
+
+    With ``quantization="int8"`` or ``"pq"`` the graphs are walked over
+    compact codes and the final candidates re-scored with exact floats.
+    PQ codebooks must be trained with ``train_quantizer`` before adding.
+
+    ``save`` publishes the index as an immutable on-disk segment and
+    ``open`` maps it read-only, so several worker processes share one
+    copy of the vectors and graph; ``refresh`` swaps in a newer segment.
+
+    Graph work runs in a worker thread (``asyncio.to_thread``) so it
+    never blocks the event loop. A lock serialises searches against
+    writes; inserts take it once per vector, so searches interleave with
+    a long ingest instead of waiting for all of it.
+    """
+
+    def __init__(
+        self,
+        dim: int = 768,
+        m: int = 16,
+        ef_construction: int = 100,
+        ef_search: int = 64,
+        seed: int | None = None,
+        quantization: str = "none",
+        pq_subvectors: int = 96,
+        rescore: bool = True,
+        exact_batch_threshold: int = 50_000,
+    ) -> None:
+        """Initialize store.
+
+        Args:
+            dim: Embedding dimension
+            m: HNSW graph degree
+            ef_construction: Build-time candidate list size
+            ef_search: Query-time candidate list size
+            seed: Seed for reproducible graphs (tests/benchmarks)
+            quantization: Vector storage mode: none | int8 | pq
+            pq_subvectors: Bytes per vector in PQ mode
+            rescore: Keep float vectors for exact re-scoring
+            exact_batch_threshold: Shards up to this size answer batched
+                queries with one exact matrix multiply
+        """
+        self.dim = dim
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.seed = seed
+        self.rescore = rescore
+        self.exact_batch_threshold = exact_batch_threshold
+        self.quantizer = get_quantizer(quantization, dim, pq_subvectors)
+        self._lock = threading.Lock()
+        self._shards: dict[PartitionKey, _Shard] = {}
+        self._locations: dict[str, tuple[PartitionKey, int]] = {}
+        self.read_only = False
+        self.root: Path | None = None
+        self.segment: str | None = None
+
+    def __len__(self) -> int:
+        """Number of live documents."""
+        return len(self._locations)
+
+    @property
+    def partitions(self) -> list[PartitionKey]:
+        """(grade, subject) keys of the shards that hold documents."""
+        return [key for key, shard in self._shards.items() if len(shard.index)]
+
+    def memory_usage(self) -> dict[str, int]:
+        """Bytes held by vectors, codes and graphs across all shards."""
+        totals = {"vectors": 0, "codes": 0, "graph": 0}
+        for shard in self._shards.values():
+            for name, size in shard.index.memory_usage().items():
+                totals[name] += size
+        return totals
+
+    def train_quantizer(self, embeddings: list[list[float]]) -> None:
+        """Fit the quantizer on a representative sample of embeddings.
+
+        Must be called before the first add in PQ mode; optional (but
+        improves precision) for int8.
+        """
+        self._check_writable()
+        if self.quantizer is None:
+            return
+        if self._shards:
+            raise ValueError("Quantizer must be trained before documents are added")
+        sample = np.asarray(embeddings, dtype=np.float32)
+        sample /= np.maximum(np.linalg.norm(sample, axis=1, keepdims=True), 1e-12)
+        self.quantizer.fit(sample)
+
+    async def add(
+        self,
+        texts: list[str],
+        embeddings: list[list[float]],
+        ids: list[str] | None = None,
+        metadatas: list[dict] | None = None,
+    ) -> None:
+        """Add documents to their shard (upsert by ID)."""
+        self._check_writable()
+        if len(texts) != len(embeddings):
+            raise ValueError("texts and embeddings must have the same length")
+        ids = ids or [generate_id() for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        await asyncio.to_thread(self._add, ids, texts, embeddings, metadatas)
+
+    def _add(
+        self,
+        ids: list[str],
+        texts: list[str],
+        embeddings: list[list[float]],
+        metadatas: list[dict],
+    ) -> None:
+        for doc_id, text, embedding, metadata in zip(ids, texts, embeddings, metadatas):
+            key = partition_key(metadata)
+            with self._lock:
+                self._remove(doc_id)
+                shard = self._shards.get(key) or self._new_shard(key)
+                label = shard.index.add(embedding)
+                shard.ids.append(doc_id)
+                shard.texts.append(text)
+                shard.metadatas.append(metadata)
+                self._locations[doc_id] = (key, label)
+
+    async def search(
+        self,
+        embedding: list[float],
+        top_k: int = 5,
+        filters: dict | None = None,
+    ) -> list[dict]:
+        """Search the matching shards and merge the best results."""
+        validate_filters(filters)
+        return await asyncio.to_thread(self._search, embedding, top_k, filters)
+
+    def _search(
+        self, embedding: list[float], top_k: int, filters: dict | None
+    ) -> list[dict]:
+        results: list[dict] = []
+        with self._lock:
+            for shard in self._matching_shards(filters):
+                labels, scores = shard.index.search(embedding, top_k)
+                results.extend(
+                    shard.to_result(int(label), float(score))
+                    for label, score in zip(labels, scores)
+                )
+        results.sort(key=lambda r: r["score"], reverse=True)
+        return results[:top_k]
+
+    async def search_batch(
+        self,
+        embeddings: list[list[float]],
+        top_k: int = 5,
+        filters: dict | None = None,
+    ) -> list[list[dict]]:
+        """Search many queries, one matrix multiply per (small) shard."""
+        validate_filters(filters)
+        queries = np.asarray(embeddings, dtype=np.float32)
+        return await asyncio.to_thread(self._search_batch, queries, top_k, filters)
+
+    def _search_batch(
+        self, queries: np.ndarray, top_k: int, filters: dict | None
+    ) -> list[list[dict]]:
+        results: list[list[dict]] = [[] for _ in range(len(queries))]
+        with self._lock:
+            for shard in self._matching_shards(filters):
+                hits = shard.index.search_batch(
+                    queries, top_k, exact_threshold=self.exact_batch_threshold
+                )
+                for merged, (labels, scores) in zip(results, hits):
+                    merged.extend(
+                        shard.to_result(int(label), float(score))
+                        for label, score in zip(labels, scores)
+                    )
+        for merged in results:
+            merged.sort(key=lambda r: r["score"], reverse=True)
+            del merged[top_k:]
+        return results
+
+    async def get_embeddings(self, ids: list[str]) -> dict[str, list[float]]:
+        """Fetch stored (normalised) vectors, one gather per shard."""
+        return await asyncio.to_thread(self._get_embeddings, ids)
+
+    def _get_embeddings(self, ids: list[str]) -> dict[str, list[float]]:
+        by_shard: dict[PartitionKey, list[tuple[str, int]]] = defaultdict(list)
+        with self._lock:
+            for doc_id in ids:
+                location = self._locations.get(doc_id)
+                if location is not None:
+                    key, label = location
+                    by_shard[key].append((doc_id, label))
+
+            embeddings = {}
+            for key, entries in by_shard.items():
+                vectors = self._shards[key].index.get_vectors(
+                    [label for _, label in entries]
+                )
+                for (doc_id, _), vector in zip(entries, vectors):
+                    embeddings[doc_id] = vector.tolist()
+        return embeddings
+
+    async def delete(self, ids: list[str]) -> None:
+        """Delete documents (tombstoned in their shard's graph)."""
+        self._check_writable()
+        await asyncio.to_thread(self._delete, ids)
+
+    def _delete(self, ids: list[str]) -> None:
+        with self._lock:
+            for doc_id in ids:
+                self._remove(doc_id)
+
+    def save(self, root: str | Path, keep_segments: int = 2) -> str:
+        """Write the index as a new segment and publish it atomically.
+
+        Holds the store lock while writing, so call it from the ingest
+        side rather than from a serving process.
+
+        Args:
+            root: Index root directory shared with the readers
+            keep_segments: Published segments to keep on disk (older
+                ones are removed once the new one is current)
+
+        Returns:
+            Name of the published segment
+        """
+        build_dir = segments.create_segment_dir(root)
+        manifest: dict = {
+            "dim": self.dim,
+            "m": self.m,
+            "ef_construction": self.ef_construction,
+            "ef_search": self.ef_search,
+            "quantization": self.quantizer.kind if self.quantizer else "none",
+            "rescore": self.rescore,
+            "shards": [],
+        }
+        with self._lock:
+            if self.quantizer is not None and self.quantizer.is_trained:
+                segments.save_arrays(
+                    build_dir / "quantizer", self.quantizer.state_dict()
+                )
+            for i, (key, shard) in enumerate(self._shards.items()):
+                arrays, header = shard.index.to_arrays()
+                texts = [shard.texts[label] for label in range(len(shard.ids))]
+                arrays.update(segments.encode_texts(texts))
+                segments.save_arrays(build_dir / f"shard-{i}", arrays)
+                manifest["shards"].append(
+                    {
+                        "key": list(key),
+                        "dir": f"shard-{i}",
+                        "index": header,
+                        "ids": shard.ids,
+                        "metadatas": shard.metadatas,
+                    }
+                )
+        segments.write_manifest(build_dir, manifest)
+        name = segments.publish_segment(root, build_dir)
+        segments.remove_stale_segments(root, keep=keep_segments)
+        return name
+
+    @classmethod
+    def open(
+        cls,
+        root: str | Path,
+        writable: bool = False,
+        ef_search: int | None = None,
+        exact_batch_threshold: int | None = None,
+    ) -> "HNSWStore":
+        """Open the current segment under ``root``.
+
+        Build-time parameters come from the segment's manifest; the
+        query-time ones can be overridden by the serving configuration.
+
+        Args:
+            root: Index root directory
+            writable: Load arrays into private memory so the store can be
+                modified (e.g. by the ingest worker) instead of mapping
+                them read-only
+            ef_search: Query-time candidate list size (default: as built)
+            exact_batch_threshold: Batched exact-search cut-off (default:
+                the constructor default)
+
+        Raises:
+            FileNotFoundError: If no segment has been published
+        """
+        name = segments.current_segment(root)
+        if name is None:
+            raise FileNotFoundError(f"No published vector index under {root}")
+
+        directory = segments.segment_path(root, name)
+        manifest = segments.read_manifest(directory)
+        store = cls(
+            dim=manifest["dim"],
+            m=manifest["m"],
+            ef_construction=manifest["ef_construction"],
+            ef_search=ef_search or manifest["ef_search"],
+            rescore=manifest["rescore"],
+        )
+        if exact_batch_threshold is not None:
+            store.exact_batch_threshold = exact_batch_threshold
+        store.root = Path(root)
+        store.segment = name
+        store.read_only = not writable
+
+        if manifest["quantization"] != "none":
+            state = segments.load_arrays(directory / "quantizer", mmap=False)
+            store.quantizer = (
+                ScalarQuantizer.from_state(state)
+                if manifest["quantization"] == "int8"
+                else ProductQuantizer.from_state(state)
+            )
+
+        for entry in manifest["shards"]:
+            arrays = segments.load_arrays(directory / entry["dir"], mmap=not writable)
+            key = tuple(entry["key"])
+            shard = _Shard(
+                HNSWIndex.from_arrays(arrays, entry["index"], store.quantizer)
+            )
+            shard.index.ef_search = store.ef_search
+            shard.ids = entry["ids"]
+            shard.metadatas = entry["metadatas"]
+            texts = segments.MappedTexts(arrays["text_data"], arrays["text_offsets"])
+            shard.texts = [texts[i] for i in range(len(texts))] if writable else texts
+            store._shards[key] = shard
+            for label, doc_id in enumerate(shard.ids):
+                if not shard.index.is_deleted(label):
+                    store._locations[doc_id] = (key, label)
+
+        return store
+
+    def refresh(self) -> bool:
+        """Swap in the newest published segment if it changed.
+
+        Returns:
+            True if a new segment was loaded
+        """
+        if self.root is None or segments.current_segment(self.root) == self.segment:
+            return False
+
+        fresh = HNSWStore.open(
+            self.root,
+            writable=not self.read_only,
+            ef_search=self.ef_search,
+            exact_batch_threshold=self.exact_batch_threshold,
+        )
+        with self._lock:
+            self.quantizer = fresh.quantizer
+            self._shards = fresh._shards
+            self._locations = fresh._locations
+            self.segment = fresh.segment
+        return True
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise RuntimeError(
+                "Vector store is a read-only mapped segment; "
+                "open it with writable=True to modify it"
+            )
+
+    def _new_shard(self, key: PartitionKey) -> _Shard:
+        shard = _Shard(
+            HNSWIndex(
+                dim=self.dim,
+                m=self.m,
+                ef_construction=self.ef_construction,
+                ef_search=self.ef_search,
+                seed=self.seed,
+                quantizer=self.quantizer,
+                rescore=self.rescore,
+            )
+        )
+        self._shards[key] = shard
+        return shard
+
+    def _matching_shards(self, filters: dict | None) -> list[_Shard]:
+        if not filters:
+            return list(self._shards.values())
+
+        wanted = partition_key(filters)
+        if None not in wanted:
+            shard = self._shards.get(wanted)
+            return [shard] if shard else []
+
+        return [
+            shard
+            for key, shard in self._shards.items()
+            if all(w is None or w == k for w, k in zip(wanted, key))
+        ]
+
+    def _remove(self, doc_id: str) -> None:
+        location = self._locations.pop(doc_id, None)
+        if location is None:
+            return
+        key, label = location
+        shard = self._shards[key]
+        shard.index.mark_deleted(label)
+        if isinstance(shard.texts, list):  # Mapped segments are read-only.
+            shard.texts[label] = ""
+        shard.metadatas[label] = {}
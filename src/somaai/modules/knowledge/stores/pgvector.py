@@ -6,11 +6,22 @@ from somaai.modules.knowledge.vectorstore import VectorStore
 class PGVectorStore(VectorStore):
     """PGVector store."""
 
-    async def add(self, texts: list[str], embeddings: list[list[float]]) -> None:
+    async def add(
+        self,
+        texts: list[str],
+        embeddings: list[list[float]],
+        ids: list[str] | None = None,
+        metadatas: list[dict] | None = None,
+    ) -> None:
         """Add documents to PGVector."""
         pass
 
-    async def search(self, embedding: list[float], top_k: int = 5) -> list[dict]:
+    async def search(
+        self,
+        embedding: list[float],
+        top_k: int = 5,
+        filters: dict | None = None,
+    ) -> list[dict]:
         """Search PGVector for similar documents."""
         return []
 
@@ -0,0 +1,59 @@
+"""Text tokenization for lexical search.
+
+Curriculum content is English, French and Kinyarwanda, so tokenization:
+
+- folds case and strips accents (``élève`` -> ``eleve``), so queries
+  typed without accents still match;
+- splits elided prefixes joined by apostrophes, both French (``l'eau``,
+  ``qu'il``) and Kinyarwanda (``n'ubuzima``, ``y'u Rwanda``,
+  ``cy'imibare``), keeping the content word;
+- drops very common function words in all three languages.
+"""
+
+import re
+import unicodedata
+
+_APOSTROPHES = str.maketrans({"’": "'", "‘": "'", "`": "'"})
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z0-9]+)*")
+
+# Elided prefixes are at most three letters (l', qu', cy', by', rw', ...).
+_MAX_ELISION = 3
+
+STOPWORDS = frozenset(
+    # English
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were which with what how why when where who".split()
+    # French
+    + "au aux ce ces dans de des du elle en est et il ils la le les leur mais "
+    "ne ou par pas pour que qui sa se ses son sont sur un une".split()
+    # Kinyarwanda
+    + "ari ba bari cya cyangwa iki ibi iyi izi kandi ko ku kuri mu muri na "
+    "naho ni nka uko uyu ubu wa ya yo za".split()
+)
+
+
+def normalize(text: str) -> str:
+    """Lowercase, unify apostrophes and strip diacritics."""
+    decomposed = unicodedata.normalize("NFKD", text.translate(_APOSTROPHES))
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return stripped.lower()
+
+
+def tokenize(text: str, remove_stopwords: bool = True) -> list[str]:
+    """Split text into normalised search terms."""
+    tokens = []
+    for match in _TOKEN_RE.findall(normalize(text)):
+        for part in _split_elisions(match):
+            if remove_stopwords and part in STOPWORDS:
+                continue
+            if len(part) > 1 or part.isdigit():
+                tokens.append(part)
+    return tokens
+
+
+def _split_elisions(token: str) -> list[str]:
+    if "'" not in token:
+        return [token]
+    parts = token.split("'")
+    # Drop short elided prefixes; keep anything word-length.
+    return [p for p in parts[:-1] if len(p) > _MAX_ELISION] + [parts[-1]]
@@ -1,22 +1,183 @@
 """Vector store interface."""
 
+import asyncio
 from abc import ABC, abstractmethod
+from enum import Enum
+from pathlib import Path
+
+from somaai.settings import Settings
+
+# Metadata fields used to partition indexes and filter searches.
+PARTITION_KEYS = ("grade", "subject")
+
+PartitionKey = tuple[str | None, ...]
+
+
+def partition_key(metadata: dict) -> PartitionKey:
+    """Build the (grade, subject) partition key from metadata or filters.
+
+    Enum values (GradeLevel, Subject) are reduced to their string value.
+    Missing fields become None.
+    """
+    key = []
+    for name in PARTITION_KEYS:
+        value = metadata.get(name)
+        if isinstance(value, Enum):
+            value = value.value
+        key.append(None if value is None else str(value))
+    return tuple(key)
+
+
+def validate_filters(filters: dict | None) -> None:
+    """Raise ValueError if filters use a field that is not a partition key."""
+    unknown = set(filters or {}) - set(PARTITION_KEYS)
+    if unknown:
+        raise ValueError(
+            f"Unsupported search filters: {sorted(unknown)}. "
+            f"Supported: {list(PARTITION_KEYS)}"
+        )
 
 
 class VectorStore(ABC):
-    """Abstract vector store interface."""
+    """Abstract vector store interface.
+
+    Search results are dicts with ``id``, ``content``, ``score`` (cosine
+    similarity, higher is better) and ``metadata`` keys.
+
+    Stores are expected to partition documents by ``PARTITION_KEYS`` so
+    a filtered search only scans the matching partition.
+    """
 
     @abstractmethod
-    async def add(self, texts: list[str], embeddings: list[list[float]]) -> None:
-        """Add documents to the store."""
+    async def add(
+        self,
+        texts: list[str],
+        embeddings: list[list[float]],
+        ids: list[str] | None = None,
+        metadatas: list[dict] | None = None,
+    ) -> None:
+        """Add documents to the store.
+
+        Args:
+            texts: Chunk contents
+            embeddings: One embedding per text
+            ids: Optional chunk IDs (generated if omitted); re-adding an
+                existing ID replaces it
+            metadatas: Optional per-chunk metadata (doc_id, grade, ...)
+        """
         pass
 
     @abstractmethod
-    async def search(self, embedding: list[float], top_k: int = 5) -> list[dict]:
-        """Search for similar documents."""
+    async def search(
+        self,
+        embedding: list[float],
+        top_k: int = 5,
+        filters: dict | None = None,
+    ) -> list[dict]:
+        """Search for similar documents.
+
+        Args:
+            embedding: Query embedding
+            top_k: Number of results
+            filters: Optional {"grade": ..., "subject": ...} restriction;
+                either field may be omitted
+
+        Returns:
+            Up to top_k results, best first
+        """
         pass
 
+    async def search_batch(
+        self,
+        embeddings: list[list[float]],
+        top_k: int = 5,
+        filters: dict | None = None,
+    ) -> list[list[dict]]:
+        """Search for many query embeddings in one call.
+
+        Stores should override this with a vectorized scan or a single
+        round trip; the default runs the searches concurrently.
+
+        Returns:
+            One result list per embedding, in input order
+        """
+        return list(
+            await asyncio.gather(
+                *(self.search(e, top_k=top_k, filters=filters) for e in embeddings)
+            )
+        )
+
     @abstractmethod
     async def delete(self, ids: list[str]) -> None:
         """Delete documents from the store."""
         pass
+
+    async def get_embeddings(self, ids: list[str]) -> dict[str, list[float]]:
+        """Fetch stored embeddings by document ID.
+
+        Stores that cannot return vectors leave this as is; callers treat
+        missing IDs as unavailable and skip embedding-based steps.
+
+        Returns:
+            Embedding per ID that was found
+        """
+        return {}
+
+    def refresh(self) -> bool:
+        """Pick up index data published by another process.
+
+        Returns:
+            True if new data was loaded (stores without shared on-disk
+            state never change and return False)
+        """
+        return False
+
+
+def get_vector_store(settings: Settings) -> VectorStore:
+    """Return the configured vector store based on settings.vector_backend."""
+    backend = (settings.vector_backend or "hnsw").lower()
+
+    if backend == "hnsw":
+        from somaai.modules.knowledge import segments
+        from somaai.modules.knowledge.stores.hnsw import HNSWStore
+
+        path = settings.vector_index_path
+        if path and segments.current_segment(path):
+            return HNSWStore.open(
+                path,
+                ef_search=settings.hnsw_ef_search,
+                exact_batch_threshold=settings.vector_exact_batch_threshold,
+            )
+
+        store = HNSWStore(
+            dim=settings.embedding_dimension,
+            m=settings.hnsw_m,
+            ef_construction=settings.hnsw_ef_construction,
+            ef_search=settings.hnsw_ef_search,
+            quantization=settings.vector_quantization,
+            pq_subvectors=settings.vector_pq_subvectors,
+            rescore=settings.vector_rescore,
+            exact_batch_threshold=settings.vector_exact_batch_threshold,
+        )
+        if path:
+            # Serve read-only until the ingest side publishes a segment.
+            store.root = Path(path)
+            store.read_only = True
+        return store
+
+    if backend == "qdrant":
+        from somaai.modules.knowledge.stores.qdrant import QdrantStore
+
+        return QdrantStore()
+
+    if backend == "chroma":
+        from somaai.modules.knowledge.stores.chroma import ChromaStore
+
+        return ChromaStore()
+
+    if backend == "pgvector":
+        from somaai.modules.knowledge.stores.pgvector import PGVectorStore
+
+        return PGVectorStore()
+
+    raise ValueError(f"Unknown VECTOR_BACKEND: {backend}")
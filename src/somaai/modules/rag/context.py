@@ -0,0 +1,162 @@
+"""Token-budgeted context packing.
+
+Retrieved chunks are the bulk of every prompt, so the packer decides
+what reaches ``{context}`` in ``QUERY_PROMPT``:
+
+1. Adjacent chunks of the same document (consecutive ``chunk_index`` or
+   touching page ranges) are merged, dropping the text the chunker
+   repeated in both overlaps.
+2. Chunks are taken in rank order until the model's token budget is
+   spent; the first chunk that does not fit is trimmed into the
+   remaining space if that leaves a useful amount, and packing stops.
+"""
+
+from somaai.settings import Settings
+from somaai.utils.tokens import count_tokens, truncate_tokens
+
+# Context budget (tokens) per model, leaving room for the system prompt,
+# question, conversation history and the answer itself.
+MODEL_CONTEXT_BUDGETS = {
+    "llama3.2": 6000,
+    "llama-3.1-8b-instant": 6000,
+    "llama-3.3-70b-versatile": 6000,
+    "gpt-4o": 12000,
+    "gpt-4o-mini": 12000,
+}
+DEFAULT_CONTEXT_BUDGET = 3000
+
+
+def context_budget(settings: Settings) -> int:
+    """Token budget for retrieved context with the configured model."""
+    if settings.rag_context_tokens is not None:
+        return settings.rag_context_tokens
+    model = {
+        "groq": settings.groq_model,
+        "openai": settings.openai_model,
+        "huggingface": settings.huggingface_model,
+    }.get(settings.llm_backend, "")
+    return MODEL_CONTEXT_BUDGETS.get(model, DEFAULT_CONTEXT_BUDGET)
+
+
+class ContextPacker:
+    """Packs ranked chunks into a token budget."""
+
+    def __init__(
+        self,
+        budget_tokens: int = DEFAULT_CONTEXT_BUDGET,
+        separator: str = "\n\n",
+        min_trim_tokens: int = 64,
+    ) -> None:
+        """Initialize packer.
+
+        Args:
+            budget_tokens: Maximum tokens of packed context
+            separator: Text placed between chunks
+            min_trim_tokens: Smallest trimmed chunk worth including
+        """
+        self.budget_tokens = budget_tokens
+        self.separator = separator
+        self.min_trim_tokens = min_trim_tokens
+
+    def pack(self, documents: list[dict]) -> list[dict]:
+        """Merge and select chunks, best first.
+
+        Returns:
+            Packed chunks, each with a ``tokens`` count. Merged chunks
+            keep the first member's ``id`` and list all of them under
+            ``merged_ids``.
+        """
+        packed: list[dict] = []
+        remaining = self.budget_tokens
+        separator_tokens = count_tokens(self.separator)
+        for doc in merge_adjacent(documents):
+            cost = count_tokens(doc.get("content", ""))
+            if packed:
+                cost += separator_tokens
+            if cost <= remaining:
+                packed.append({**doc, "tokens": cost})
+                remaining -= cost
+                continue
+            if remaining >= self.min_trim_tokens:
+                content = truncate_tokens(
+                    doc.get("content", ""), remaining - separator_tokens
+                )
+                tokens = count_tokens(content)
+                packed.append({**doc, "content": content, "tokens": tokens})
+            break
+        return packed
+
+    def render(self, documents: list[dict]) -> str:
+        """Pack chunks and join them into one context string."""
+        return self.separator.join(doc["content"] for doc in self.pack(documents))
+
+
+def merge_adjacent(documents: list[dict]) -> list[dict]:
+    """Merge neighbouring chunks of the same document.
+
+    A merged chunk takes the rank of its best member; its text is the
+    members in document order with repeated overlaps removed.
+    """
+    groups: list[list[dict]] = []
+    for doc in documents:
+        for group in groups:
+            if any(_adjacent(doc, member) for member in group):
+                group.append(doc)
+                break
+        else:
+            groups.append([doc])
+
+    merged = []
+    for group in groups:
+        if len(group) == 1:
+            merged.append(group[0])
+            continue
+        ordered = sorted(group, key=_position)
+        content = ordered[0].get("content", "")
+        for doc in ordered[1:]:
+            content = _join_overlapping(content, doc.get("content", ""))
+        metadata = dict(group[0].get("metadata", {}))
+        pages = [
+            (m["page_start"], m["page_end"])
+            for m in (d.get("metadata", {}) for d in group)
+            if "page_start" in m and "page_end" in m
+        ]
+        if pages:
+            metadata["page_start"] = min(start for start, _ in pages)
+            metadata["page_end"] = max(end for _, end in pages)
+        merged.append(
+            {
+                **group[0],
+                "content": content,
+                "metadata": metadata,
+                "merged_ids": [d["id"] for d in ordered],
+            }
+        )
+    return merged
+
+
+def _position(doc: dict) -> tuple[int, int]:
+    metadata = doc.get("metadata", {})
+    return metadata.get("page_start", 0), metadata.get("chunk_index", 0)
+
+
+def _adjacent(a: dict, b: dict) -> bool:
+    ma, mb = a.get("metadata", {}), b.get("metadata", {})
+    if ma.get("doc_id") is None or ma.get("doc_id") != mb.get("doc_id"):
+        return False
+    if "chunk_index" in ma and "chunk_index" in mb:
+        return abs(ma["chunk_index"] - mb["chunk_index"]) == 1
+    if "page_start" in ma and "page_start" in mb:
+        return (
+            ma["page_start"] <= mb["page_end"] + 1
+            and mb["page_start"] <= ma["page_end"] + 1
+        )
+    return False
+
+
+def _join_overlapping(left: str, right: str, max_overlap: int = 400) -> str:
+    """Append right to left, dropping the longest suffix/prefix overlap."""
+    for size in range(min(len(left), len(right), max_overlap), 0, -1):
+        if left.endswith(right[:size]):
+            return left + right[size:]
+    return left + " " + right
@@ -0,0 +1,46 @@
+"""Rank fusion for hybrid retrieval."""
+
+
+def reciprocal_rank_fusion(
+    rankings: dict[str, list[dict]],
+    k: int = 60,
+    weights: dict[str, float] | None = None,
+    top_k: int | None = None,
+) -> list[dict]:
+    """Merge ranked result lists with reciprocal rank fusion.
+
+    Each document scores ``sum(weight / (k + rank))`` over the lists it
+    appears in (rank is 1-based), so agreement between retrievers is
+    rewarded without having to calibrate their raw scores.
+
+    Args:
+        rankings: Result lists keyed by source name (e.g. "vector")
+        k: RRF damping constant
+        weights: Optional per-source weights (default 1.0)
+        top_k: Maximum results to return
+
+    Returns:
+        Fused results, best first. ``score`` is the fused score scaled
+        to 0-1 (1.0 = ranked first by every source) and ``ranks`` maps
+        source name to the document's rank in that source.
+    """
+    weights = weights or {}
+    fused: dict[str, dict] = {}
+    scores: dict[str, float] = {}
+
+    for source, results in rankings.items():
+        weight = weights.get(source, 1.0)
+        for rank, doc in enumerate(results, start=1):
+            doc_id = doc["id"]
+            if doc_id not in fused:
+                fused[doc_id] = {**doc, "ranks": {}}
+                scores[doc_id] = 0.0
+            fused[doc_id]["ranks"][source] = rank
+            scores[doc_id] += weight / (k + rank)
+
+    best_possible = sum(weights.get(source, 1.0) for source in rankings) / (k + 1)
+    ordered = sorted(fused, key=lambda doc_id: scores[doc_id], reverse=True)
+    results = [
+        {**fused[doc_id], "score": scores[doc_id] / best_possible} for doc_id in ordered
+    ]
+    return results[:top_k] if top_k is not None else results
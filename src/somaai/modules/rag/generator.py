@@ -1,30 +1,138 @@
 """RAG generator."""
 
+import asyncio
+from dataclasses import dataclass
+
+from somaai.logging_conf import get_logger
+from somaai.modules.rag.prompts import ANALOGY_PROMPT, QUERY_PROMPT, REALWORLD_PROMPT
+from somaai.providers.llm import LLMClient
+
+logger = get_logger(__name__)
+
 
 class BaseGenerator:
     """Abstract base class for RAG context-based generators."""
 
+    prompt = QUERY_PROMPT
+
+    def __init__(self, llm: LLMClient | None = None) -> None:
+        """Initialize generator.
+
+        Args:
+            llm: Client used for generation (generators return "" without one)
+        """
+        self.llm = llm
+
     async def generate(self, query: str, context: list[str]) -> str:
         """Generate a response based on the query and provided context."""
-        pass
+        if self.llm is None:
+            return ""
+        prompt = self.prompt.format(context="\n\n".join(context), question=query)
+        return await self.llm.generate(prompt)
+
+
+class AnswerGenerator(BaseGenerator):
+    """Answers the question directly from context."""
 
 
 class AnalogyGenerator(BaseGenerator):
     """Generates explanations using analogies derived from context."""
 
-    async def generate(self, query: str, context: list[str]) -> str:
-        pass
+    prompt = ANALOGY_PROMPT
 
 
 class RealWorldUseCaseGenerator(BaseGenerator):
     """Generates practical, real-world application scenarios."""
 
-    async def generate(self, query: str, context: list[str]) -> str:
-        pass
+    prompt = REALWORLD_PROMPT
+
+
+@dataclass
+class GeneratedAnswer:
+    """Main answer plus the optional enrichment branches."""
+
+    answer: str
+    analogy: str | None = None
+    realworld_context: str | None = None
 
 
 class CombinedGenerator(BaseGenerator):
-    """Synthesizes multiple generation strategies into a unified response."""
+    """Synthesizes multiple generation strategies into a unified response.
+
+    The answer, analogy and real-world branches share one retrieved
+    context and run concurrently, so enabling both extras costs about
+    one LLM round trip instead of three. Each extra has its own timeout
+    and is dropped (None) if it is slow or fails; only the main answer
+    can fail the request.
+    """
+
+    def __init__(
+        self,
+        llm: LLMClient | None = None,
+        branch_timeout: float | None = 8.0,
+    ) -> None:
+        """Initialize generator.
+
+        Args:
+            llm: Client shared by every branch
+            branch_timeout: Seconds allowed per analogy/real-world branch
+        """
+        super().__init__(llm)
+        self.branch_timeout = branch_timeout
+        self.answer = AnswerGenerator(llm)
+        self.analogy = AnalogyGenerator(llm)
+        self.realworld = RealWorldUseCaseGenerator(llm)
 
     async def generate(self, query: str, context: list[str]) -> str:
-        pass
+        """Generate the main answer."""
+        return await self.answer.generate(query, context)
+
+    async def generate_all(
+        self,
+        query: str,
+        context: list[str],
+        enable_analogy: bool = False,
+        enable_realworld: bool = False,
+    ) -> GeneratedAnswer:
+        """Run the main answer and the enabled extras concurrently.
+
+        If the main answer fails the extras are cancelled rather than
+        left spending LLM calls until their own timeouts.
+        """
+        extras = asyncio.gather(
+            self.branch(self.analogy, query, context, enable_analogy),
+            self.branch(self.realworld, query, context, enable_realworld),
+        )
+        try:
+            answer = await self.answer.generate(query, context)
+        except BaseException:
+            extras.cancel()
+            await asyncio.gather(extras, return_exceptions=True)
+            raise
+        analogy, realworld = await extras
+        return GeneratedAnswer(answer, analogy, realworld)
+
+    async def branch(
+        self,
+        generator: BaseGenerator,
+        query: str,
+        context: list[str],
+        enabled: bool = True,
+    ) -> str | None:
+        """Run one optional branch under its timeout.
+
+        Returns:
+            Generated text, or None if disabled, timed out or failed
+        """
+        if not enabled:
+            return None
+        name = type(generator).__name__
+        try:
+            return await asyncio.wait_for(
+                generator.generate(query, context), timeout=self.branch_timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning("%s timed out after %ss", name, self.branch_timeout)
+        except Exception:
+            logger.exception("%s failed", name)
+        return None
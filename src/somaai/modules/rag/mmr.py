@@ -0,0 +1,51 @@
+"""Maximal marginal relevance selection."""
+
+import numpy as np
+
+
+def mmr_select(
+    relevance: np.ndarray | list[float],
+    embeddings: np.ndarray | list[list[float]],
+    top_k: int,
+    lambda_mult: float = 0.7,
+) -> list[int]:
+    """Pick a relevant but non-redundant subset of candidates.
+
+    Each step takes the candidate maximising
+    ``lambda * relevance - (1 - lambda) * max_sim_to_selected``, where
+    similarity is cosine between candidate embeddings. The pairwise
+    similarity matrix is computed once and the running max similarity
+    is updated with one vector op per pick, so selection is O(n * top_k).
+
+    Args:
+        relevance: Per-candidate relevance, scaled to 0-1 by the caller
+        embeddings: Candidate embeddings (one row per candidate)
+        top_k: Number of candidates to keep
+        lambda_mult: 1.0 ranks by relevance only, 0.0 by diversity only
+
+    Returns:
+        Selected candidate indices in pick order
+    """
+    relevance = np.asarray(relevance, dtype=np.float32)
+    n = len(relevance)
+    if n == 0 or top_k <= 0:
+        return []
+
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.maximum(norms, 1e-12)
+    similarity = vectors @ vectors.T
+
+    selected = [int(np.argmax(relevance))]
+    max_similarity = similarity[selected[0]].copy()
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < min(top_k, n):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+    return selected
@@ -1,20 +1,147 @@
 """RAG pipelines."""
 
-from somaai.modules.rag.generator import CombinedGenerator
+from collections.abc import AsyncIterator
+
+import numpy as np
+
+from somaai.logging_conf import get_logger
+from somaai.modules.rag.context import ContextPacker
+from somaai.modules.rag.generator import CombinedGenerator, GeneratedAnswer
+from somaai.modules.rag.mmr import mmr_select
+from somaai.modules.rag.prompts import QUERY_PROMPT
+from somaai.modules.rag.reranker import Reranker
 from somaai.modules.rag.retriever import Retriever
 
+logger = get_logger(__name__)
+
 
 class RAGPipeline:
     """RAG pipeline."""
 
-    def __init__(self) -> None:
-        """Initialize pipeline."""
-        self.retriever = Retriever()
-        self.generator = CombinedGenerator()
+    def __init__(
+        self,
+        retriever: Retriever | None = None,
+        reranker: Reranker | None = None,
+        context_top_k: int = 6,
+        mmr_lambda: float | None = 0.7,
+        packer: ContextPacker | None = None,
+        generator: CombinedGenerator | None = None,
+    ) -> None:
+        """Initialize pipeline.
 
-    async def run(self, query: str) -> str:
+        Args:
+            retriever: Candidate retriever
+            reranker: Optional rerank stage applied to the candidates
+            context_top_k: Chunks passed to the generator
+            mmr_lambda: MMR relevance/diversity trade-off (None disables
+                MMR and keeps the top chunks as ranked)
+            packer: Fits the chunks into the model's context token budget
+            generator: Answer generator (defaults to one using the
+                retriever's LLM client)
+        """
+        self.retriever = retriever or Retriever()
+        self.reranker = reranker
+        self.context_top_k = context_top_k
+        self.mmr_lambda = mmr_lambda
+        self.packer = packer or ContextPacker()
+        self.generator = generator or CombinedGenerator(self.retriever.llm)
+
+    async def run(
+        self,
+        query: str,
+        grade: str | None = None,
+        subject: str | None = None,
+    ) -> str:
         """Run the RAG pipeline."""
-        documents = await self.retriever.retrieve(query)
-        context = [doc.get("content", "") for doc in documents]
+        documents = await self.prepare(query, grade=grade, subject=subject)
+        context = [doc["content"] for doc in documents]
         response = await self.generator.generate(query, context)
         return response or ""
+
+    async def answer(
+        self,
+        query: str,
+        grade: str | None = None,
+        subject: str | None = None,
+        enable_analogy: bool = False,
+        enable_realworld: bool = False,
+    ) -> tuple[GeneratedAnswer, list[dict]]:
+        """Answer with the enabled extras, sharing one retrieval.
+
+        Returns:
+            Generated answer and the context chunks it was based on
+        """
+        documents = await self.prepare(query, grade=grade, subject=subject)
+        context = [doc["content"] for doc in documents]
+        generated = await self.generator.generate_all(
+            query,
+            context,
+            enable_analogy=enable_analogy,
+            enable_realworld=enable_realworld,
+        )
+        return generated, documents
+
+    async def prepare(
+        self,
+        query: str,
+        grade: str | None = None,
+        subject: str | None = None,
+        embedding: list[float] | None = None,
+    ) -> list[dict]:
+        """Retrieve, rerank, diversify and pack the context chunks."""
+        documents = await self.retriever.retrieve(
+            query, grade=grade, subject=subject, embedding=embedding
+        )
+        if self.reranker is not None and documents:
+            reranked = await self.reranker.rerank(query, documents)
+            logger.info(
+                "Rerank added %.1f ms (%d/%d scored)",
+                reranked.elapsed_ms,
+                reranked.scored,
+                len(documents),
+            )
+            documents = reranked.documents
+        documents = await self.diversify(documents)
+        return self.packer.pack(documents)
+
+    async def stream(self, query: str, documents: list[dict]) -> AsyncIterator[str]:
+        """Stream the answer over prepared chunks, token by token.
+
+        Raises:
+            RuntimeError: If the retriever has no LLM client
+        """
+        if self.retriever.llm is None:
+            raise RuntimeError("Streaming needs a retriever with an LLM client")
+        prompt = QUERY_PROMPT.format(
+            context=self.packer.separator.join(doc["content"] for doc in documents),
+            question=query,
+        )
+        async for token in self.retriever.llm.generate_stream(prompt):
+            yield token
+
+    async def diversify(self, documents: list[dict]) -> list[dict]:
+        """Keep ``context_top_k`` chunks, dropping near-duplicates with MMR.
+
+        Overlapping chunks from the chunker embed almost identically, so
+        MMR over the candidates' stored embeddings replaces them with
+        the next most relevant distinct chunk. Falls back to rank order
+        when the store cannot return embeddings.
+        """
+        if self.mmr_lambda is None or len(documents) <= self.context_top_k:
+            return documents[: self.context_top_k]
+        store = self.retriever.store
+        embeddings = await store.get_embeddings([d["id"] for d in documents])
+        candidates = [d for d in documents if d["id"] in embeddings]
+        if not candidates:
+            return documents[: self.context_top_k]
+
+        # Candidates arrive best first; rank-based relevance works the
+        # same for RRF, cosine and cross-encoder scores.
+        relevance = 1 - np.arange(len(candidates)) / len(candidates)
+        picks = mmr_select(
+            relevance,
+            [embeddings[d["id"]] for d in candidates],
+            top_k=self.context_top_k,
+            lambda_mult=self.mmr_lambda,
+        )
+        return [candidates[i] for i in picks]
@@ -9,3 +9,21 @@ QUERY_PROMPT = """Context: {context}
 Question: {question}
 
 Answer:"""
+
+ANALOGY_PROMPT = """Context: {context}
+
+Question: {question}
+
+Explain the answer with one short analogy from everyday life in Rwanda \
+that a student would recognise. Stay faithful to the context.
+
+Analogy:"""
+
+REALWORLD_PROMPT = """Context: {context}
+
+Question: {question}
+
+Give one short, practical real-world use of this idea, preferably from \
+Rwanda. Stay faithful to the context.
+
+Real-world use:"""
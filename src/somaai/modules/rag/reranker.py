@@ -1,6 +1,237 @@
-"""RAG reranker."""
+"""RAG reranker.
+
+Retrieval candidates are re-scored jointly with the query by a
+cross-encoder, which is far more precise than embedding similarity but
+costs one model call per (query, chunk) pair. Scoring runs in batches on
+the reranker's own small thread pool so the event loop stays free, and
+stops once the per-request latency budget is spent: documents scored so
+far are ordered by their new score and the rest keep their retrieval
+order behind them. Abandoned batches only tie up that pool, never the
+default executor that index searches run on.
+"""
+
+import asyncio
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Protocol
+
+from somaai.logging_conf import get_logger
+from somaai.modules.knowledge.tokenize import tokenize
+from somaai.settings import Settings
+
+try:
+    from sentence_transformers import CrossEncoder as _CrossEncoderModel
+
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+logger = get_logger(__name__)
+
+
+class CrossEncoder(Protocol):
+    """Scores (query, text) pairs; higher is more relevant."""
+
+    def score(self, query: str, texts: list[str]) -> list[float]:
+        """Score each text against the query (called from a worker thread)."""
+        ...
+
+
+class OverlapScorer:
+    """CPU-only scorer from query term coverage and proximity.
+
+    Needs no model, so it runs anywhere and keeps tests deterministic.
+    A text scores higher the more distinct query terms it contains and
+    the closer together they appear.
+    """
+
+    def score(self, query: str, texts: list[str]) -> list[float]:
+        """Score each text against the query."""
+        terms = set(tokenize(query))
+        if not terms:
+            return [0.0 for _ in texts]
+        return [self._score_one(terms, tokenize(text)) for text in texts]
+
+    @staticmethod
+    def _score_one(terms: set[str], tokens: list[str]) -> float:
+        positions = [i for i, token in enumerate(tokens) if token in terms]
+        if not positions:
+            return 0.0
+        matched = {tokens[i] for i in positions}
+        coverage = len(matched) / len(terms)
+
+        # Shortest window holding every matched term.
+        window = len(tokens)
+        counts: dict[str, int] = {}
+        left = 0
+        for right in positions:
+            counts[tokens[right]] = counts.get(tokens[right], 0) + 1
+            while len(counts) == len(matched):
+                window = min(window, right - positions[left] + 1)
+                first = tokens[positions[left]]
+                counts[first] -= 1
+                if not counts[first]:
+                    del counts[first]
+                left += 1
+        proximity = len(matched) / window
+        return coverage + 0.5 * proximity
+
+
+class SentenceTransformerScorer:
+    """Cross-encoder model from ``sentence-transformers``."""
+
+    def __init__(
+        self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    ) -> None:
+        """Load the model.
+
+        Raises:
+            ImportError: If sentence-transformers is not installed
+        """
+        if not SENTENCE_TRANSFORMERS_AVAILABLE:
+            raise ImportError(
+                "sentence-transformers is required for RERANK_BACKEND=cross-encoder"
+            )
+        self.model = _CrossEncoderModel(model_name, device="cpu")
+
+    def score(self, query: str, texts: list[str]) -> list[float]:
+        """Score each text against the query."""
+        return self.model.predict([(query, text) for text in texts]).tolist()
+
+
+@dataclass
+class RerankResult:
+    """Reranked documents plus what the stage cost."""
+
+    documents: list[dict]
+    elapsed_ms: float
+    scored: int
+    complete: bool
+
+
+class Reranker:
+    """Budgeted, batched cross-encoder rerank stage."""
+
+    def __init__(
+        self,
+        scorer: CrossEncoder | None = None,
+        batch_size: int = 16,
+        budget_ms: float = 150.0,
+        executor: Executor | None = None,
+        workers: int = 2,
+    ) -> None:
+        """Initialize reranker.
+
+        Args:
+            scorer: Pair scorer (defaults to ``OverlapScorer``)
+            batch_size: Documents scored per executor call
+            budget_ms: Default latency budget per request
+            executor: Pool to score on (defaults to a private thread pool)
+            workers: Threads in the private pool
+        """
+        self.scorer = scorer or OverlapScorer()
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="rerank"
+        )
+
+    def close(self) -> None:
+        """Stop the private thread pool (a passed-in executor is left alone)."""
+        if self._owns_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def rerank(
+        self,
+        query: str,
+        documents: list[dict],
+        top_k: int | None = None,
+        budget_ms: float | None = None,
+    ) -> RerankResult:
+        """Rerank documents within the latency budget.
+
+        Scored documents gain a ``rerank_score`` key. A batch still running
+        when the budget runs out is abandoned (its thread finishes in the
+        background and the result is dropped).
+        """
+        start = time.perf_counter()
+        budget = self.budget_ms if budget_ms is None else budget_ms
+        deadline = start + budget / 1000
+        loop = asyncio.get_running_loop()
+
+        scores: list[float] = []
+        for offset in range(0, len(documents), self.batch_size):
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            texts = [
+                doc.get("content", "")
+                for doc in documents[offset : offset + self.batch_size]
+            ]
+            try:
+                batch = await asyncio.wait_for(
+                    loop.run_in_executor(
+                        self.executor, self.scorer.score, query, texts
+                    ),
+                    timeout=remaining,
+                )
+            except asyncio.TimeoutError:
+                break
+            scores.extend(batch)
+
+        scored = sorted(
+            (
+                {**doc, "rerank_score": float(score)}
+                for doc, score in zip(documents, scores)
+            ),
+            key=lambda doc: doc["rerank_score"],
+            reverse=True,
+        )
+        ranked = scored + documents[len(scores) :]
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        result = RerankResult(
+            documents=ranked[:top_k] if top_k is not None else ranked,
+            elapsed_ms=elapsed_ms,
+            scored=len(scores),
+            complete=len(scores) == len(documents),
+        )
+        logger.debug(
+            "Reranked %d/%d documents in %.1f ms",
+            result.scored,
+            len(documents),
+            elapsed_ms,
+        )
+        return result
+
+
+def get_reranker(settings: Settings) -> Reranker | None:
+    """Get the rerank stage configured by ``RERANK_BACKEND``.
+
+    Returns:
+        Reranker, or None when reranking is disabled
+    """
+    if settings.rerank_backend == "none":
+        return None
+    if settings.rerank_backend == "overlap":
+        scorer: CrossEncoder = OverlapScorer()
+    elif settings.rerank_backend == "cross-encoder":
+        scorer = SentenceTransformerScorer(settings.rerank_model)
+    else:
+        raise ValueError(f"Unknown rerank backend: {settings.rerank_backend}")
+    return Reranker(
+        scorer,
+        batch_size=settings.rerank_batch_size,
+        budget_ms=settings.rerank_budget_ms,
+        workers=settings.rerank_workers,
+    )
 
 
 async def rerank(query: str, documents: list[dict]) -> list[dict]:
     """Rerank documents based on the query."""
-    pass
+    reranker = Reranker()
+    try:
+        return (await reranker.rerank(query, documents)).documents
+    finally:
+        reranker.close()
@@ -1,9 +1,146 @@
 """RAG retriever."""
 
+import asyncio
+
+from somaai.modules.knowledge.lexical import BM25Index
+from somaai.modules.knowledge.vectorstore import VectorStore
+from somaai.modules.rag.fusion import reciprocal_rank_fusion
+from somaai.providers.llm import LLMClient
+
 
 class Retriever:
-    """Document retriever."""
+    """Hybrid document retriever.
+
+    Embeds the query and searches the vector store, restricted to the
+    caller's grade and subject when given. With a lexical index the BM25
+    search runs concurrently and both rankings are merged with
+    reciprocal rank fusion, which lets the vector side use a smaller
+    ``vector_top_k`` without losing exact-term matches.
+    """
+
+    def __init__(
+        self,
+        store: VectorStore | None = None,
+        llm: LLMClient | None = None,
+        lexical: BM25Index | None = None,
+        vector_top_k: int | None = None,
+        lexical_top_k: int | None = None,
+        rrf_k: int = 60,
+    ) -> None:
+        """Initialize retriever.
+
+        Args:
+            store: Vector store to search (retrieval is disabled if None)
+            llm: Client used to embed queries
+            lexical: Optional BM25 index for hybrid retrieval
+            vector_top_k: Candidates taken from the vector store
+                (defaults to the requested top_k)
+            lexical_top_k: Candidates taken from the lexical index
+                (defaults to the requested top_k)
+            rrf_k: Reciprocal rank fusion damping constant
+        """
+        self.store = store
+        self.llm = llm
+        self.lexical = lexical
+        self.vector_top_k = vector_top_k
+        self.lexical_top_k = lexical_top_k
+        self.rrf_k = rrf_k
+
+    async def retrieve(
+        self,
+        query: str,
+        top_k: int = 15,
+        grade: str | None = None,
+        subject: str | None = None,
+        embedding: list[float] | None = None,
+    ) -> list[dict]:
+        """Retrieve relevant documents.
+
+        Args:
+            embedding: The query's embedding, if the caller already has it
+        """
+        if self.store is None or self.llm is None:
+            return []
+
+        filters = _filters(grade, subject)
+        vector_hits, lexical_hits = await asyncio.gather(
+            self._vector_search(query, top_k, filters, embedding),
+            self._lexical_search(query, top_k, filters),
+        )
+        return self._fuse(vector_hits, lexical_hits, top_k)
+
+    async def retrieve_many(
+        self,
+        queries: list[str],
+        top_k: int = 15,
+        grade: str | None = None,
+        subject: str | None = None,
+    ) -> list[list[dict]]:
+        """Retrieve documents for many queries with one embed and one search.
+
+        Used by quiz generation and RAG evaluation, which retrieve for a
+        whole list of questions at once.
+
+        Returns:
+            One result list per query, in input order
+        """
+        if self.store is None or self.llm is None or not queries:
+            return [[] for _ in queries]
+
+        filters = _filters(grade, subject)
+
+        async def vector_batch() -> list[list[dict]]:
+            embeddings = await self.llm.embed(queries)
+            return await self.store.search_batch(
+                embeddings, top_k=self.vector_top_k or top_k, filters=filters
+            )
+
+        vector_hits, *lexical_hits = await asyncio.gather(
+            vector_batch(),
+            *(self._lexical_search(q, top_k, filters) for q in queries),
+        )
+        return [
+            self._fuse(vectors, lexical, top_k)
+            for vectors, lexical in zip(vector_hits, lexical_hits)
+        ]
+
+    async def _vector_search(
+        self,
+        query: str,
+        top_k: int,
+        filters: dict | None,
+        embedding: list[float] | None = None,
+    ) -> list[dict]:
+        if embedding is None:
+            [embedding] = await self.llm.embed([query])
+        return await self.store.search(
+            embedding, top_k=self.vector_top_k or top_k, filters=filters
+        )
+
+    async def _lexical_search(
+        self, query: str, top_k: int, filters: dict | None
+    ) -> list[dict]:
+        if self.lexical is None:
+            return []
+        return await asyncio.to_thread(
+            self.lexical.search, query, self.lexical_top_k or top_k, filters
+        )
+
+    def _fuse(
+        self,
+        vector_hits: list[dict],
+        lexical_hits: list[dict],
+        top_k: int,
+    ) -> list[dict]:
+        if self.lexical is None:
+            return vector_hits[:top_k]
+        return reciprocal_rank_fusion(
+            {"vector": vector_hits, "lexical": lexical_hits},
+            k=self.rrf_k,
+            top_k=top_k,
+        )
+
 
-    async def retrieve(self, query: str, top_k: int = 15) -> list[dict]:
-        """Retrieve relevant documents."""
-        return []
+def _filters(grade: str | None, subject: str | None) -> dict | None:
+    filters = {"grade": grade, "subject": subject}
+    return {k: v for k, v in filters.items() if v is not None} or None
@@ -1,13 +1,123 @@
-"""Telemetry metrics."""
+"""Telemetry metrics.
+
+Counters and fixed-bucket histograms, keyed by metric name plus labels
+(e.g. ``backend`` and ``endpoint``). Recording is a dict lookup, a
+bisect and a few integer increments with no locks: all recording
+happens on the event loop thread, where a synchronous update cannot be
+interleaved with another. Percentiles are estimated from the buckets
+when a snapshot is taken, so the hot path never sorts or allocates.
+"""
+
+from bisect import bisect_left
+from collections.abc import Callable
+
+LabelKey = tuple[tuple[str, str], ...]
+
+# Log-spaced upper bounds; wide enough for seconds and token counts.
+DEFAULT_BUCKETS: tuple[float, ...] = tuple(
+    round(base * 10**exp, 6) for exp in range(-3, 6) for base in (1, 2, 5)
+)
+
+
+class Histogram:
+    """Fixed-bucket histogram with interpolated percentiles."""
+
+    __slots__ = ("bounds", "counts", "count", "total", "min", "max")
+
+    def __init__(self, bounds: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        """Estimate the q-th percentile (0-100) by linear interpolation."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                low = self.bounds[index - 1] if index else self.min
+                high = self.bounds[index] if index < len(self.bounds) else self.max
+                low, high = max(low, self.min), min(high, self.max)
+                return low + (high - low) * (rank - seen) / count
+            seen += count
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max if self.count else 0.0,
+        }
 
 
 class MetricsCollector:
     """Metrics collector."""
 
-    def record(self, metric_name: str, value: float) -> None:
-        """Record a metric."""
-        pass
+    def __init__(self) -> None:
+        self._histograms: dict[tuple[str, LabelKey], Histogram] = {}
+        self._counters: dict[tuple[str, LabelKey], float] = {}
+        self._gauges: dict[str, Callable[[], dict]] = {}
+
+    def record(self, metric_name: str, value: float, /, **labels: str) -> None:
+        """Record a metric (positional name and value, so any label name works)."""
+        key = (metric_name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def increment(self, metric_name: str, value: float = 1, /, **labels: str) -> None:
+        """Add to a counter."""
+        key = (metric_name, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def register_gauge(self, name: str, read: Callable[[], dict]) -> None:
+        """Report ``read()`` (e.g. a limiter's ``stats``) in snapshots."""
+        self._gauges[name] = read
+
+    def unregister_gauge(self, name: str) -> None:
+        self._gauges.pop(name, None)
 
     def get_metrics(self) -> dict:
         """Get all metrics."""
-        return {}
+        histograms: dict[str, list[dict]] = {}
+        for (name, labels), histogram in sorted(self._histograms.items()):
+            histograms.setdefault(name, []).append(
+                {"labels": dict(labels), **histogram.snapshot()}
+            )
+        counters: dict[str, list[dict]] = {}
+        for (name, labels), value in sorted(self._counters.items()):
+            counters.setdefault(name, []).append(
+                {"labels": dict(labels), "value": value}
+            )
+        return {
+            "histograms": histograms,
+            "counters": counters,
+            "gauges": {name: read() for name, read in self._gauges.items()},
+        }
+
+    def reset(self) -> None:
+        """Drop recorded values (gauges stay registered)."""
+        self._histograms.clear()
+        self._counters.clear()
+
+
+metrics = MetricsCollector()
@@ -0,0 +1,117 @@
+"""Micro-batching of embedding calls.
+
+Chat requests embed one query each, but providers (and local models)
+are far more efficient per text on batches. ``EmbeddingBatcher``
+collects the texts of concurrent ``embed`` calls for up to
+``max_wait`` seconds or ``max_batch_size`` texts, sends one batched
+call, and scatters the vectors back to each caller. A lone caller pays
+at most ``max_wait`` of extra latency.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+
+from somaai.providers.llm import LLMClient
+
+EmbedFn = Callable[[list[str]], Awaitable[list[list[float]]]]
+
+
+class EmbeddingBatcher:
+    """Merges concurrent ``embed`` calls into batched upstream calls.
+
+    Works with anything exposing ``embed(texts)``, such as an
+    ``LLMClient`` or ``EmbeddingModel``.
+    """
+
+    def __init__(
+        self,
+        embed: EmbedFn,
+        max_batch_size: int = 64,
+        max_wait: float = 0.005,
+    ) -> None:
+        """Initialize batcher.
+
+        Args:
+            embed: Upstream batched embed function
+            max_batch_size: Texts per upstream call
+            max_wait: Seconds to wait for more callers before sending
+        """
+        self._embed = embed
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending: list[tuple[list[str], asyncio.Future]] = []
+        self._pending_texts = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.batches = 0
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts as part of the next batch."""
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((texts, future))
+        self._pending_texts += len(texts)
+
+        if self._pending_texts >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        requests, self._pending = self._pending, []
+        self._pending_texts = 0
+        if requests:
+            task = asyncio.ensure_future(self._dispatch(requests))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, requests: list[tuple[list[str], asyncio.Future]]) -> None:
+        texts = [text for batch, _ in requests for text in batch]
+        try:
+            parts = await asyncio.gather(
+                *(
+                    self._embed(texts[start : start + self.max_batch_size])
+                    for start in range(0, len(texts), self.max_batch_size)
+                )
+            )
+        except Exception as exc:
+            for _, future in requests:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        self.batches += len(parts)
+        vectors = [vector for part in parts for vector in part]
+        offset = 0
+        for batch, future in requests:
+            if not future.done():
+                future.set_result(vectors[offset : offset + len(batch)])
+            offset += len(batch)
+
+
+class BatchingLLMClient:
+    """``LLMClient`` wrapper that micro-batches ``embed`` calls."""
+
+    def __init__(
+        self,
+        llm: LLMClient,
+        max_batch_size: int = 64,
+        max_wait: float = 0.005,
+    ) -> None:
+        self.llm = llm
+        self.batcher = EmbeddingBatcher(llm.embed, max_batch_size, max_wait)
+
+    async def generate(self, prompt: str) -> str:
+        return await self.llm.generate(prompt)
+
+    def generate_stream(self, prompt: str) -> AsyncIterator[str]:
+        return self.llm.generate_stream(prompt)
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        return await self.batcher.embed(texts)
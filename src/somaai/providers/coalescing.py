@@ -0,0 +1,191 @@
+"""Single-flight coalescing of identical in-flight LLM calls.
+
+When many students ask the same question at once, every request would
+otherwise make its own provider call. ``CoalescingLLMClient`` keys calls
+on a hash of the whitespace-normalised prompt: while a call is in
+flight, identical calls await the same upstream task, and stream
+subscribers fan out from one upstream stream (late joiners replay the
+tokens already produced). Results are not cached; once the call
+finishes the next identical call goes upstream again. Joined calls are
+counted as ``llm_cache`` hits.
+
+The upstream call is cancelled only when every caller waiting on it has
+gone away, so one impatient client cannot fail the others. A cancelled
+call is unregistered at once, so a caller arriving just after starts a
+fresh one instead of joining the dying call.
+"""
+
+import asyncio
+import hashlib
+import unicodedata
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any
+
+from somaai.modules.telemetry.metrics import MetricsCollector, metrics
+from somaai.providers.instrumented import record_cache_hit
+from somaai.providers.llm import LLMClient
+
+
+def prompt_key(kind: str, text: str) -> str:
+    """Hash of a prompt after Unicode and whitespace normalisation."""
+    normalized = " ".join(unicodedata.normalize("NFC", text).split())
+    digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=16)
+    return f"{kind}:{digest.hexdigest()}"
+
+
+class _Flight:
+    """One upstream call shared by every caller with the same key."""
+
+    def __init__(self, key: str, task: asyncio.Future) -> None:
+        self.key = key
+        self.task = task
+        self.waiters = 0
+
+
+class _Broadcast:
+    """One upstream stream replayed to every subscriber."""
+
+    def __init__(self) -> None:
+        self.tokens: list[str] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.subscribers = 0
+        self.task: asyncio.Task | None = None
+        self._changed = asyncio.Event()
+
+    async def pump(self, stream: AsyncIterator[str]) -> None:
+        try:
+            async for token in stream:
+                self.tokens.append(token)
+                self._notify()
+        except Exception as exc:
+            # Handed to subscribers rather than raised from the task.
+            self.error = exc
+        except asyncio.CancelledError as exc:
+            # A subscriber must never mistake a cancelled stream for a
+            # complete one.
+            self.error = exc
+            raise
+        finally:
+            self.done = True
+            self._notify()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        position = 0
+        while True:
+            while position < len(self.tokens):
+                yield self.tokens[position]
+                position += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+
+class CoalescingLLMClient:
+    """``LLMClient`` wrapper that merges identical concurrent calls."""
+
+    def __init__(
+        self, llm: LLMClient, collector: MetricsCollector | None = None
+    ) -> None:
+        self.llm = llm
+        self.metrics = collector or metrics
+        self._flights: dict[str, _Flight] = {}
+        self._streams: dict[str, _Broadcast] = {}
+        self.coalesced = 0
+
+    async def generate(self, prompt: str) -> str:
+        return await self._share(
+            prompt_key("generate", prompt), lambda: self.llm.generate(prompt)
+        )
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts, sharing per-text work with concurrent calls.
+
+        Texts not already in flight go upstream together in one batch.
+        """
+        keys = [prompt_key("embed", text) for text in texts]
+        flights = {key: self._flights[key] for key in keys if key in self._flights}
+        missing = [key for key in dict.fromkeys(keys) if key not in flights]
+        self.coalesced += len(keys) - len(missing)
+        if not missing:
+            record_cache_hit("embed", "coalescing", collector=self.metrics)
+        else:
+            batch = asyncio.ensure_future(
+                self.llm.embed([texts[keys.index(key)] for key in missing])
+            )
+            # Mark a failure as retrieved even if every caller gave up.
+            batch.add_done_callback(lambda f: f.cancelled() or f.exception())
+            for position, key in enumerate(missing):
+                flights[key] = self._start(key, self._pick(batch, position))
+
+        return list(await asyncio.gather(*(self._join(flights[key]) for key in keys)))
+
+    async def generate_stream(self, prompt: str) -> AsyncIterator[str]:
+        key = prompt_key("stream", prompt)
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            broadcast.task = asyncio.ensure_future(
+                broadcast.pump(self.llm.generate_stream(prompt))
+            )
+            broadcast.task.add_done_callback(
+                lambda _: self._forget(self._streams, key, broadcast)
+            )
+        else:
+            self.coalesced += 1
+            record_cache_hit("stream", "coalescing", collector=self.metrics)
+
+        broadcast.subscribers += 1
+        try:
+            async for token in broadcast.subscribe():
+                yield token
+        finally:
+            broadcast.subscribers -= 1
+            if not broadcast.subscribers and not broadcast.task.done():
+                self._forget(self._streams, key, broadcast)
+                broadcast.task.cancel()
+
+    async def _share(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._start(key, call())
+        else:
+            self.coalesced += 1
+            record_cache_hit(
+                key.partition(":")[0], "coalescing", collector=self.metrics
+            )
+        return await self._join(flight)
+
+    async def _join(self, flight: _Flight) -> Any:
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                self._forget(self._flights, flight.key, flight)
+                flight.task.cancel()
+
+    def _start(self, key: str, call: Awaitable[Any]) -> _Flight:
+        flight = _Flight(key, asyncio.ensure_future(call))
+        self._flights[key] = flight
+        flight.task.add_done_callback(
+            lambda _: self._forget(self._flights, key, flight)
+        )
+        return flight
+
+    @staticmethod
+    async def _pick(batch: asyncio.Future, position: int) -> list[float]:
+        return (await asyncio.shield(batch))[position]
+
+    @staticmethod
+    def _forget(registry: dict, key: str, entry: object) -> None:
+        if registry.get(key) is entry:
+            del registry[key]
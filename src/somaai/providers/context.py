@@ -0,0 +1,70 @@
+"""Per-request context for outbound LLM calls.
+
+Values live in context variables, so they follow a request through
+every ``await`` and into tasks it spawns without being threaded through
+each function signature. Provider wrappers read them to prioritise
+queued calls and to give up on work whose caller has already gone.
+"""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    """Scheduling priority of LLM calls; lower values go first."""
+
+    INTERACTIVE = 0  # chat answers a student is waiting on
+    BACKGROUND = 10  # quiz generation and other queued jobs
+
+
+_priority: ContextVar[Priority] = ContextVar(
+    "llm_priority", default=Priority.INTERACTIVE
+)
+_deadline: ContextVar[float | None] = ContextVar("llm_deadline", default=None)
+
+
+def current_priority() -> Priority:
+    """Priority of LLM calls made from the current context."""
+    return _priority.get()
+
+
+def current_deadline() -> float | None:
+    """``time.monotonic()`` deadline of the current request, if any."""
+    return _deadline.get()
+
+
+def remaining_time() -> float | None:
+    """Seconds left before the current deadline (None if unbounded)."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+@contextmanager
+def llm_priority(priority: Priority) -> Iterator[None]:
+    """Run LLM calls in this block at the given priority."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+@contextmanager
+def llm_deadline(seconds: float | None) -> Iterator[None]:
+    """Bound LLM calls in this block to finish within ``seconds``.
+
+    Nested deadlines never extend an outer one.
+    """
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
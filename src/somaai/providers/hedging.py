@@ -0,0 +1,206 @@
+"""Hedged LLM requests.
+
+Provider tail latency dominates our p99. ``HedgedLLMClient`` sends each
+call to the primary backend and, if no answer has arrived after the
+primary's recent p95 latency (configurable), sends the same call to a
+secondary backend and takes whichever answers first. The loser is
+cancelled. If the primary fails before the hedge delay the secondary
+is tried straight away. For streams the race is on time to first
+token; the winning stream is then followed to the end.
+
+Every call is bounded by the request deadline from
+``providers.context``. Embeddings are never hedged: vectors from
+different providers live in different spaces, so every ``embed`` goes
+to one backend (the secondary when the primary has no embeddings API,
+e.g. Groq with an OpenAI backup).
+"""
+
+import asyncio
+import contextlib
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any
+
+import numpy as np
+
+from somaai.exceptions import DeadlineExceededError
+from somaai.logging_conf import get_logger
+from somaai.modules.telemetry.metrics import metrics
+from somaai.providers.context import remaining_time
+from somaai.providers.llm import LLMClient
+
+logger = get_logger(__name__)
+
+_DONE = object()
+
+
+class LatencyTracker:
+    """Rolling window of latencies with a percentile-based hedge delay."""
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        initial_delay: float = 2.0,
+        min_samples: int = 20,
+        window: int = 500,
+    ) -> None:
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def add(self, latency: float) -> None:
+        self._samples.append(latency)
+
+    def delay(self) -> float:
+        """Seconds to wait on the primary before hedging."""
+        if len(self._samples) < self.min_samples:
+            return self.initial_delay
+        return float(np.percentile(self._samples, self.percentile))
+
+
+class HedgedLLMClient:
+    """``LLMClient`` racing a secondary backend against a slow primary."""
+
+    def __init__(
+        self,
+        primary: LLMClient,
+        secondary: LLMClient,
+        percentile: float = 95.0,
+        initial_delay: float = 2.0,
+        min_samples: int = 20,
+        embedder: LLMClient | None = None,
+    ) -> None:
+        """Initialize client.
+
+        Args:
+            primary: Backend every call goes to first
+            secondary: Backend hedged calls go to
+            percentile: Primary latency percentile used as hedge delay
+            initial_delay: Hedge delay until enough latencies are seen
+            min_samples: Latencies needed before using the percentile
+            embedder: Backend for all embeddings (default the primary)
+        """
+        self.primary = primary
+        self.secondary = secondary
+        self.embedder = embedder or primary
+        self.latency = LatencyTracker(percentile, initial_delay, min_samples)
+        self.first_token = LatencyTracker(percentile, initial_delay, min_samples)
+        self.counts = {"calls": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0}
+
+    def stats(self) -> dict:
+        """Hedge counters plus the current hedge delays."""
+        calls = self.counts["calls"]
+        return {
+            **self.counts,
+            "hedge_win_rate": self.counts["hedge_wins"] / calls if calls else 0.0,
+            "generate_delay": self.latency.delay(),
+            "first_token_delay": self.first_token.delay(),
+        }
+
+    async def generate(self, prompt: str) -> str:
+        _, text = await self._race(lambda llm: llm.generate(prompt), self.latency)
+        return text
+
+    async def generate_stream(self, prompt: str) -> AsyncIterator[str]:
+        streams: list[AsyncIterator[str]] = []
+
+        async def first_token(llm: LLMClient) -> tuple[AsyncIterator[str], Any]:
+            stream = llm.generate_stream(prompt)
+            streams.append(stream)
+            try:
+                return stream, await stream.__anext__()
+            except StopAsyncIteration:
+                return stream, _DONE
+
+        winner = None
+        try:
+            _, (winner, token) = await self._race(first_token, self.first_token)
+        finally:
+            for stream in streams:
+                aclose = getattr(stream, "aclose", None)
+                if stream is not winner and aclose is not None:
+                    with contextlib.suppress(Exception):
+                        await aclose()
+
+        if token is _DONE:
+            return
+        yield token
+        async for token in winner:
+            yield token
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        return await self.embedder.embed(texts)
+
+    async def _race(
+        self,
+        call: Callable[[LLMClient], Awaitable[Any]],
+        tracker: LatencyTracker,
+    ) -> tuple[str, Any]:
+        """Run call on the primary, hedging to the secondary if slow.
+
+        Returns:
+            ("primary" | "secondary", result)
+
+        Raises:
+            DeadlineExceededError: If neither backend answers in time
+        """
+        budget = remaining_time()
+        if budget is not None and budget <= 0:
+            raise DeadlineExceededError("Request deadline already passed")
+        start = time.monotonic()
+        self.counts["calls"] += 1
+
+        primary = asyncio.ensure_future(call(self.primary))
+        tasks = {primary: "primary"}
+        delay = tracker.delay() if budget is None else min(tracker.delay(), budget)
+        errors: list[BaseException] = []
+        try:
+            done, _ = await asyncio.wait(set(tasks), timeout=delay)
+            hedged = not done
+            if hedged or next(iter(done)).exception() is not None:
+                tasks[asyncio.ensure_future(call(self.secondary))] = "secondary"
+                self._count("hedged" if hedged else "failovers")
+
+            pending = set(tasks)
+            while pending:
+                timeout = None
+                if budget is not None:
+                    timeout = budget - (time.monotonic() - start)
+                    if timeout <= 0:
+                        break
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for task in done:
+                    error = task.exception()
+                    if error is not None:
+                        errors.append(error)
+                        continue
+                    winner = tasks[task]
+                    if task is primary:
+                        tracker.add(time.monotonic() - start)
+                    elif hedged:
+                        self._count("hedge_wins")
+                    return winner, task.result()
+        finally:
+            # A primary that lost the race still took at least this long;
+            # leaving it out would drop the slow tail from the samples.
+            if not primary.done():
+                tracker.add(time.monotonic() - start)
+            losers = [task for task in tasks if not task.done()]
+            for task in losers:
+                task.cancel()
+            await asyncio.gather(*losers, return_exceptions=True)
+
+        if errors and len(errors) == len(tasks):
+            raise errors[0]
+        raise DeadlineExceededError("LLM call did not finish before the deadline")
+
+    def _count(self, event: str) -> None:
+        self.counts[event] += 1
+        metrics.increment(f"llm_{event}")
+        logger.debug("LLM hedge event: %s", event)
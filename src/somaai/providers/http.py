@@ -0,0 +1,35 @@
+"""Shared HTTP connection pool for outbound API calls.
+
+One ``httpx.AsyncClient`` is created in the app lifespan and shared by
+every LLM provider, so TLS handshakes happen once per pooled connection
+instead of once per chat request. HTTP/2 (when ``h2`` is installed)
+multiplexes concurrent requests over a single connection per host.
+"""
+
+import httpx
+
+from somaai.settings import Settings
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def create_http_client(settings: Settings) -> httpx.AsyncClient:
+    """Create the pooled keep-alive client configured by ``HTTP_*`` settings."""
+    return httpx.AsyncClient(
+        http2=settings.http_http2 and HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        ),
+        timeout=httpx.Timeout(
+            settings.http_timeout_seconds,
+            connect=settings.http_connect_timeout_seconds,
+        ),
+        headers={"User-Agent": f"{settings.app_name}/{settings.version}"},
+    )
@@ -0,0 +1,159 @@
+"""Per-call token, cost and latency telemetry for LLM providers.
+
+``InstrumentedLLMClient`` wraps one provider and records into the
+shared ``MetricsCollector``, labelled by backend, model and endpoint
+(``generate``, ``stream`` or ``embed``):
+
+- ``llm_prompt_tokens`` / ``llm_completion_tokens`` histograms
+- ``llm_ttft_seconds`` (streams) and ``llm_latency_seconds`` histograms
+- ``llm_calls``, ``llm_errors`` and ``llm_cost_usd`` counters
+- ``llm_cache`` counter: ``result="miss"`` for every call that reaches a
+  provider, ``result="hit"`` (via ``record_cache_hit``) when the
+  coalescer or the semantic cache answers in its place
+
+Token counts come from ``utils.tokens`` (tiktoken when installed), so
+they are estimates for non-OpenAI models. Costs use ``MODEL_PRICES``.
+"""
+
+import time
+from collections.abc import AsyncIterator
+
+from somaai.modules.telemetry.metrics import MetricsCollector, metrics
+from somaai.providers.llm import LLMClient
+from somaai.settings import settings
+from somaai.utils.tokens import count_tokens
+
+# USD per million (prompt, completion) tokens.
+MODEL_PRICES: dict[str, tuple[float, float]] = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+    "llama-3.1-8b-instant": (0.05, 0.08),
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+}
+
+
+def record_cache_hit(
+    endpoint: str,
+    cache: str,
+    backend: str | None = None,
+    collector: MetricsCollector | None = None,
+) -> None:
+    """Count an LLM call answered by a cache instead of a provider."""
+    (collector or metrics).increment(
+        "llm_cache",
+        backend=backend or settings.llm_backend.lower(),
+        endpoint=endpoint,
+        cache=cache,
+        result="hit",
+    )
+
+
+class InstrumentedLLMClient:
+    """``LLMClient`` wrapper that records per-call telemetry."""
+
+    def __init__(
+        self,
+        llm: LLMClient,
+        backend: str | None = None,
+        collector: MetricsCollector | None = None,
+    ) -> None:
+        self.llm = llm
+        self.backend = backend or getattr(llm, "name", type(llm).__name__).lower()
+        self.model = getattr(llm, "model", "") or ""
+        self.embedding_model = getattr(llm, "embedding_model", "") or ""
+        self.metrics = collector or metrics
+
+    async def generate(self, prompt: str) -> str:
+        self._miss("generate")
+        start = time.monotonic()
+        try:
+            text = await self.llm.generate(prompt)
+        except Exception as exc:
+            self._error("generate", self.model, exc)
+            raise
+        self._record(
+            "generate",
+            self.model,
+            count_tokens(prompt),
+            count_tokens(text),
+            time.monotonic() - start,
+        )
+        return text
+
+    async def generate_stream(self, prompt: str) -> AsyncIterator[str]:
+        self._miss("stream")
+        start = time.monotonic()
+        completion_tokens = 0
+        first = True
+        try:
+            async for token in self.llm.generate_stream(prompt):
+                if first:
+                    first = False
+                    self.metrics.record(
+                        "llm_ttft_seconds",
+                        time.monotonic() - start,
+                        **self._labels("stream", self.model),
+                    )
+                completion_tokens += count_tokens(token)
+                yield token
+        except Exception as exc:
+            self._error("stream", self.model, exc)
+            raise
+        self._record(
+            "stream",
+            self.model,
+            count_tokens(prompt),
+            completion_tokens,
+            time.monotonic() - start,
+        )
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        self._miss("embed")
+        start = time.monotonic()
+        try:
+            vectors = await self.llm.embed(texts)
+        except Exception as exc:
+            self._error("embed", self.embedding_model, exc)
+            raise
+        self._record(
+            "embed",
+            self.embedding_model,
+            sum(count_tokens(text) for text in texts),
+            0,
+            time.monotonic() - start,
+        )
+        return vectors
+
+    def _labels(self, endpoint: str, model: str) -> dict[str, str]:
+        return {"backend": self.backend, "model": model, "endpoint": endpoint}
+
+    def _miss(self, endpoint: str) -> None:
+        self.metrics.increment(
+            "llm_cache", backend=self.backend, endpoint=endpoint, result="miss"
+        )
+
+    def _record(
+        self,
+        endpoint: str,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        latency: float,
+    ) -> None:
+        labels = self._labels(endpoint, model)
+        self.metrics.increment("llm_calls", **labels)
+        self.metrics.record("llm_latency_seconds", latency, **labels)
+        self.metrics.record("llm_prompt_tokens", prompt_tokens, **labels)
+        if endpoint != "embed":
+            self.metrics.record("llm_completion_tokens", completion_tokens, **labels)
+        prices = MODEL_PRICES.get(model)
+        if prices is not None:
+            cost = (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1e6
+            self.metrics.increment("llm_cost_usd", cost, **labels)
+
+    def _error(self, endpoint: str, model: str, exc: Exception) -> None:
+        self.metrics.increment(
+            "llm_errors", error=type(exc).__name__, **self._labels(endpoint, model)
+        )
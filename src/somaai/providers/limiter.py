@@ -0,0 +1,264 @@
+"""Adaptive concurrency limiting for LLM calls.
+
+``AdaptiveLimiter`` caps how many provider calls run at once and learns
+the cap AIMD-style: each call that completes near the long-run average
+latency raises the limit by about one per window, while 429s halve it
+and latency inflation (a sign the provider is queueing us) trims it.
+Calls above the limit wait in a priority queue, interactive chat ahead
+of background jobs, and are rejected immediately when the queue is full
+or their deadline cannot be met, instead of piling up until everything
+times out.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from somaai.exceptions import OverloadedError, RateLimitError
+from somaai.providers.context import Priority, current_deadline, current_priority
+from somaai.providers.llm import LLMClient
+from somaai.settings import Settings
+
+# Latency inflation below this many seconds is scheduling noise, not a
+# provider queueing our calls.
+CONGESTION_FLOOR = 0.01
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit with a prioritised, deadline-aware queue."""
+
+    def __init__(
+        self,
+        initial_limit: float = 8,
+        min_limit: float = 1,
+        max_limit: float = 64,
+        max_queue: int = 256,
+        queue_timeout: float | None = 30.0,
+        latency_tolerance: float = 2.0,
+        backoff: float = 0.5,
+    ) -> None:
+        """Initialize limiter.
+
+        Args:
+            initial_limit: Starting concurrency limit
+            min_limit: Floor for the limit
+            max_limit: Ceiling for the limit
+            max_queue: Waiting calls beyond which new calls are rejected
+            queue_timeout: Longest wait for a slot when the caller has no
+                deadline of its own (None waits indefinitely)
+            latency_tolerance: Recent latency above this multiple of the
+                long-run average latency counts as congestion
+            backoff: Multiplier applied to the limit on a 429
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._queue: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._baseline: float | None = None
+        self._average: float | None = None
+        self.rejected = 0
+
+    @property
+    def limit(self) -> int:
+        """Current concurrency limit."""
+        return max(int(self._limit), 1)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def stats(self) -> dict:
+        """Snapshot for metrics and health checks."""
+        return {
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "queued": len(self._queue),
+            "rejected": self.rejected,
+            "baseline_latency": self._baseline,
+        }
+
+    async def acquire(self, priority: Priority | None = None) -> None:
+        """Wait for a slot.
+
+        Raises:
+            OverloadedError: If the queue is full or the wait would
+                outlast the request deadline / queue timeout
+        """
+        if self._in_flight < self.limit and not self._queue:
+            self._in_flight += 1
+            return
+
+        priority = current_priority() if priority is None else priority
+        timeout = self._wait_budget(priority)
+        if len(self._queue) >= self.max_queue:
+            self._reject("LLM queue is full")
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (int(priority), next(self._sequence), future)
+        heapq.heappush(self._queue, entry)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self._reject("Timed out waiting for an LLM slot")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted a slot just as we were cancelled: hand it on.
+                self._in_flight -= 1
+                self._wake()
+            raise
+        finally:
+            if entry in self._queue:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+
+    def release(self, latency: float | None, overloaded: bool = False) -> None:
+        """Return a slot and adapt the limit.
+
+        Args:
+            latency: Seconds the call took (None for failures that say
+                nothing about provider load)
+            overloaded: The provider rate-limited the call
+        """
+        self._in_flight -= 1
+        if overloaded:
+            self._limit = max(self.min_limit, self._limit * self.backoff)
+        elif latency is not None:
+            self._observe(latency)
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority | None = None) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block."""
+        await self.acquire(priority)
+        start = time.monotonic()
+        try:
+            yield
+        except RateLimitError:
+            self.release(None, overloaded=True)
+            raise
+        except BaseException:
+            self.release(None)
+            raise
+        self.release(time.monotonic() - start)
+
+    def _observe(self, latency: float) -> None:
+        # Compare a short-term average with a slow long-term baseline, so
+        # ordinary jitter (heavy-tailed time to first token) does not read
+        # as congestion. A permanently slower provider becomes the new
+        # normal as the baseline catches up.
+        if self._baseline is None or self._average is None:
+            baseline = average = latency
+        else:
+            baseline = 0.99 * self._baseline + 0.01 * latency
+            average = 0.9 * self._average + 0.1 * latency
+        self._baseline, self._average = baseline, average
+        congested = (
+            average > baseline * self.latency_tolerance
+            and average - baseline > CONGESTION_FLOOR
+        )
+        if congested:
+            self._limit = max(self.min_limit, self._limit * 0.9)
+        else:
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+    def _wait_budget(self, priority: Priority) -> float | None:
+        """Allowed queue wait, rejecting early if it cannot be met."""
+        deadline = current_deadline()
+        timeout = self.queue_timeout
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        if timeout is None:
+            return None
+
+        ahead = sum(1 for p, _, _ in self._queue if p <= priority)
+        expected = (ahead + 1) / self.limit * (self._average or 0.0)
+        if timeout <= 0 or expected > timeout:
+            self._reject("LLM queue wait would exceed the request deadline")
+        return timeout
+
+    def _wake(self) -> None:
+        while self._queue and self._in_flight < self.limit:
+            _, _, future = heapq.heappop(self._queue)
+            if future.done():
+                continue
+            self._in_flight += 1
+            future.set_result(None)
+
+    def _reject(self, reason: str) -> None:
+        self.rejected += 1
+        raise OverloadedError(reason, retry_after=self._average)
+
+
+class LimitedLLMClient:
+    """``LLMClient`` wrapper that runs calls through adaptive limiters.
+
+    Generation and embedding have separate limiters because their
+    latencies differ by orders of magnitude. A stream holds its slot
+    until it finishes; its latency sample is the time to first token.
+    """
+
+    def __init__(
+        self,
+        llm: LLMClient,
+        generation: AdaptiveLimiter | None = None,
+        embedding: AdaptiveLimiter | None = None,
+    ) -> None:
+        self.llm = llm
+        self.generation = generation or AdaptiveLimiter()
+        self.embedding = embedding or AdaptiveLimiter()
+
+    async def generate(self, prompt: str) -> str:
+        async with self.generation.slot():
+            return await self.llm.generate(prompt)
+
+    async def generate_stream(self, prompt: str) -> AsyncIterator[str]:
+        await self.generation.acquire()
+        start = time.monotonic()
+        first_token: float | None = None
+        try:
+            async for token in self.llm.generate_stream(prompt):
+                if first_token is None:
+                    first_token = time.monotonic() - start
+                yield token
+        except RateLimitError:
+            self.generation.release(None, overloaded=True)
+            raise
+        except BaseException:
+            self.generation.release(None)
+            raise
+        self.generation.release(
+            first_token if first_token is not None else time.monotonic() - start
+        )
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        async with self.embedding.slot():
+            return await self.llm.embed(texts)
+
+
+def with_concurrency_limit(llm: LLMClient, settings: Settings) -> LimitedLLMClient:
+    """Wrap a client with limiters configured by ``LLM_CONCURRENCY_*``."""
+
+    def limiter() -> AdaptiveLimiter:
+        return AdaptiveLimiter(
+            initial_limit=settings.llm_concurrency_initial,
+            min_limit=settings.llm_concurrency_min,
+            max_limit=settings.llm_concurrency_max,
+            max_queue=settings.llm_queue_size,
+            queue_timeout=settings.llm_queue_timeout_seconds,
+        )
+
+    return LimitedLLMClient(llm, generation=limiter(), embedding=limiter())
@@ -2,9 +2,20 @@
 
 from __future__ import annotations
 
-from collections.abc import AsyncIterator
+import asyncio
+import hashlib
+import json
+import random
+import re
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
 from typing import Protocol, runtime_checkable
 
+import httpx
+import numpy as np
+
+from somaai.exceptions import LLMProviderError, RateLimitError
 from somaai.settings import Settings
 
 
@@ -15,65 +26,336 @@ class LLMClient(Protocol):
     def generate_stream(self, prompt: str) -> AsyncIterator[str]: ...
 
 
+def hash_embedding(text: str, dimension: int = 768) -> list[float]:
+    """Deterministic unit vector from hashed words and character trigrams.
+
+    Texts sharing words (or word fragments) get high cosine similarity,
+    so retrieval and the semantic cache behave plausibly without a model.
+    """
+    vector = np.zeros(dimension, dtype=np.float32)
+    for word in re.findall(r"\w+", text.lower()):
+        padded = f"<{word}>"
+        features = [(word, 1.0)] + [
+            (padded[i : i + 3], 0.5) for i in range(len(padded) - 2)
+        ]
+        for feature, weight in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            sign = 1.0 if value >> 63 else -1.0
+            vector[value % dimension] += sign * weight
+    norm = float(np.linalg.norm(vector))
+    return (vector / norm if norm else vector).tolist()
+
+
+@dataclass
+class MockSimulation:
+    """Latency and failure profile for ``MockLLMProvider``.
+
+    Time to first token is log-normal around ``ttft_ms`` (``ttft_sigma``
+    controls the tail); each further token costs ``token_ms``.
+    """
+
+    ttft_ms: float = 400.0
+    ttft_sigma: float = 0.5
+    token_ms: float = 25.0
+    answer_tokens: int = 0  # 0 echoes the prompt
+    embed_ms: float = 15.0
+    embed_ms_per_text: float = 1.0
+    rate_limit_probability: float = 0.0
+    max_concurrency: int = 0  # 0 = unlimited; beyond it calls get 429
+    seed: int | None = None
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> MockSimulation:
+        return cls(
+            ttft_ms=settings.mock_ttft_ms,
+            ttft_sigma=settings.mock_ttft_sigma,
+            token_ms=settings.mock_token_ms,
+            answer_tokens=settings.mock_answer_tokens,
+            embed_ms=settings.mock_embed_ms,
+            rate_limit_probability=settings.mock_rate_limit_probability,
+            max_concurrency=settings.mock_max_concurrency,
+            seed=settings.mock_seed,
+        )
+
+
 class MockLLMProvider:
-    """Mock LLM provider for local dev/tests (no API keys needed)."""
+    """Mock LLM provider for local dev/tests (no API keys needed).
+
+    Answers instantly by default. With a ``MockSimulation`` it behaves
+    like a remote provider (first-token latency, per-token streaming,
+    429s, a concurrency cap) for offline load testing.
+    """
+
+    name = "mock"
+    supports_embeddings = True
+
+    def __init__(
+        self, simulation: MockSimulation | None = None, dimension: int = 768
+    ) -> None:
+        self.simulation = simulation
+        self.dimension = dimension
+        self.active = 0
+        self.rate_limited = 0
+        self._random = random.Random(simulation.seed if simulation else None)
 
     async def generate(self, prompt: str) -> str:
-        return "MOCK_ANSWER: " + prompt[:200]
+        if self.simulation is None:
+            return self._answer(prompt)
+        return "".join([token async for token in self.generate_stream(prompt)])
 
     async def generate_stream(self, prompt: str) -> AsyncIterator[str]:
-        text = await self.generate(prompt)
-        yield text
+        sim = self.simulation
+        if sim is None:
+            yield self._answer(prompt)
+            return
+
+        with self._slot():
+            await asyncio.sleep(
+                self._random.lognormvariate(0, sim.ttft_sigma) * sim.ttft_ms / 1000
+            )
+            for position, word in enumerate(self._answer(prompt).split()):
+                if position:
+                    await asyncio.sleep(sim.token_ms / 1000)
+                yield " " + word if position else word
 
     async def embed(self, texts: list[str]) -> list[list[float]]:
-        # Deterministic dummy embeddings
-        return [[0.0] * 768 for _ in texts]
+        sim = self.simulation
+        if sim is not None:
+            with self._slot():
+                await asyncio.sleep(
+                    (sim.embed_ms + sim.embed_ms_per_text * len(texts)) / 1000
+                )
+        return [hash_embedding(text, self.dimension) for text in texts]
+
+    def _answer(self, prompt: str) -> str:
+        answer = "MOCK_ANSWER: " + prompt[:200]
+        if self.simulation is None or not self.simulation.answer_tokens:
+            return answer
+        words = answer.split()
+        return " ".join(
+            words[i % len(words)] for i in range(self.simulation.answer_tokens)
+        )
 
+    @contextmanager
+    def _slot(self) -> Iterator[None]:
+        """Count a call against the simulated provider's limits."""
+        sim = self.simulation
+        if (sim.max_concurrency and self.active >= sim.max_concurrency) or (
+            self._random.random() < sim.rate_limit_probability
+        ):
+            self.rate_limited += 1
+            raise RateLimitError("Simulated rate limit", retry_after=1.0)
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
 
-class OpenAILLMProvider:
-    """OpenAI provider (skeleton)."""
 
-    def __init__(self, api_key: str, model: str):
+class OpenAICompatibleProvider:
+    """Provider for OpenAI-style ``/chat/completions`` and ``/embeddings`` APIs.
+
+    Requests go through the shared pooled ``httpx.AsyncClient`` from the
+    app lifespan; without one the provider opens its own (call ``aclose``).
+    """
+
+    name = "openai-compatible"
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        base_url: str,
+        client: httpx.AsyncClient | None = None,
+        embedding_model: str | None = None,
+        embedding_dimensions: int | None = None,
+    ):
         self.api_key = api_key
         self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.embedding_model = embedding_model
+        self.embedding_dimensions = embedding_dimensions
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(timeout=60.0)
+
+    @property
+    def supports_embeddings(self) -> bool:
+        return bool(self.embedding_model)
+
+    async def aclose(self) -> None:
+        """Close the HTTP client if this provider created it."""
+        if self._owns_client:
+            await self.client.aclose()
 
     async def generate(self, prompt: str) -> str:
-        raise NotImplementedError("OpenAI provider not implemented yet")
+        response = await self.client.post(
+            f"{self.base_url}/chat/completions",
+            json=self._chat_payload(prompt),
+            headers=self._headers(),
+        )
+        self._raise_for_status(response)
+        return response.json()["choices"][0]["message"]["content"] or ""
 
     async def generate_stream(self, prompt: str) -> AsyncIterator[str]:
-        raise NotImplementedError("OpenAI streaming not implemented yet")
-        # unreachable but makes this an async generator for type checking
-        yield ""
+        async with self.client.stream(
+            "POST",
+            f"{self.base_url}/chat/completions",
+            json=self._chat_payload(prompt, stream=True),
+            headers=self._headers(),
+        ) as response:
+            if response.is_error:
+                await response.aread()
+                self._raise_for_status(response)
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:") :].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or [{}]
+                content = choices[0].get("delta", {}).get("content")
+                if content:
+                    yield content
 
     async def embed(self, texts: list[str]) -> list[list[float]]:
-        raise NotImplementedError("OpenAI embeddings not implemented yet")
+        if not self.embedding_model:
+            raise NotImplementedError(f"{self.name} embeddings are not configured")
+        payload: dict = {"model": self.embedding_model, "input": texts}
+        if self.embedding_dimensions:
+            # text-embedding-3 models default to 1536/3072 dimensions.
+            payload["dimensions"] = self.embedding_dimensions
+        response = await self.client.post(
+            f"{self.base_url}/embeddings", json=payload, headers=self._headers()
+        )
+        self._raise_for_status(response)
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        vectors = [item["embedding"] for item in data]
+        if self.embedding_dimensions and any(
+            len(vector) != self.embedding_dimensions for vector in vectors
+        ):
+            raise LLMProviderError(
+                f"{self.embedding_model} returned {len(vectors[0])}-dim embeddings,"
+                f" expected {self.embedding_dimensions} (EMBEDDING_DIMENSION)"
+            )
+        return vectors
 
+    def _headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"}
 
-class GroqLLMProvider:
-    """Groq provider (skeleton)."""
+    def _chat_payload(self, prompt: str, stream: bool = False) -> dict:
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": stream,
+        }
 
-    def __init__(self, api_key: str, model: str):
-        self.api_key = api_key
-        self.model = model
+    def _raise_for_status(self, response: httpx.Response) -> None:
+        if not response.is_error:
+            return
+        detail = f"{self.name} returned {response.status_code}: {response.text[:200]}"
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After")
+            raise RateLimitError(
+                detail,
+                retry_after=float(retry_after)
+                if retry_after and retry_after.replace(".", "", 1).isdigit()
+                else None,
+            )
+        raise LLMProviderError(detail, status_code=response.status_code)
 
-    async def generate(self, prompt: str) -> str:
-        raise NotImplementedError("Groq provider not implemented yet")
 
-    async def generate_stream(self, prompt: str) -> AsyncIterator[str]:
-        raise NotImplementedError("Groq streaming not implemented yet")
-        # unreachable but makes this an async generator for type checking
-        yield ""
+class OpenAILLMProvider(OpenAICompatibleProvider):
+    """OpenAI provider."""
+
+    name = "OpenAI"
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        client: httpx.AsyncClient | None = None,
+        base_url: str = "https://api.openai.com/v1",
+        embedding_model: str | None = "text-embedding-3-small",
+        embedding_dimensions: int | None = None,
+    ):
+        super().__init__(
+            api_key, model, base_url, client, embedding_model, embedding_dimensions
+        )
+
+
+class GroqLLMProvider(OpenAICompatibleProvider):
+    """Groq provider (OpenAI-compatible API, no embeddings endpoint)."""
+
+    name = "Groq"
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        client: httpx.AsyncClient | None = None,
+        base_url: str = "https://api.groq.com/openai/v1",
+    ):
+        super().__init__(api_key, model, base_url, client)
 
     async def embed(self, texts: list[str]) -> list[list[float]]:
-        raise NotImplementedError("Groq embeddings not implemented yet")
+        raise NotImplementedError("Groq does not provide an embeddings API")
+
 
+def get_llm(
+    settings: Settings,
+    http_client: httpx.AsyncClient | None = None,
+    wrap: Callable[[LLMClient], LLMClient] | None = None,
+) -> LLMClient:
+    """Return the configured LLM provider based on settings.llm_backend.
 
-def get_llm(settings: Settings) -> LLMClient:
-    """Return the configured LLM provider based on settings.llm_backend."""
+    With ``LLM_HEDGE_BACKEND`` set, returns a ``HedgedLLMClient`` that
+    sends slow calls to that backend as well (e.g. Groq primary, OpenAI
+    backup). Embeddings then go to the hedge backend if the primary has
+    no embeddings API.
+
+    Args:
+        settings: Application settings
+        http_client: Shared pooled client for HTTP providers
+        wrap: Applied to each backend before hedging, so each keeps its
+            own concurrency limit
+    """
     backend = (settings.llm_backend or "mock").lower()
+    primary = _create_provider(backend, settings, http_client)
+    primary_embeds = getattr(primary, "supports_embeddings", True)
+    if wrap is not None:
+        primary = wrap(primary)
+
+    hedge_backend = (settings.llm_hedge_backend or "").lower()
+    if not hedge_backend:
+        return primary
+    if hedge_backend == backend:
+        raise ValueError("LLM_HEDGE_BACKEND must differ from LLM_BACKEND")
 
+    from somaai.providers.hedging import HedgedLLMClient
+
+    secondary = _create_provider(hedge_backend, settings, http_client)
+    secondary_embeds = getattr(secondary, "supports_embeddings", True)
+    if wrap is not None:
+        secondary = wrap(secondary)
+    return HedgedLLMClient(
+        primary,
+        secondary,
+        percentile=settings.llm_hedge_percentile,
+        initial_delay=settings.llm_hedge_initial_delay_seconds,
+        min_samples=settings.llm_hedge_min_samples,
+        embedder=secondary if secondary_embeds and not primary_embeds else primary,
+    )
+
+
+def _create_provider(
+    backend: str, settings: Settings, http_client: httpx.AsyncClient | None
+) -> LLMClient:
     if backend == "mock":
-        return MockLLMProvider()
+        simulation = (
+            MockSimulation.from_settings(settings) if settings.mock_simulate else None
+        )
+        return MockLLMProvider(simulation, dimension=settings.embedding_dimension)
 
     if backend == "openai":
         if not settings.openai_api_key:
@@ -81,7 +363,12 @@ def get_llm(settings: Settings) -> LLMClient:
         if not settings.openai_model:
             raise ValueError("OPENAI_MODEL is required when LLM_BACKEND=openai")
         return OpenAILLMProvider(
-            api_key=settings.openai_api_key, model=settings.openai_model
+            api_key=settings.openai_api_key,
+            model=settings.openai_model,
+            client=http_client,
+            base_url=settings.openai_base_url,
+            embedding_model=settings.openai_embedding_model,
+            embedding_dimensions=settings.embedding_dimension,
         )
 
     if backend == "groq":
@@ -89,7 +376,12 @@ def get_llm(settings: Settings) -> LLMClient:
             raise ValueError("GROQ_API_KEY is required when LLM_BACKEND=groq")
         if not settings.groq_model:
             raise ValueError("GROQ_MODEL is required when LLM_BACKEND=groq")
-        return GroqLLMProvider(api_key=settings.groq_api_key, model=settings.groq_model)
+        return GroqLLMProvider(
+            api_key=settings.groq_api_key,
+            model=settings.groq_model,
+            client=http_client,
+            base_url=settings.groq_base_url,
+        )
 
     if backend == "huggingface":
         raise NotImplementedError("HuggingFace backend not implemented yet")
@@ -0,0 +1,101 @@
+"""Local stand-in for OpenAI-compatible LLM APIs.
+
+Serves ``/v1/chat/completions`` (plain and streaming) and
+``/v1/embeddings`` with deterministic output, so the HTTP providers and
+the shared connection pool can be exercised without API keys::
+
+    uvicorn somaai.providers.stub_server:app --port 8001
+    LLM_BACKEND=openai OPENAI_API_KEY=x OPENAI_MODEL=stub \\
+        OPENAI_BASE_URL=http://localhost:8001/v1 ...
+
+``app.state.connections`` records the client address of every request,
+which shows whether connections are being reused. Setting
+``app.state.fail_status`` makes every request fail with that status.
+"""
+
+import hashlib
+import json
+import struct
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+EMBEDDING_DIMENSION = 8
+
+
+def create_stub_app() -> FastAPI:
+    """Create a fresh stand-in server app."""
+    stub = FastAPI(title="SomaAI LLM stub")
+    stub.state.connections = []
+    stub.state.fail_status = None
+
+    @stub.middleware("http")
+    async def record(request: Request, call_next):
+        stub.state.connections.append(request.client)
+        if stub.state.fail_status is not None:
+            return JSONResponse(
+                {"error": {"message": "stub failure"}},
+                status_code=stub.state.fail_status,
+                headers={"Retry-After": "1"},
+            )
+        return await call_next(request)
+
+    @stub.post("/v1/chat/completions")
+    async def chat_completions(body: dict):
+        prompt = body["messages"][-1]["content"]
+        answer = f"STUB_ANSWER: {prompt[:200]}"
+        if not body.get("stream"):
+            return {
+                "id": "stub",
+                "object": "chat.completion",
+                "model": body["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": answer},
+                        "finish_reason": "stop",
+                    }
+                ],
+            }
+
+        async def events():
+            for word in answer.split(" "):
+                chunk = {"choices": [{"index": 0, "delta": {"content": word + " "}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @stub.post("/v1/embeddings")
+    async def embeddings(body: dict):
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        return {
+            "object": "list",
+            "model": body["model"],
+            "data": [
+                {
+                    "object": "embedding",
+                    "index": i,
+                    "embedding": _embed(
+                        text, body.get("dimensions") or EMBEDDING_DIMENSION
+                    ),
+                }
+                for i, text in enumerate(texts)
+            ],
+        }
+
+    return stub
+
+
+def _embed(text: str, dimension: int = EMBEDDING_DIMENSION) -> list[float]:
+    values: list[int] = []
+    block = 0
+    while len(values) < dimension:
+        seed = text if block == 0 else f"{text}:{block}"
+        digest = hashlib.sha256(seed.encode("utf-8")).digest()
+        values.extend(struct.unpack("<8i", digest))
+        block += 1
+    return [value / 2**31 for value in values[:dimension]]
+
+
+app = create_stub_app()
@@ -34,6 +34,32 @@ class Settings(BaseSettings):
     qdrant_api_key: str | None = None
     qdrant_collection_name: str = "somaai_documents"
 
+    # Vector Store
+    vector_backend: str = "hnsw"  # hnsw | qdrant | chroma | pgvector
+    embedding_dimension: int = 768
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 100
+    hnsw_ef_search: int = 64
+    vector_quantization: str = "none"  # none | int8 | pq
+    vector_pq_subvectors: int = 96
+    vector_rescore: bool = True
+    vector_exact_batch_threshold: int = 50000
+    vector_index_path: str | None = None  # shared mmap segments (hnsw only)
+    vector_index_refresh_seconds: float = 30.0
+    lexical_index_path: str | None = None  # BM25 segments for hybrid retrieval
+
+    # Reranking
+    rerank_backend: str = "none"  # none | overlap | cross-encoder
+    rerank_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    rerank_batch_size: int = 16
+    rerank_budget_ms: float = 150.0
+    rerank_workers: int = 2  # scoring threads, separate from the default pool
+
+    # Context packing (tokens of retrieved context; default per model)
+    rag_context_tokens: int | None = None
+    # Seconds allowed for the optional analogy/real-world answers
+    rag_branch_timeout_seconds: float = 8.0
+
     # Storage
     storage_backend: str = "local"  # local | gdrive
     storage_local_path: str = "./uploads"
@@ -52,7 +78,6 @@ class Settings(BaseSettings):
     # Semantic Cache
     # cache_semantic_enabled: bool = True
     # cache_similarity_threshold: float = 0.92
-    # cache_embedding_dim: int = 768
     # cache_namespace: str = "somaai"
 
     # LLM Backend
@@ -63,6 +88,61 @@ class Settings(BaseSettings):
     huggingface_model: str = ""
     openai_api_key: str | None = None
     openai_model: str = ""
+    openai_base_url: str = "https://api.openai.com/v1"
+    openai_embedding_model: str = "text-embedding-3-small"
+    groq_base_url: str = "https://api.groq.com/openai/v1"
+
+    # Mock provider simulation (LLM_BACKEND=mock) for offline load tests
+    mock_simulate: bool = False
+    mock_ttft_ms: float = 400.0
+    mock_ttft_sigma: float = 0.5
+    mock_token_ms: float = 25.0
+    mock_answer_tokens: int = 0
+    mock_embed_ms: float = 15.0
+    mock_rate_limit_probability: float = 0.0
+    mock_max_concurrency: int = 0
+    mock_seed: int | None = None
+
+    # Hedged LLM calls and request deadlines
+    llm_hedge_backend: str | None = None  # e.g. openai as backup for groq
+    llm_hedge_percentile: float = 95.0
+    llm_hedge_initial_delay_seconds: float = 2.0
+    llm_hedge_min_samples: int = 20
+    request_deadline_seconds: float = 30.0
+
+    # Local CPU embeddings (ONNX model in a process pool)
+    embedding_backend: str = "llm"  # llm | local
+    local_embedding_model_dir: str = ""
+    local_embedding_workers: int = 2
+    local_embedding_threads: int = 1
+    local_embedding_batch_size: int = 32
+    local_embedding_max_length: int = 256
+
+    # Micro-batch concurrent embed calls
+    embed_batching: bool = True
+    embed_batch_max_size: int = 64
+    embed_batch_max_wait_ms: float = 5.0
+
+    # Per-call LLM token/cost/latency telemetry (GET /metrics)
+    llm_telemetry: bool = True
+
+    # Merge identical in-flight LLM/embedding calls
+    llm_coalescing: bool = True
+
+    # Adaptive LLM concurrency limit and queue
+    llm_concurrency_initial: int = 8
+    llm_concurrency_min: int = 1
+    llm_concurrency_max: int = 64
+    llm_queue_size: int = 256
+    llm_queue_timeout_seconds: float = 30.0
+
+    # Outbound HTTP connection pool (shared by LLM providers)
+    http_http2: bool = True
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry_seconds: float = 30.0
+    http_timeout_seconds: float = 60.0
+    http_connect_timeout_seconds: float = 5.0
 
 
 settings = Settings()
@@ -0,0 +1,441 @@
+"""Tests for the semantic answer cache, the two-tier cache and the pool."""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from somaai.app import _refresh_indexes
+from somaai.cache import connection, decorators
+from somaai.cache.config import CacheConfig
+from somaai.cache.semantic import SemanticCache, init_semantic_cache
+from somaai.cache.serializers import JsonSerializer, VectorSerializer
+from somaai.cache.session import SessionManager
+from somaai.cache.tiered import MISSING, LocalCache, TieredCache
+from somaai.contracts.chat import Preferences
+from somaai.settings import settings
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def unit(*values: float) -> list[float]:
+    vector = np.array(values, dtype=np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class TestSemanticCache:
+    """Test cases for nearest-neighbour lookup, TTL and LRU eviction."""
+
+    def test_near_paraphrase_hits_and_distant_question_misses(self):
+        cache = SemanticCache(dimension=3, similarity_threshold=0.9)
+        cache.set(unit(1, 0, 0), "ctx", "rain answer")
+
+        assert cache.get(unit(1, 0.1, 0), "ctx") == "rain answer"
+        assert cache.get(unit(0, 1, 0), "ctx") is None
+        assert cache.stats()["hits"] == cache.stats()["misses"] == 1
+
+    def test_context_partitions_never_mix(self):
+        cache = SemanticCache(dimension=2)
+        student = SemanticCache.context_key("S1", "science", "student", None)
+        teacher = SemanticCache.context_key("S1", "science", "teacher", None)
+        analogy = SemanticCache.context_key(
+            "S1", "science", "student", Preferences(enable_analogy=True)
+        )
+        cache.set(unit(1, 0), student, "for students")
+
+        assert cache.get(unit(1, 0), student) == "for students"
+        assert cache.get(unit(1, 0), teacher) is None
+        assert cache.get(unit(1, 0), analogy) is None
+
+    def test_nearest_of_several_wins(self):
+        cache = SemanticCache(dimension=2, similarity_threshold=0.5)
+        cache.set(unit(1, 0), "ctx", "a")
+        cache.set(unit(1, 1), "ctx", "b")
+
+        assert cache.get(unit(1, 0.9), "ctx") == "b"
+        assert cache.get(unit(1, 0.1), "ctx") == "a"
+
+    def test_entries_expire(self):
+        clock = Clock()
+        cache = SemanticCache(dimension=2, ttl=10, clock=clock)
+        cache.set(unit(1, 0), "ctx", "old")
+        clock.now = 11
+
+        assert cache.get(unit(1, 0), "ctx") is None
+        assert len(cache) == 0
+        cache.set(unit(1, 0), "ctx", "new")
+        assert cache.get(unit(1, 0), "ctx") == "new"
+
+    def test_least_recently_used_is_evicted(self):
+        cache = SemanticCache(dimension=3, max_entries=2)
+        cache.set(unit(1, 0, 0), "ctx", "a")
+        cache.set(unit(0, 1, 0), "ctx", "b")
+        cache.get(unit(1, 0, 0), "ctx")
+        cache.set(unit(0, 0, 1), "other", "c")
+
+        assert cache.get(unit(1, 0, 0), "ctx") == "a"
+        assert cache.get(unit(0, 1, 0), "ctx") is None
+        assert cache.get(unit(0, 0, 1), "other") == "c"
+
+    def test_near_duplicate_replaces_instead_of_growing(self):
+        cache = SemanticCache(dimension=2)
+        cache.set(unit(1, 0), "ctx", "first")
+        cache.set(unit(1, 0.01), "ctx", "second")
+
+        assert len(cache) == 1
+        assert cache.get(unit(1, 0), "ctx") == "second"
+
+    def test_matrix_stays_consistent_through_growth_and_removal(self):
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((300, 16))
+        cache = SemanticCache(dimension=16, max_entries=200)
+        for i, vector in enumerate(vectors):
+            cache.set(vector, "ctx", i)
+
+        assert len(cache) == 200
+        assert all(cache.get(vectors[i], "ctx") == i for i in range(100, 300))
+        assert cache.invalidate("ctx") == 200
+        assert cache.get(vectors[-1], "ctx") is None
+
+    def test_rejects_wrong_dimension(self):
+        with pytest.raises(ValueError):
+            SemanticCache(dimension=3).get([1.0, 0.0], "ctx")
+
+    def test_init_respects_config(self, monkeypatch):
+        monkeypatch.setattr(settings, "embedding_dimension", 384)
+        assert init_semantic_cache(CacheConfig(semantic_enabled=False)) is None
+        cache = init_semantic_cache(CacheConfig(similarity_threshold=0.8))
+        assert cache.similarity_threshold == 0.8
+        assert cache.dimension == 384
+
+    @pytest.mark.asyncio
+    async def test_cleared_when_index_refreshes(self):
+        class Index:
+            published = False
+
+            def refresh(self):
+                published, self.published = self.published, False
+                return published
+
+        cache = SemanticCache(dimension=2)
+        cache.set(unit(1, 0), "ctx", "old answer")
+        index = Index()
+        refresher = asyncio.create_task(_refresh_indexes(None, index, 0, cache))
+
+        await asyncio.sleep(0.01)
+        assert cache.get(unit(1, 0), "ctx") == "old answer"
+        index.published = True
+        await asyncio.sleep(0.01)
+        refresher.cancel()
+
+        assert cache.get(unit(1, 0), "ctx") is None
+
+
+class FakeRedis:
+    """Just enough of redis.asyncio for TieredCache, shared by 'workers'."""
+
+    def __init__(self):
+        self.data: dict[str, bytes] = {}
+        self.reads = 0
+        self.subscribers: list[asyncio.Queue] = []
+
+    async def get(self, key):
+        self.reads += 1
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value.encode() if isinstance(value, str) else value
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+    async def publish(self, channel, message):
+        for queue in self.subscribers:
+            queue.put_nowait({"type": "message", "data": message.encode()})
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+
+class FakePubSub:
+    def __init__(self, server: FakeRedis):
+        self.server = server
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.server.subscribers.append(self.queue)
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def aclose(self):
+        self.server.subscribers.remove(self.queue)
+
+
+class TestLocalCache:
+    """Test cases for the in-process L1."""
+
+    def test_lru_and_ttl(self):
+        clock = Clock()
+        cache = LocalCache(max_entries=2, ttl=10, clock=clock)
+        cache.set("a", 1)
+        cache.set("b", None)
+        cache.get("a")
+        cache.set("c", 3, ttl=60)
+
+        assert cache.get("b") is MISSING
+        assert cache.get("a") == 1
+        clock.now = 11
+        assert cache.get("c") is MISSING
+
+
+class TestTieredCache:
+    """Test cases for L1/L2 reads and cross-worker invalidation."""
+
+    @pytest.mark.asyncio
+    async def test_hot_keys_skip_redis(self):
+        server = FakeRedis()
+        cache = TieredCache(server, "somaai:embed")
+
+        await cache.set("k", [0.1, 0.2], ttl=60)
+        values = [await cache.get("k") for _ in range(5)]
+        await cache.aclose()
+
+        assert values == [[0.1, 0.2]] * 5
+        assert server.reads == 0
+        assert server.data["somaai:embed:k"] == b"[0.1, 0.2]"
+
+    @pytest.mark.asyncio
+    async def test_write_invalidates_other_workers(self):
+        server = FakeRedis()
+        first = TieredCache(server, "ns")
+        second = TieredCache(server, "ns")
+        await first.set("k", "old")
+        assert await second.get("k") == "old"
+        assert await second.get("k") == "old"
+        reads = server.reads
+
+        await first.set("k", "new")
+        await asyncio.sleep(0.01)
+
+        assert await second.get("k") == "new"
+        assert server.reads == reads + 1
+        await first.delete("k")
+        await asyncio.sleep(0.01)
+        assert await second.get("k") is MISSING
+        await first.aclose()
+        await second.aclose()
+
+    @pytest.mark.asyncio
+    async def test_redis_failure_degrades_to_miss(self):
+        class DownRedis(FakeRedis):
+            async def get(self, key):
+                raise ConnectionError("down")
+
+        cache = TieredCache(DownRedis(), "ns")
+
+        assert await cache.get("k") is MISSING
+        await cache.aclose()
+
+
+class TestVectorSerializer:
+    """Tests for the packed embedding encoding."""
+
+    rng = np.random.default_rng(0)
+    batch = rng.standard_normal((4, 768)).astype(np.float32).tolist()
+
+    def test_float32_round_trips_exactly_and_is_compact(self):
+        serializer = VectorSerializer()
+        vector = self.batch[0]
+        raw = serializer.dumps(vector)
+
+        assert serializer.loads(raw) == vector
+        assert len(raw) == 12 + 768 * 4
+        assert len(raw) * 4 < len(JsonSerializer().dumps(vector))
+
+    def test_batch_is_one_blob(self):
+        serializer = VectorSerializer()
+        raw = serializer.dumps(self.batch)
+
+        assert len(raw) == 12 + 4 * 768 * 4
+        assert serializer.loads(raw) == self.batch
+
+    @pytest.mark.parametrize(
+        ("encoding", "size", "tolerance"),
+        [("float16", 12 + 4 * 768 * 2, 2e-3), ("int8", 12 + 4 * 4 + 4 * 768, 2e-2)],
+    )
+    def test_lossy_encodings_stay_close(self, encoding, size, tolerance):
+        serializer = VectorSerializer(encoding)
+        raw = serializer.dumps(self.batch)
+        decoded = np.array(serializer.loads(raw))
+        original = np.array(self.batch)
+        cosine = (decoded * original).sum(axis=1) / (
+            np.linalg.norm(decoded, axis=1) * np.linalg.norm(original, axis=1)
+        )
+
+        assert len(raw) == size
+        np.testing.assert_allclose(cosine, 1.0, atol=tolerance)
+
+    def test_other_values_and_legacy_json_fall_back(self):
+        serializer = VectorSerializer("int8")
+
+        for value in ([1, 2, 3], ["a"], {"k": [0.5]}, [], [[]]):
+            assert serializer.loads(serializer.dumps(value)) == value
+        assert serializer.loads(b"[0.25, 0.5]") == [0.25, 0.5]
+
+    def test_rejects_unknown_encoding(self):
+        with pytest.raises(ValueError):
+            VectorSerializer("bfloat16")
+
+    @pytest.mark.asyncio
+    async def test_tiered_cache_stores_binary(self):
+        server = FakeRedis()
+        writer = TieredCache(server, "ns", serializer=VectorSerializer())
+        reader = TieredCache(server, "ns", serializer=VectorSerializer())
+
+        await writer.set("k", self.batch)
+
+        assert server.data["ns:k"][:2] == b"\xffV"
+        assert await reader.get("k") == self.batch
+        await writer.aclose()
+        await reader.aclose()
+
+
+class TestRedisPool:
+    """Tests for the shared Redis connection pool."""
+
+    def test_pool_honours_url_password_and_tuning(self):
+        pytest.importorskip("redis")
+        client = connection.create_redis_client(
+            CacheConfig(
+                redis_url="redis://cache:6380/3",
+                redis_password="secret",
+                redis_max_connections=7,
+                redis_socket_timeout=1.5,
+                redis_connect_timeout=0.5,
+                redis_health_check_interval=10,
+            )
+        )
+        pool = client.connection_pool
+        kwargs = pool.connection_kwargs
+
+        assert (kwargs["host"], kwargs["port"], kwargs["db"]) == ("cache", 6380, 3)
+        assert kwargs["password"] == "secret"
+        assert pool.max_connections == 7
+        assert kwargs["socket_timeout"] == 1.5
+        assert kwargs["socket_connect_timeout"] == 0.5
+        assert kwargs["health_check_interval"] == 10
+
+    @pytest.mark.asyncio
+    async def test_caches_and_sessions_share_one_client(self, monkeypatch):
+        pytest.importorskip("redis")
+        monkeypatch.setattr(connection, "_client", None)
+        monkeypatch.setattr(decorators, "_caches", {})
+        shared = connection.init_redis(CacheConfig())
+        sessions = SessionManager()
+        await sessions.connect()
+
+        assert connection.get_redis() is shared
+        assert decorators.get_tiered_cache("query").client is shared
+        assert isinstance(
+            decorators.get_tiered_cache("embed").serializer, VectorSerializer
+        )
+        assert sessions._client is shared
+
+        await sessions.disconnect()
+        assert connection.get_redis() is shared
+        await decorators.close_tiered_caches()
+        await connection.close_redis()
+        assert connection._client is None
+
+
+class TestBuildKey:
+    """Tests for the hashed decorator cache keys."""
+
+    @staticmethod
+    async def ask(question: str, top_k: int = 5) -> str:
+        return question
+
+    def test_long_shared_prefixes_do_not_collide(self):
+        prefix = "Explain photosynthesis to a grade 5 student " * 3
+
+        first = decorators._build_key(self.ask, prefix + "using plants")
+        second = decorators._build_key(self.ask, prefix + "using algae")
+
+        assert first != second
+        assert len(first) == len(second) < 120
+
+    def test_call_spellings_and_defaults_share_a_key(self):
+        key = decorators._build_key(self.ask, "q")
+
+        assert decorators._build_key(self.ask, question="q") == key
+        assert decorators._build_key(self.ask, "q", top_k=5) == key
+        assert decorators._build_key(self.ask, "q", 6) != key
+
+    def test_bound_instance_is_skipped(self):
+        class Service:
+            def __init__(self, name):
+                self.name = name
+
+            async def answer(self, question: str) -> str:
+                return question
+
+        first = decorators._build_key(Service.answer, Service("a"), "q")
+
+        assert decorators._build_key(Service.answer, Service("b"), "q") == first
+        assert decorators._build_key(Service.answer, Service("a"), "r") != first
+
+    def test_structured_arguments_are_hashed_by_content(self):
+        def key(preferences):
+            return decorators._build_key(self.ask, "q", preferences)
+
+        assert key(Preferences(enable_analogy=True)) == key(
+            Preferences(enable_analogy=True)
+        )
+        assert key(Preferences(enable_analogy=True)) != key(
+            Preferences(enable_analogy=False)
+        )
+        assert key(np.array([1.0, 2.0])) == key([1.0, 2.0])
+
+    def test_mixed_and_tuple_mapping_keys(self):
+        def key(mapping):
+            return decorators._build_key(self.ask, "q", mapping)
+
+        assert key({1: "a", "1": "b"}) == key({"1": "b", 1: "a"})
+        assert key({1: "a"}) != key({"1": "a"})
+        assert key({(1, 2): "a"}) != key({(1, 3): "a"})
+
+    @pytest.mark.asyncio
+    async def test_unkeyable_arguments_are_called_uncached(self):
+        cache = decorators.SimpleCache()
+        calls = 0
+
+        @cache.cached()
+        async def lookup(handle) -> int:
+            nonlocal calls
+            calls += 1
+            return calls
+
+        handle = object()
+        with pytest.raises(TypeError):
+            decorators._build_key(lookup, handle)
+        assert [await lookup(handle), await lookup(handle)] == [1, 2]
+        assert [await lookup("x"), await lookup("x")] == [3, 3]
+
+    def test_version_salt_changes_every_key(self, monkeypatch):
+        config = CacheConfig()
+        monkeypatch.setattr(decorators, "get_cache_config", lambda: config)
+        before = decorators._build_key(self.ask, "q")
+        config.key_version = "2"
+
+        after = decorators._build_key(self.ask, "q")
+
+        assert after != before
+        assert ":v2:" in after
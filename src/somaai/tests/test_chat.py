@@ -1,7 +1,53 @@
 """Tests for chat endpoints."""
 
+import json
+
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from somaai.cache.semantic import SemanticCache
+from somaai.db.base import Base
+from somaai.db.models import Message, MessageCitation
+from somaai.db.session import get_session_factory
+from somaai.deps import get_rag_pipeline, get_semantic_cache
+from somaai.modules.knowledge.stores.hnsw import HNSWStore
+from somaai.modules.rag.pipelines import RAGPipeline
+from somaai.modules.rag.retriever import Retriever
+from somaai.modules.telemetry.metrics import metrics
+
+
+class StreamingLLM:
+    """Streams a fixed answer word by word; embeds every text alike."""
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        return [[1.0, 0.0] for _ in texts]
+
+    async def generate(self, prompt: str) -> str:
+        return "Plants make food"
+
+    async def generate_stream(self, prompt: str):
+        for word in ["Plants ", "make ", "food"]:
+            yield word
+
+
+def parse_events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data[6:])))
+    return events
+
+
+def semantic_hits() -> float:
+    counters = metrics.get_metrics()["counters"].get("llm_cache", [])
+    return sum(
+        entry["value"]
+        for entry in counters
+        if entry["labels"].get("cache") == "semantic"
+    )
 
 
 class TestChatEndpoints:
@@ -46,3 +92,114 @@ class TestChatEndpoints:
     async def test_get_citations_returns_list(self, client: AsyncClient):
         """GET /chat/messages/{id}/citations returns citation list."""
         pass
+
+
+class TestChatStream:
+    """Test cases for POST /api/v1/chat/ask/stream."""
+
+    @pytest.fixture
+    async def session_factory(self):
+        engine = create_async_engine(
+            "sqlite+aiosqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        yield async_sessionmaker(engine, expire_on_commit=False)
+        await engine.dispose()
+
+    @pytest.fixture
+    async def pipeline(self):
+        llm = StreamingLLM()
+        store = HNSWStore(dim=2, seed=0)
+        await store.add(
+            ["Photosynthesis makes food in leaves"],
+            await llm.embed(["x"]),
+            ids=["chunk-1"],
+            metadatas=[{"grade": "S1", "subject": "science", "doc_id": "doc-1"}],
+        )
+        return RAGPipeline(Retriever(store=store, llm=llm))
+
+    @pytest.mark.asyncio
+    async def test_streams_citations_then_tokens_and_saves(
+        self, client, session_factory, pipeline
+    ):
+        """Citations arrive before tokens; the message is saved afterwards."""
+        client.app.dependency_overrides[get_rag_pipeline] = lambda: pipeline
+        client.app.dependency_overrides[get_session_factory] = lambda: session_factory
+
+        response = client.post(
+            "/api/v1/chat/ask/stream",
+            json={
+                "question": "What is photosynthesis?",
+                "grade": "S1",
+                "subject": "science",
+            },
+        )
+        events = parse_events(response.text)
+
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert [name for name, _ in events] == [
+            "citations",
+            "token",
+            "token",
+            "token",
+            "done",
+        ]
+        message_id = events[0][1]["message_id"]
+        assert events[0][1]["citations"][0]["doc_id"] == "doc-1"
+
+        async with session_factory() as session:
+            message = await session.get(Message, message_id)
+            citations = (await session.execute(select(MessageCitation))).scalars()
+            assert message.answer == "Plants make food"
+            assert [c.chunk_id for c in citations] == ["chunk-1"]
+
+    @pytest.mark.asyncio
+    async def test_insufficient_context_streams_fallback(self, client, session_factory):
+        """Nothing retrieved: fallback answer, sufficiency insufficient."""
+        empty = RAGPipeline(Retriever(store=HNSWStore(dim=2), llm=StreamingLLM()))
+        client.app.dependency_overrides[get_rag_pipeline] = lambda: empty
+        client.app.dependency_overrides[get_session_factory] = lambda: session_factory
+
+        response = client.post(
+            "/api/v1/chat/ask/stream",
+            json={"question": "Who won?", "grade": "S2", "subject": "ict"},
+        )
+        events = parse_events(response.text)
+
+        assert events[0][1]["sufficiency"] == "insufficient"
+        assert [name for name, _ in events] == ["citations", "token", "done"]
+
+    @pytest.mark.asyncio
+    async def test_paraphrase_is_answered_from_semantic_cache(
+        self, client, session_factory, pipeline
+    ):
+        """A repeat question skips retrieval and generation."""
+        cache = SemanticCache(dimension=2)
+        client.app.dependency_overrides[get_rag_pipeline] = lambda: pipeline
+        client.app.dependency_overrides[get_session_factory] = lambda: session_factory
+        client.app.dependency_overrides[get_semantic_cache] = lambda: cache
+        body = {
+            "question": "What is photosynthesis?",
+            "grade": "S1",
+            "subject": "science",
+        }
+        hits = semantic_hits()
+
+        first = parse_events(client.post("/api/v1/chat/ask/stream", json=body).text)
+        pipeline.retriever.store = None
+        body["question"] = "Explain photosynthesis"
+        second = parse_events(client.post("/api/v1/chat/ask/stream", json=body).text)
+        body["grade"] = "S2"
+        other_grade = parse_events(
+            client.post("/api/v1/chat/ask/stream", json=body).text
+        )
+
+        assert [name for name, _ in second] == ["citations", "token", "done"]
+        assert second[1][1]["text"] == "Plants make food"
+        assert second[0][1]["citations"] == first[0][1]["citations"]
+        assert other_grade[0][1]["sufficiency"] == "insufficient"
+        assert cache.stats()["hits"] == 1
+        assert semantic_hits() == hits + 1
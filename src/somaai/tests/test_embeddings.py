@@ -0,0 +1,105 @@
+"""Tests for the local process-pool embedding model."""
+
+import asyncio
+import os
+import time
+
+import numpy as np
+import pytest
+
+from somaai.modules.knowledge.embeddings import (
+    LocalEmbeddingLLMClient,
+    LocalEmbeddingModel,
+    get_embedding_model,
+)
+from somaai.providers.llm import MockLLMProvider, hash_embedding
+from somaai.settings import Settings
+
+LOADS = 0
+
+
+class HashEncoder:
+    """Stand-in for the ONNX model; reports its worker pid and load count."""
+
+    def __init__(self, dimension: int):
+        global LOADS
+        LOADS += 1
+        self.dimension = dimension
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        time.sleep(0.05)
+        return np.array(
+            [
+                hash_embedding(text, self.dimension) + [os.getpid(), LOADS, len(texts)]
+                for text in texts
+            ],
+            dtype=np.float32,
+        )
+
+
+@pytest.fixture(scope="module")
+def model():
+    model = LocalEmbeddingModel(HashEncoder, (16,), workers=2, batch_size=4)
+    yield model
+    model.close()
+
+
+class TestLocalEmbeddingModel:
+    """Test cases for batched CPU embeddings in worker processes."""
+
+    @pytest.mark.asyncio
+    async def test_embeds_in_order_across_batches(self, model):
+        texts = [f"text {'x' * (i % 5)} {i}" for i in range(10)]
+
+        vectors = await model.embed(texts)
+
+        np.testing.assert_allclose(
+            [v[:16] for v in vectors],
+            [hash_embedding(text, 16) for text in texts],
+            atol=1e-6,
+        )
+        assert max(v[-1] for v in vectors) == 4
+        assert os.getpid() not in {v[16] for v in vectors}
+
+    @pytest.mark.asyncio
+    async def test_model_loaded_once_per_worker(self, model):
+        for _ in range(3):
+            vectors = await model.embed([f"t{i}" for i in range(8)])
+
+        assert {v[17] for v in vectors} == {1.0}
+
+    @pytest.mark.asyncio
+    async def test_event_loop_stays_free(self, model):
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        beat = asyncio.create_task(heartbeat())
+        await model.embed(["a"] * 8)
+        beat.cancel()
+
+        assert ticks >= 5
+
+    @pytest.mark.asyncio
+    async def test_client_embeds_locally_and_generates_upstream(self, model):
+        client = LocalEmbeddingLLMClient(MockLLMProvider(), model)
+
+        assert await client.generate("hi") == "MOCK_ANSWER: hi"
+        assert len((await client.embed(["hi"]))[0]) == 19
+        assert await model.embed([]) == []
+
+    @pytest.mark.asyncio
+    async def test_rejects_width_other_than_configured(self, model, monkeypatch):
+        monkeypatch.setattr(model, "dimension", 16)
+
+        with pytest.raises(ValueError, match="EMBEDDING_DIMENSION"):
+            await model.embed(["hi"])
+
+    def test_llm_backend_needs_no_local_model(self):
+        assert get_embedding_model(Settings()) is None
+        with pytest.raises(ValueError):
+            get_embedding_model(Settings(embedding_backend="remote"))
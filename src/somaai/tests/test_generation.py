@@ -0,0 +1,73 @@
+"""Tests for RAG answer generation."""
+
+import asyncio
+import time
+
+import pytest
+
+from somaai.modules.rag.generator import CombinedGenerator
+
+
+class SlowLLM:
+    """Answers after a delay that depends on the prompt type."""
+
+    def __init__(self, delays: dict[str, float], fail_answer: bool = False):
+        self.delays = delays
+        self.fail_answer = fail_answer
+
+        self.finished: list[str] = []
+
+    async def generate(self, prompt: str) -> str:
+        kind = next((k for k in self.delays if k in prompt), "Answer")
+        await asyncio.sleep(self.delays.get(kind, 0.1))
+        if kind == "Answer" and self.fail_answer:
+            raise RuntimeError("provider down")
+        self.finished.append(kind)
+        return kind
+
+
+class TestCombinedGenerator:
+    """Test cases for concurrent answer generation."""
+
+    @pytest.mark.asyncio
+    async def test_branches_run_concurrently(self):
+        llm = SlowLLM({"Analogy": 0.2, "Real-world use": 0.2, "Answer": 0.2})
+        generator = CombinedGenerator(llm)
+
+        start = time.perf_counter()
+        result = await generator.generate_all(
+            "q", ["ctx"], enable_analogy=True, enable_realworld=True
+        )
+
+        assert time.perf_counter() - start < 0.4
+        assert result.answer == "Answer"
+        assert result.analogy == "Analogy"
+        assert result.realworld_context == "Real-world use"
+
+    @pytest.mark.asyncio
+    async def test_slow_branch_is_dropped(self):
+        llm = SlowLLM({"Analogy": 1.0, "Answer": 0.05})
+        generator = CombinedGenerator(llm, branch_timeout=0.1)
+
+        start = time.perf_counter()
+        result = await generator.generate_all("q", ["ctx"], enable_analogy=True)
+
+        assert time.perf_counter() - start < 0.5
+        assert result.answer == "Answer"
+        assert result.analogy is None
+        assert result.realworld_context is None
+
+    @pytest.mark.asyncio
+    async def test_failed_answer_cancels_branches(self):
+        llm = SlowLLM(
+            {"Analogy": 0.2, "Real-world use": 0.2, "Answer": 0.01}, fail_answer=True
+        )
+        generator = CombinedGenerator(llm)
+
+        with pytest.raises(RuntimeError):
+            await generator.generate_all(
+                "q", ["ctx"], enable_analogy=True, enable_realworld=True
+            )
+        await asyncio.sleep(0.3)
+
+        assert llm.finished == []
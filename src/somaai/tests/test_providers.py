@@ -0,0 +1,590 @@
+"""Tests for LLM providers and the shared HTTP pool."""
+
+import asyncio
+import threading
+import time
+
+import httpx
+import numpy as np
+import pytest
+import uvicorn
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from somaai.exceptions import DeadlineExceededError, OverloadedError, RateLimitError
+from somaai.middleware import DeadlineMiddleware
+from somaai.providers.batching import EmbeddingBatcher
+from somaai.providers.coalescing import CoalescingLLMClient, prompt_key
+from somaai.providers.context import (
+    Priority,
+    current_deadline,
+    llm_deadline,
+    llm_priority,
+)
+from somaai.providers.hedging import HedgedLLMClient
+from somaai.providers.http import create_http_client
+from somaai.providers.limiter import AdaptiveLimiter, LimitedLLMClient
+from somaai.providers.llm import (
+    GroqLLMProvider,
+    MockLLMProvider,
+    MockSimulation,
+    OpenAILLMProvider,
+    get_llm,
+)
+from somaai.providers.stub_server import EMBEDDING_DIMENSION, create_stub_app
+from somaai.settings import Settings
+
+
+@pytest.fixture
+def stub():
+    return create_stub_app()
+
+
+@pytest.fixture
+async def provider(stub):
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=stub))
+    yield OpenAILLMProvider(
+        "key", "stub-model", client=client, base_url="http://stub/v1"
+    )
+    await client.aclose()
+
+
+@pytest.fixture
+def stub_server(stub):
+    """Run the stub on a real socket so connection reuse is observable."""
+    server = uvicorn.Server(
+        uvicorn.Config(stub, host="127.0.0.1", port=0, log_level="error")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}/v1"
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+class TestOpenAICompatibleProvider:
+    """Test cases for the OpenAI-style HTTP providers."""
+
+    @pytest.mark.asyncio
+    async def test_generate_stream_and_embed(self, provider):
+        answer = await provider.generate("What is rain?")
+        streamed = [token async for token in provider.generate_stream("What is rain?")]
+        vectors = await provider.embed(["a", "b"])
+
+        assert answer == "STUB_ANSWER: What is rain?"
+        assert "".join(streamed).strip() == answer
+        assert len(streamed) > 1
+        assert [len(v) for v in vectors] == [EMBEDDING_DIMENSION] * 2
+        assert vectors[0] != vectors[1]
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_raises_with_retry_after(self, stub, provider):
+        stub.state.fail_status = 429
+
+        with pytest.raises(RateLimitError) as exc_info:
+            await provider.generate("hi")
+        with pytest.raises(RateLimitError):
+            [token async for token in provider.generate_stream("hi")]
+
+        assert exc_info.value.retry_after == 1.0
+
+    @pytest.mark.asyncio
+    async def test_requests_configured_embedding_dimension(self, provider):
+        provider.embedding_dimensions = 768
+
+        vectors = await provider.embed(["a"])
+
+        assert len(vectors[0]) == 768
+        assert (
+            get_llm(
+                Settings(llm_backend="openai", openai_api_key="k", openai_model="m")
+            ).embedding_dimensions
+            == Settings().embedding_dimension
+        )
+
+    @pytest.mark.asyncio
+    async def test_groq_has_no_embeddings(self):
+        groq = GroqLLMProvider("key", "llama3.2")
+        with pytest.raises(NotImplementedError):
+            await groq.embed(["text"])
+        await groq.aclose()
+
+
+class TestHTTPPool:
+    """Test cases for the shared keep-alive client."""
+
+    @pytest.mark.asyncio
+    async def test_pooled_client_reuses_connections(self, stub, stub_server):
+        settings = Settings(http_max_connections=4)
+        client = create_http_client(settings)
+        provider = OpenAILLMProvider(
+            "key", "stub-model", client=client, base_url=stub_server
+        )
+
+        await asyncio.gather(*(provider.generate(f"q{i}") for i in range(20)))
+        await client.aclose()
+
+        ports = {address.port for address in stub.state.connections}
+        assert len(stub.state.connections) == 20
+        assert len(ports) <= 4
+
+
+class CountingLLM:
+    """Tracks peak concurrency; sleeps per call."""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.order: list[str] = []
+
+    async def generate(self, prompt: str) -> str:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        self.order.append(prompt)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        if prompt == "429":
+            raise RateLimitError("slow down")
+        return prompt
+
+
+class TestAdaptiveLimiter:
+    """Test cases for the AIMD limiter and its queue."""
+
+    @pytest.mark.asyncio
+    async def test_caps_concurrency(self):
+        llm = CountingLLM()
+        client = LimitedLLMClient(llm, generation=AdaptiveLimiter(initial_limit=2))
+
+        await asyncio.gather(*(client.generate(str(i)) for i in range(6)))
+
+        assert llm.peak == 2
+
+    @pytest.mark.asyncio
+    async def test_interactive_calls_jump_the_queue(self):
+        llm = CountingLLM()
+        limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+        client = LimitedLLMClient(llm, generation=limiter)
+
+        async def call(prompt: str, priority: Priority):
+            with llm_priority(priority):
+                return await client.generate(prompt)
+
+        first = asyncio.create_task(call("first", Priority.INTERACTIVE))
+        await asyncio.sleep(0)
+        queued = [
+            asyncio.create_task(call("quiz", Priority.BACKGROUND)),
+            asyncio.create_task(call("chat", Priority.INTERACTIVE)),
+        ]
+        await asyncio.gather(first, *queued)
+
+        assert llm.order == ["first", "chat", "quiz"]
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_backs_off_and_success_grows(self):
+        limiter = AdaptiveLimiter(initial_limit=8)
+        client = LimitedLLMClient(CountingLLM(delay=0), generation=limiter)
+
+        with pytest.raises(RateLimitError):
+            await client.generate("429")
+        assert limiter.limit == 4
+        for _ in range(20):
+            await client.generate("ok")
+        assert limiter.limit > 4
+
+    @pytest.mark.asyncio
+    async def test_rejects_fast_when_deadline_cannot_be_met(self):
+        limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+        client = LimitedLLMClient(CountingLLM(delay=0.2), generation=limiter)
+        await client.generate("warm up")
+        busy = asyncio.create_task(client.generate("busy"))
+        await asyncio.sleep(0)
+
+        start = time.monotonic()
+        with llm_deadline(0.05), pytest.raises(OverloadedError):
+            await client.generate("late")
+
+        assert time.monotonic() - start < 0.05
+        assert limiter.rejected == 1
+        await busy
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_queue_full(self):
+        limiter = AdaptiveLimiter(initial_limit=1, max_queue=0)
+        client = LimitedLLMClient(CountingLLM(), generation=limiter)
+        busy = asyncio.create_task(client.generate("busy"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(OverloadedError):
+            await client.generate("extra")
+        await busy
+
+
+class UpstreamLLM:
+    """Counts upstream calls; slow enough for callers to overlap."""
+
+    def __init__(self):
+        self.calls = 0
+        self.embedded: list[list[str]] = []
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return prompt.upper()
+
+    async def generate_stream(self, prompt: str):
+        self.calls += 1
+        for word in prompt.split():
+            await asyncio.sleep(0.01)
+            yield word
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        self.embedded.append(texts)
+        await asyncio.sleep(0.05)
+        return [[float(len(text))] for text in texts]
+
+
+class TestCoalescing:
+    """Test cases for single-flight coalescing."""
+
+    def test_key_ignores_whitespace_differences(self):
+        assert prompt_key("g", "What  is\nrain? ") == prompt_key("g", "What is rain?")
+        assert prompt_key("g", "rain") != prompt_key("embed", "rain")
+
+    @pytest.mark.asyncio
+    async def test_identical_generates_share_one_call(self):
+        upstream = UpstreamLLM()
+        client = CoalescingLLMClient(upstream)
+
+        results = await asyncio.gather(
+            *(client.generate("what is rain") for _ in range(40))
+        )
+        await client.generate("what is rain")
+
+        assert set(results) == {"WHAT IS RAIN"}
+        assert upstream.calls == 2
+        assert client.coalesced == 39
+
+    @pytest.mark.asyncio
+    async def test_embeds_share_per_text_work(self):
+        upstream = UpstreamLLM()
+        client = CoalescingLLMClient(upstream)
+
+        first, second = await asyncio.gather(
+            client.embed(["a", "bb"]), client.embed(["bb", "ccc", "ccc"])
+        )
+
+        assert first == [[1.0], [2.0]]
+        assert second == [[2.0], [3.0], [3.0]]
+        assert upstream.embedded == [["a", "bb"], ["ccc"]]
+
+    @pytest.mark.asyncio
+    async def test_streams_fan_out_from_one_upstream(self):
+        upstream = UpstreamLLM()
+        client = CoalescingLLMClient(upstream)
+
+        async def collect():
+            return [token async for token in client.generate_stream("a b c d")]
+
+        early = asyncio.create_task(collect())
+        await asyncio.sleep(0.025)
+        late = asyncio.create_task(collect())
+
+        assert await early == await late == ["a", "b", "c", "d"]
+        assert upstream.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_caller_after_last_leaves_starts_fresh_stream(self):
+        upstream = UpstreamLLM()
+        client = CoalescingLLMClient(upstream)
+
+        stream = client.generate_stream("a b c")
+        assert await stream.__anext__() == "a"
+        await stream.aclose()
+        late = [token async for token in client.generate_stream("a b c")]
+
+        assert late == ["a", "b", "c"]
+        assert upstream.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_caller_after_last_leaves_starts_fresh_call(self):
+        upstream = UpstreamLLM()
+        client = CoalescingLLMClient(upstream)
+
+        first = asyncio.create_task(client.generate("q"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        while not first.done():
+            await asyncio.sleep(0)
+
+        assert await client.generate("q") == "Q"
+        assert upstream.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_one_cancelled_caller_does_not_cancel_others(self):
+        upstream = UpstreamLLM()
+        client = CoalescingLLMClient(upstream)
+
+        impatient = asyncio.create_task(client.generate("q"))
+        patient = asyncio.create_task(client.generate("q"))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+
+        assert await patient == "Q"
+        assert upstream.calls == 1
+
+
+class TestEmbeddingBatcher:
+    """Test cases for embed micro-batching."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_batch(self):
+        upstream = UpstreamLLM()
+        batcher = EmbeddingBatcher(upstream.embed, max_batch_size=64)
+
+        results = await asyncio.gather(
+            batcher.embed(["a"]), batcher.embed(["bb", "ccc"]), batcher.embed([])
+        )
+
+        assert results == [[[1.0]], [[2.0], [3.0]], []]
+        assert upstream.embedded == [["a", "bb", "ccc"]]
+
+    @pytest.mark.asyncio
+    async def test_full_batch_is_sent_without_waiting(self):
+        upstream = UpstreamLLM()
+        batcher = EmbeddingBatcher(upstream.embed, max_batch_size=2, max_wait=10)
+
+        result = await asyncio.wait_for(batcher.embed(["a", "b", "c"]), timeout=1)
+
+        assert result == [[1.0], [1.0], [1.0]]
+        assert upstream.embedded == [["a", "b"], ["c"]]
+
+    @pytest.mark.asyncio
+    async def test_failure_reaches_every_caller(self):
+        async def broken(texts):
+            raise RateLimitError("slow down")
+
+        batcher = EmbeddingBatcher(broken)
+        results = await asyncio.gather(
+            batcher.embed(["a"]), batcher.embed(["b"]), return_exceptions=True
+        )
+
+        assert all(isinstance(r, RateLimitError) for r in results)
+
+
+class TimedLLM:
+    """Answers with its name after a fixed delay, or fails."""
+
+    def __init__(self, name: str, delay: float, fail: bool = False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise RateLimitError("slow down")
+        return self.name
+
+    async def generate_stream(self, prompt: str):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        for token in (self.name, "!"):
+            yield token
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        return [[0.0] for _ in texts]
+
+
+class TestHedging:
+    """Test cases for hedged LLM calls and deadlines."""
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self):
+        primary, secondary = TimedLLM("p", 0.01), TimedLLM("s", 0.01)
+        client = HedgedLLMClient(primary, secondary, initial_delay=0.2)
+
+        assert await client.generate("q") == "p"
+        assert secondary.calls == 0
+        assert client.stats()["hedged"] == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_loses_to_hedge(self):
+        primary, secondary = TimedLLM("p", 1.0), TimedLLM("s", 0.01)
+        client = HedgedLLMClient(primary, secondary, initial_delay=0.02)
+
+        start = time.monotonic()
+        assert await client.generate("q") == "s"
+
+        assert time.monotonic() - start < 0.5
+        assert primary.cancelled == 1
+        stats = client.stats()
+        assert stats["hedged"] == stats["hedge_wins"] == 1
+        assert stats["hedge_win_rate"] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_primary_error_fails_over(self):
+        primary = TimedLLM("p", 0.0, fail=True)
+        client = HedgedLLMClient(primary, TimedLLM("s", 0.0), initial_delay=1.0)
+
+        assert await client.generate("q") == "s"
+        assert client.stats()["failovers"] == 1
+
+    @pytest.mark.asyncio
+    async def test_hedge_delay_follows_primary_percentile(self):
+        client = HedgedLLMClient(
+            TimedLLM("p", 0.01), TimedLLM("s", 0.0), initial_delay=5, min_samples=5
+        )
+        for _ in range(5):
+            await client.generate("q")
+
+        assert client.stats()["generate_delay"] < 0.1
+
+    @pytest.mark.asyncio
+    async def test_hedge_delay_keeps_slow_primary_samples(self):
+        primary = TimedLLM("p", 0.01)
+        client = HedgedLLMClient(
+            primary, TimedLLM("s", 0.01), initial_delay=5, min_samples=5
+        )
+        for _ in range(5):
+            await client.generate("q")
+        warm_delay = client.stats()["generate_delay"]
+
+        primary.delay = 1.0
+        for _ in range(10):
+            assert await client.generate("q") == "s"
+
+        assert client.stats()["generate_delay"] > warm_delay
+
+    @pytest.mark.asyncio
+    async def test_stream_hedges_on_first_token(self):
+        client = HedgedLLMClient(
+            TimedLLM("p", 1.0), TimedLLM("s", 0.0), initial_delay=0.02
+        )
+
+        tokens = [token async for token in client.generate_stream("q")]
+
+        assert tokens == ["s", "!"]
+
+    @pytest.mark.asyncio
+    async def test_deadline_bounds_both_backends(self):
+        client = HedgedLLMClient(
+            TimedLLM("p", 1.0), TimedLLM("s", 1.0), initial_delay=0.01
+        )
+
+        start = time.monotonic()
+        with llm_deadline(0.05), pytest.raises(DeadlineExceededError):
+            await client.generate("q")
+        assert time.monotonic() - start < 0.5
+
+    def test_get_llm_builds_hedged_pair(self):
+        settings = Settings(
+            llm_backend="groq",
+            groq_api_key="g",
+            llm_hedge_backend="mock",
+        )
+        llm = get_llm(settings)
+
+        assert isinstance(llm, HedgedLLMClient)
+        assert isinstance(llm.primary, GroqLLMProvider)
+        assert isinstance(llm.secondary, MockLLMProvider)
+
+    @pytest.mark.asyncio
+    async def test_embeds_go_to_hedge_when_primary_has_none(self, stub):
+        settings = Settings(
+            llm_backend="groq",
+            groq_api_key="g",
+            llm_hedge_backend="openai",
+            openai_api_key="o",
+            openai_model="stub-model",
+            openai_base_url="http://stub/v1",
+        )
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=stub)) as http:
+            llm = get_llm(settings, http)
+
+            vectors = await llm.embed(["photosynthesis"])
+
+        assert llm.embedder is llm.secondary
+        assert len(vectors[0]) == settings.embedding_dimension
+
+    def test_request_deadline_reaches_handlers(self):
+        app = FastAPI()
+        app.add_middleware(DeadlineMiddleware, deadline_seconds=30)
+
+        @app.get("/remaining")
+        async def remaining():
+            return {"remaining": current_deadline() - time.monotonic()}
+
+        with TestClient(app) as client:
+            default = client.get("/remaining").json()["remaining"]
+            shortened = client.get(
+                "/remaining", headers={"X-Request-Timeout-Ms": "500"}
+            ).json()["remaining"]
+
+        assert 29 < default <= 30
+        assert 0 < shortened <= 0.5
+
+
+class TestMockSimulation:
+    """Test cases for the mock provider's simulation mode."""
+
+    @pytest.mark.asyncio
+    async def test_default_mock_is_instant(self):
+        mock = MockLLMProvider()
+
+        assert await mock.generate("hi") == "MOCK_ANSWER: hi"
+        assert [t async for t in mock.generate_stream("hi")] == ["MOCK_ANSWER: hi"]
+
+    @pytest.mark.asyncio
+    async def test_hash_embeddings_have_similarity_structure(self):
+        mock = MockLLMProvider()
+        rain, rainfall, volcano = (
+            np.array(v)
+            for v in await mock.embed(["how rain forms", "rainfall forms", "volcano"])
+        )
+
+        assert np.isclose(np.linalg.norm(rain), 1.0)
+        assert rain @ rainfall > 0.3
+        assert abs(rain @ volcano) < rain @ rainfall
+        assert (await mock.embed(["how rain forms"]))[0] == rain.tolist()
+
+    @pytest.mark.asyncio
+    async def test_streams_tokens_with_latency(self):
+        mock = MockLLMProvider(
+            MockSimulation(ttft_ms=30, ttft_sigma=0, token_ms=10, answer_tokens=5)
+        )
+
+        start = time.monotonic()
+        stream = mock.generate_stream("q")
+        first = await stream.__anext__()
+        ttft = time.monotonic() - start
+        rest = [token async for token in stream]
+
+        assert first == "MOCK_ANSWER:"
+
+        assert 0.025 < ttft < 0.2
+        assert len(rest) == 4
+        assert time.monotonic() - start >= 0.065
+
+    @pytest.mark.asyncio
+    async def test_concurrency_cap_and_injected_rate_limits(self):
+        capped = MockLLMProvider(MockSimulation(ttft_ms=20, max_concurrency=2))
+        results = await asyncio.gather(
+            *(capped.generate("q") for _ in range(5)), return_exceptions=True
+        )
+        flaky = MockLLMProvider(MockSimulation(rate_limit_probability=1.0))
+
+        assert sum(isinstance(r, RateLimitError) for r in results) == 3
+        with pytest.raises(RateLimitError):
+            await flaky.embed(["a"])
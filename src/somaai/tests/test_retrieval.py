@@ -0,0 +1,406 @@
+"""Tests for lexical and hybrid retrieval."""
+
+import math
+import random
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from somaai.app import create_app
+from somaai.deps import get_rag_pipeline
+from somaai.modules.knowledge.lexical import BM25Index
+from somaai.modules.knowledge.postings import (
+    decode_postings,
+    decode_varints,
+    encode_postings,
+    encode_varints,
+)
+from somaai.modules.knowledge.stores.hnsw import HNSWStore
+from somaai.modules.knowledge.tokenize import tokenize
+from somaai.modules.rag.context import (
+    ContextPacker,
+    context_budget,
+    merge_adjacent,
+)
+from somaai.modules.rag.fusion import reciprocal_rank_fusion
+from somaai.modules.rag.mmr import mmr_select
+from somaai.modules.rag.pipelines import RAGPipeline
+from somaai.modules.rag.reranker import OverlapScorer, Reranker
+from somaai.modules.rag.retriever import Retriever
+from somaai.settings import settings
+from somaai.utils.tokens import count_tokens
+
+
+class KeywordEmbedder:
+    """Embeds texts as bag-of-keywords vectors over a fixed vocabulary."""
+
+    VOCAB = ["photosynthesis", "fraction", "volcano", "ubuzima"]
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        return [
+            [float(word in text.lower()) + 0.01 for word in self.VOCAB]
+            for text in texts
+        ]
+
+
+class TestTokenize:
+    """Test cases for multilingual tokenization."""
+
+    def test_strips_accents_and_case(self):
+        assert tokenize("Élève ÉCOLE") == ["eleve", "ecole"]
+
+    def test_splits_french_elisions(self):
+        assert tokenize("l'eau qu'il boit") == ["eau", "boit"]
+
+    def test_splits_kinyarwanda_contractions(self):
+        assert tokenize("Amateka y'u Rwanda n'ubuzima") == [
+            "amateka",
+            "rwanda",
+            "ubuzima",
+        ]
+
+    def test_handles_typographic_apostrophes(self):
+        assert tokenize("cy’imibare") == ["imibare"]
+
+
+class TestBM25Index:
+    """Test cases for the BM25 index."""
+
+    def test_ranks_exact_term_matches_first(self):
+        index = BM25Index()
+        index.add(
+            ["Photosynthesis happens in leaves", "Volcanoes erupt lava", "Leaves"],
+            ids=["c1", "c2", "c3"],
+        )
+
+        results = index.search("photosynthesis leaves", top_k=2)
+
+        assert [r["id"] for r in results] == ["c1", "c3"]
+
+    def test_filters_and_delete(self):
+        index = BM25Index()
+        index.add(
+            ["fractions one half", "fractions one third"],
+            ids=["c1", "c2"],
+            metadatas=[{"grade": "S1"}, {"grade": "S2"}],
+        )
+
+        assert [
+            r["id"] for r in index.search("fractions", filters={"grade": "S2"})
+        ] == ["c2"]
+        index.delete(["c2"])
+        assert [r["id"] for r in index.search("fractions")] == ["c1"]
+        assert len(index) == 1
+
+    def test_wand_matches_exhaustive_scoring(self):
+        rng = random.Random(0)
+        words = [f"w{i}" for i in range(40)]
+        texts = [" ".join(rng.choices(words, k=rng.randint(3, 30))) for _ in range(300)]
+        index = BM25Index(merge_factor=2)
+        for start in range(0, len(texts), 50):
+            batch = range(start, start + 50)
+            index.add([texts[i] for i in batch], ids=[f"d{i}" for i in batch])
+
+        query = "w1 w2 w3 w30"
+        counts = [Counter(tokenize(text)) for text in texts]
+        avg_length = sum(sum(c.values()) for c in counts) / len(counts)
+        expected = {}
+        for i, c in enumerate(counts):
+            score = 0.0
+            for term in tokenize(query):
+                df = sum(term in other for other in counts)
+                idf = math.log(1 + (len(counts) - df + 0.5) / (df + 0.5))
+                norm = index.k1 * (1 - index.b + index.b * sum(c.values()) / avg_length)
+                score += idf * c[term] * (index.k1 + 1) / (c[term] + norm)
+            expected[f"d{i}"] = score
+
+        results = index.search(query, top_k=10)
+        best = sorted(expected.values(), reverse=True)[:10]
+
+        assert index.segment_count < 6
+        assert [r["score"] for r in results] == pytest.approx(best)
+        assert all(expected[r["id"]] == pytest.approx(r["score"]) for r in results)
+
+    def test_upsert_and_compact_drop_tombstones(self):
+        index = BM25Index()
+        index.add(["old text about rivers", "lakes"], ids=["c1", "c2"])
+        index.add(["new text about mountains"], ids=["c1"])
+
+        assert index.search("rivers") == []
+        index.compact()
+        assert index.segment_count == 1
+        assert [r["id"] for r in index.search("mountains")] == ["c1"]
+        assert len(index) == 2
+
+    def test_save_and_open_mapped(self, tmp_path):
+        index = BM25Index()
+        index.add(
+            ["Ikinyarwanda ubuzima", "fractions"],
+            ids=["c1", "c2"],
+            metadatas=[{"grade": "P4"}, {"grade": "S1"}],
+        )
+        index.save(tmp_path)
+
+        opened = BM25Index.open(tmp_path)
+
+        assert opened.search("ubuzima", filters={"grade": "P4"})[0]["id"] == "c1"
+        assert opened.search("ubuzima", filters={"grade": "S1"}) == []
+        with pytest.raises(RuntimeError):
+            opened.delete(["c1"])
+
+    def test_refresh_swaps_in_published_snapshot(self, tmp_path):
+        index = BM25Index()
+        index.add(["rivers"], ids=["c1"])
+        index.save(tmp_path)
+        opened = BM25Index.open(tmp_path)
+        assert not opened.refresh()
+
+        index.add(["mountains"], ids=["c2"])
+        index.save(tmp_path)
+
+        assert opened.refresh()
+        assert [r["id"] for r in opened.search("mountains")] == ["c2"]
+
+
+class TestPostings:
+    """Test cases for compressed posting lists."""
+
+    def test_varint_round_trip(self):
+        values = np.array([0, 1, 127, 128, 300, 2**40, 5], dtype=np.uint64)
+        encoded = encode_varints(values)
+
+        assert len(encoded) < values.nbytes
+        assert decode_varints(encoded).tolist() == values.tolist()
+
+    def test_postings_round_trip(self):
+        docs, tfs = decode_postings(encode_postings([3, 7, 1000, 1001], [1, 2, 3, 400]))
+
+        assert docs.tolist() == [3, 7, 1000, 1001]
+        assert tfs.tolist() == [1, 2, 3, 400]
+
+
+class TestReciprocalRankFusion:
+    """Test cases for RRF."""
+
+    def test_documents_found_by_both_sources_win(self):
+        fused = reciprocal_rank_fusion(
+            {
+                "vector": [{"id": "a"}, {"id": "b"}],
+                "lexical": [{"id": "b"}, {"id": "c"}],
+            }
+        )
+
+        assert [r["id"] for r in fused] == ["b", "a", "c"]
+        assert fused[0]["ranks"] == {"vector": 2, "lexical": 1}
+        assert 0 < fused[0]["score"] <= 1
+
+
+class SlowScorer(OverlapScorer):
+    """Overlap scorer that sleeps per batch to exhaust the budget."""
+
+    def score(self, query: str, texts: list[str]) -> list[float]:
+        time.sleep(0.05)
+        return super().score(query, texts)
+
+
+class TestReranker:
+    """Test cases for the rerank stage."""
+
+    @pytest.mark.asyncio
+    async def test_orders_by_coverage_and_proximity(self):
+        documents = [
+            {"id": "a", "content": "water cycle"},
+            {"id": "b", "content": "evaporation then rain, later the water cycle"},
+            {"id": "c", "content": "the water cycle includes evaporation"},
+        ]
+
+        result = await Reranker().rerank("water cycle evaporation", documents)
+
+        assert [doc["id"] for doc in result.documents] == ["c", "b", "a"]
+        assert result.complete
+        assert result.elapsed_ms >= 0
+
+    @pytest.mark.asyncio
+    async def test_stops_at_budget_keeping_retrieval_order(self):
+        documents = [{"id": str(i), "content": f"doc {i}"} for i in range(6)]
+        reranker = Reranker(SlowScorer(), batch_size=2, budget_ms=75)
+
+        result = await reranker.rerank("doc 5", documents)
+
+        assert 0 < result.scored < len(documents)
+        assert not result.complete
+        assert [doc["id"] for doc in result.documents[result.scored :]] == [
+            doc["id"] for doc in documents[result.scored :]
+        ]
+        assert "rerank_score" in result.documents[0]
+
+    @pytest.mark.asyncio
+    async def test_scores_on_private_pool(self):
+        threads = []
+
+        class RecordingScorer(SlowScorer):
+            def score(self, query, texts):
+                threads.append(threading.current_thread().name)
+                return super().score(query, texts)
+
+        reranker = Reranker(RecordingScorer(), batch_size=1, budget_ms=10)
+        await reranker.rerank("doc", [{"id": "1", "content": "doc"}] * 3)
+        reranker.close()
+
+        assert threads and all(name.startswith("rerank") for name in threads)
+        with pytest.raises(RuntimeError):
+            await reranker.rerank("doc", [{"id": "1", "content": "doc"}])
+
+    @pytest.mark.asyncio
+    async def test_app_pipeline_reranks(self, monkeypatch):
+        monkeypatch.setattr(settings, "rerank_backend", "overlap")
+        documents = [
+            {"id": "a", "content": "water cycle"},
+            {"id": "c", "content": "the water cycle includes evaporation"},
+        ]
+
+        class FixedRetriever:
+            llm = None
+
+            async def retrieve(self, query, **kwargs):
+                return [dict(doc) for doc in documents]
+
+        with TestClient(create_app()) as client:
+            pipeline = get_rag_pipeline(SimpleNamespace(app=client.app))
+            pipeline.retriever = FixedRetriever()
+
+            prepared = await pipeline.prepare("water cycle evaporation")
+
+        assert isinstance(pipeline.reranker, Reranker)
+        assert [doc["id"] for doc in prepared] == ["c", "a"]
+
+
+class TestMMR:
+    """Test cases for MMR diversification."""
+
+    def test_skips_near_duplicates(self):
+        embeddings = [[1.0, 0.0], [0.99, 0.01], [0.0, 1.0]]
+
+        assert mmr_select([1.0, 0.9, 0.7], embeddings, top_k=2) == [0, 2]
+        assert mmr_select([1.0, 0.9, 0.7], embeddings, 2, lambda_mult=1.0) == [0, 1]
+
+    @pytest.mark.asyncio
+    async def test_pipeline_diversifies_with_stored_embeddings(self):
+        texts = [
+            "Photosynthesis converts light",
+            "Photosynthesis converts light into sugar",
+            "A fraction is part of a whole",
+        ]
+        embedder = KeywordEmbedder()
+        store = HNSWStore(dim=4, seed=0)
+        await store.add(texts, await embedder.embed(texts), ids=["c1", "c2", "c3"])
+        pipeline = RAGPipeline(Retriever(store=store, llm=embedder), context_top_k=2)
+
+        documents = await store.search(
+            (await embedder.embed(["photosynthesis"]))[0], top_k=3
+        )
+        selected = await pipeline.diversify(documents)
+
+        assert len(await store.get_embeddings(["c1", "missing"])) == 1
+        assert {doc["id"] for doc in selected} & {"c1", "c2"} != {"c1", "c2"}
+        assert "c3" in {doc["id"] for doc in selected}
+
+
+class TestContextPacker:
+    """Test cases for token-budgeted context packing."""
+
+    def test_merges_adjacent_chunks_dropping_overlap(self):
+        documents = [
+            {
+                "id": "b",
+                "content": "the Nile flows north to the sea",
+                "metadata": {"doc_id": "d1", "chunk_index": 1, "page_start": 2},
+            },
+            {"id": "x", "content": "unrelated", "metadata": {"doc_id": "d2"}},
+            {
+                "id": "a",
+                "content": "Rivers of Africa: the Nile flows",
+                "metadata": {"doc_id": "d1", "chunk_index": 0, "page_start": 1},
+            },
+        ]
+
+        merged = merge_adjacent(documents)
+
+        assert [doc["id"] for doc in merged] == ["b", "x"]
+        assert merged[0]["content"] == (
+            "Rivers of Africa: the Nile flows north to the sea"
+        )
+        assert merged[0]["merged_ids"] == ["a", "b"]
+
+    def test_fits_budget_and_trims_last_chunk(self):
+        documents = [
+            {"id": str(i), "content": " ".join(f"word{i}" for _ in range(40))}
+            for i in range(5)
+        ]
+        packer = ContextPacker(budget_tokens=150, min_trim_tokens=10)
+
+        packed = packer.pack(documents)
+
+        assert sum(doc["tokens"] for doc in packed) <= 150
+        assert len(packed) < len(documents)
+        assert count_tokens(packed[-1]["content"]) < count_tokens(
+            documents[len(packed) - 1]["content"]
+        )
+
+    def test_app_pipeline_uses_model_budget(self, monkeypatch):
+        monkeypatch.setattr(settings, "llm_backend", "openai")
+        monkeypatch.setattr(settings, "openai_model", "gpt-4o-mini")
+        request = SimpleNamespace(
+            app=SimpleNamespace(
+                state=SimpleNamespace(
+                    llm=None, vector_store=None, lexical_index=None, reranker=None
+                )
+            )
+        )
+
+        assert context_budget(settings) == 12000
+        assert get_rag_pipeline(request).packer.budget_tokens == 12000
+        monkeypatch.setattr(settings, "rag_context_tokens", 1500)
+        assert get_rag_pipeline(request).packer.budget_tokens == 1500
+
+
+class TestHybridRetriever:
+    """Test cases for the hybrid retriever."""
+
+    @pytest.mark.asyncio
+    async def test_fuses_vector_and_lexical_results(self):
+        texts = [
+            "Photosynthesis converts light",
+            "A fraction is part of a whole",
+            "Kigali volcano trip",
+        ]
+        embedder = KeywordEmbedder()
+        store = HNSWStore(dim=4, seed=0)
+        await store.add(texts, await embedder.embed(texts), ids=["c1", "c2", "c3"])
+        lexical = BM25Index()
+        lexical.add(texts, ids=["c1", "c2", "c3"])
+        retriever = Retriever(store=store, llm=embedder, lexical=lexical)
+
+        results = await retriever.retrieve("what is a fraction", top_k=2)
+        batched = await retriever.retrieve_many(["fraction", "volcano"], top_k=1)
+
+        assert results[0]["id"] == "c2"
+        assert set(results[0]["ranks"]) == {"vector", "lexical"}
+        assert [hits[0]["id"] for hits in batched] == ["c2", "c3"]
+
+    def test_app_pipeline_uses_published_lexical_index(self, tmp_path, monkeypatch):
+        lexical = BM25Index()
+        lexical.add(["A fraction is part of a whole"], ids=["c1"])
+        lexical.save(tmp_path)
+        monkeypatch.setattr(settings, "lexical_index_path", str(tmp_path))
+
+        with TestClient(create_app()) as client:
+            pipeline = get_rag_pipeline(SimpleNamespace(app=client.app))
+
+        assert pipeline.retriever.lexical is not None
+        assert pipeline.retriever.lexical.search("fraction")[0]["id"] == "c1"
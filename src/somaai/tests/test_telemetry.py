@@ -0,0 +1,153 @@
+"""Tests for metrics and LLM call telemetry."""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from somaai.exceptions import RateLimitError
+from somaai.health import health_router
+from somaai.modules.telemetry.metrics import Histogram, MetricsCollector, metrics
+from somaai.providers.coalescing import CoalescingLLMClient
+from somaai.providers.instrumented import InstrumentedLLMClient
+from somaai.utils.tokens import count_tokens
+
+
+class FakeLLM:
+    """Fixed answers; fails on request."""
+
+    name = "OpenAI"
+    model = "gpt-4o-mini"
+    embedding_model = "text-embedding-3-small"
+
+    async def generate(self, prompt: str) -> str:
+        if prompt == "fail":
+            raise RateLimitError("slow down")
+        return "four words of answer"
+
+    async def generate_stream(self, prompt: str):
+        for token in ("one", " two", " three"):
+            yield token
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        return [[0.0] for _ in texts]
+
+
+def series(snapshot: dict, kind: str, name: str, **labels) -> dict:
+    for entry in snapshot[kind][name]:
+        if all(entry["labels"].get(k) == v for k, v in labels.items()):
+            return entry
+    raise KeyError(name)
+
+
+class TestHistogram:
+    """Test cases for the fixed-bucket histogram."""
+
+    def test_percentiles_within_bucket_resolution(self):
+        histogram = Histogram()
+        for value in range(1, 1001):
+            histogram.observe(value / 1000)
+
+        assert histogram.count == 1000
+        assert histogram.percentile(50) == pytest.approx(0.5, rel=0.2)
+        assert histogram.percentile(99) == pytest.approx(0.99, rel=0.1)
+        assert histogram.percentile(100) == 1.0
+
+    def test_empty_snapshot(self):
+        assert Histogram().snapshot()["p99"] == 0.0
+
+
+class TestMetricsCollector:
+    """Test cases for labelled counters, histograms and gauges."""
+
+    def test_labels_are_separate_series(self):
+        collector = MetricsCollector()
+        collector.record("latency", 1.0, backend="groq")
+        collector.record("latency", 3.0, backend="openai")
+        collector.increment("calls", backend="groq")
+        collector.increment("calls", backend="groq")
+        collector.register_gauge("limiter", lambda: {"limit": 8})
+
+        snapshot = collector.get_metrics()
+
+        assert series(snapshot, "histograms", "latency", backend="openai")["sum"] == 3
+        assert series(snapshot, "counters", "calls", backend="groq")["value"] == 2
+        assert snapshot["gauges"] == {"limiter": {"limit": 8}}
+
+
+class TestInstrumentedLLMClient:
+    """Test cases for per-call token, cost and latency telemetry."""
+
+    @pytest.mark.asyncio
+    async def test_records_tokens_latency_and_cost(self):
+        collector = MetricsCollector()
+        client = InstrumentedLLMClient(FakeLLM(), collector=collector)
+
+        await client.generate("what is rain")
+        tokens = [token async for token in client.generate_stream("q")]
+        await client.embed(["a", "b"])
+        snapshot = collector.get_metrics()
+
+        assert tokens == ["one", " two", " three"]
+        generate = {"backend": "openai", "endpoint": "generate"}
+        assert series(snapshot, "histograms", "llm_prompt_tokens", **generate)[
+            "sum"
+        ] == count_tokens("what is rain")
+        assert series(snapshot, "histograms", "llm_completion_tokens", **generate)[
+            "sum"
+        ] == count_tokens("four words of answer")
+        assert (
+            series(snapshot, "histograms", "llm_ttft_seconds", endpoint="stream")[
+                "count"
+            ]
+            == 1
+        )
+        embed = series(snapshot, "counters", "llm_calls", endpoint="embed")
+        assert embed["labels"]["model"] == "text-embedding-3-small"
+        assert series(snapshot, "counters", "llm_cost_usd", **generate)["value"] > 0
+        for endpoint in ("generate", "stream", "embed"):
+            miss = series(snapshot, "counters", "llm_cache", endpoint=endpoint)
+            assert miss["labels"] == {
+                "backend": "openai",
+                "endpoint": endpoint,
+                "result": "miss",
+            }
+
+    @pytest.mark.asyncio
+    async def test_coalesced_calls_count_as_cache_hits(self):
+        collector = MetricsCollector()
+        client = CoalescingLLMClient(
+            InstrumentedLLMClient(FakeLLM(), collector=collector), collector
+        )
+
+        await asyncio.gather(*(client.generate("q") for _ in range(3)))
+        snapshot = collector.get_metrics()
+
+        assert series(snapshot, "counters", "llm_cache", result="miss")["value"] == 1
+        hit = series(snapshot, "counters", "llm_cache", result="hit")
+        assert hit["value"] == 2
+        assert hit["labels"]["endpoint"] == "generate"
+        assert hit["labels"]["cache"] == "coalescing"
+
+    @pytest.mark.asyncio
+    async def test_counts_errors_by_type(self):
+        collector = MetricsCollector()
+        client = InstrumentedLLMClient(FakeLLM(), collector=collector)
+
+        with pytest.raises(RateLimitError):
+            await client.generate("fail")
+
+        errors = series(collector.get_metrics(), "counters", "llm_errors")
+        assert errors["labels"]["error"] == "RateLimitError"
+        assert "llm_calls" not in collector.get_metrics()["counters"]
+
+    def test_metrics_endpoint(self):
+        metrics.increment("test_endpoint_calls")
+        app = FastAPI()
+        app.include_router(health_router)
+
+        with TestClient(app) as client:
+            body = client.get("/metrics").json()
+
+        assert series(body, "counters", "test_endpoint_calls")["value"] >= 1
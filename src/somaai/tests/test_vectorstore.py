@@ -0,0 +1,316 @@
+"""Tests for the in-process HNSW vector store."""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from somaai.modules.knowledge.hnsw import HNSWIndex
+from somaai.modules.knowledge.quantization import ProductQuantizer, ScalarQuantizer
+from somaai.modules.knowledge.stores.hnsw import HNSWStore
+from somaai.modules.knowledge.vectorstore import get_vector_store
+from somaai.settings import settings
+
+
+def _random_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class TestHNSWIndex:
+    """Test cases for the HNSW graph."""
+
+    def test_recall_against_brute_force(self):
+        """Top-10 results should mostly match exact search."""
+        vectors = _random_vectors(500, 16)
+        queries = _random_vectors(20, 16, seed=1)
+        index = HNSWIndex(dim=16, m=8, ef_construction=64, ef_search=64, seed=0)
+        for vec in vectors:
+            index.add(vec)
+
+        hits = 0
+        for q in queries:
+            exact = set(np.argsort(-(vectors @ q))[:10].tolist())
+            labels, _ = index.search(q, 10)
+            hits += len(exact & set(labels.tolist()))
+
+        assert hits / (10 * len(queries)) >= 0.9
+
+    def test_deleted_labels_are_not_returned(self):
+        """Tombstoned vectors are skipped in results."""
+        vectors = _random_vectors(200, 16)
+        index = HNSWIndex(dim=16, seed=0)
+        for vec in vectors:
+            index.add(vec)
+
+        labels, _ = index.search(vectors[5], 1)
+        assert labels[0] == 5
+
+        index.mark_deleted(5)
+        labels, _ = index.search(vectors[5], 10)
+        assert 5 not in labels.tolist()
+        assert len(index) == 199
+
+    def test_rejects_wrong_dimension(self):
+        """Vectors must match the index dimension."""
+        index = HNSWIndex(dim=8)
+        with pytest.raises(ValueError):
+            index.add([1.0, 2.0])
+
+
+class TestQuantization:
+    """Test cases for int8 and PQ vector storage."""
+
+    def test_int8_round_trip_is_close(self):
+        """Int8 codes reconstruct vectors within quantization error."""
+        vectors = _random_vectors(100, 32)
+        quantizer = ScalarQuantizer(32).fit(vectors)
+
+        codes = quantizer.encode(vectors)
+
+        assert codes.dtype == np.int8
+        assert np.abs(quantizer.decode(codes) - vectors).max() < 0.01
+
+    def test_pq_requires_training(self):
+        """PQ cannot encode before its codebooks are fitted."""
+        quantizer = ProductQuantizer(32, n_subvectors=8)
+        with pytest.raises(ValueError):
+            quantizer.encode(_random_vectors(1, 32))
+
+    def test_pq_similarities_approximate_inner_products(self):
+        """ADC scores track exact inner products."""
+        vectors = _random_vectors(600, 32)
+        quantizer = ProductQuantizer(32, n_subvectors=8).fit(vectors)
+        codes = quantizer.encode(vectors)
+        query = vectors[0]
+
+        approx = quantizer.similarities(quantizer.prepare(query), codes)
+        exact = vectors @ query
+
+        assert codes.shape == (600, 8)
+        assert np.corrcoef(approx, exact)[0, 1] > 0.8
+
+    @pytest.mark.parametrize("quantization", ["int8", "pq"])
+    @pytest.mark.asyncio
+    async def test_quantized_store_rescores_exactly(self, quantization):
+        """Quantized stores return exact float scores after re-scoring."""
+        vectors = _random_vectors(300, 16)
+        store = HNSWStore(dim=16, seed=0, quantization=quantization, pq_subvectors=4)
+        store.train_quantizer(vectors.tolist())
+        await store.add(
+            [str(i) for i in range(300)],
+            vectors.tolist(),
+            ids=[f"c{i}" for i in range(300)],
+        )
+
+        results = await store.search(vectors[7].tolist(), top_k=3)
+
+        assert results[0]["id"] == "c7"
+        assert results[0]["score"] == pytest.approx(1.0, abs=1e-5)
+        assert store.memory_usage()["codes"] > 0
+
+
+class TestHNSWStore:
+    """Test cases for HNSWStore."""
+
+    @pytest.mark.asyncio
+    async def test_search_returns_content_and_metadata(self):
+        """Results carry id, content, score and metadata."""
+        vectors = _random_vectors(3, 8)
+        store = HNSWStore(dim=8, seed=0)
+        await store.add(
+            ["a", "b", "c"],
+            vectors.tolist(),
+            ids=["c1", "c2", "c3"],
+            metadatas=[{"doc_id": "d1"}, {"doc_id": "d1"}, {"doc_id": "d2"}],
+        )
+
+        results = await store.search(vectors[2].tolist(), top_k=1)
+
+        assert results[0]["id"] == "c3"
+        assert results[0]["content"] == "c"
+        assert results[0]["metadata"] == {"doc_id": "d2"}
+        assert results[0]["score"] == pytest.approx(1.0, abs=1e-5)
+
+    @pytest.mark.asyncio
+    async def test_add_same_id_replaces_document(self):
+        """Re-adding an ID upserts instead of duplicating."""
+        vectors = _random_vectors(2, 8)
+        store = HNSWStore(dim=8, seed=0)
+        await store.add(["old"], [vectors[0].tolist()], ids=["c1"])
+        await store.add(["new"], [vectors[1].tolist()], ids=["c1"])
+
+        results = await store.search(vectors[1].tolist(), top_k=5)
+
+        assert len(store) == 1
+        assert [r["content"] for r in results] == ["new"]
+
+    @pytest.mark.asyncio
+    async def test_graph_work_does_not_block_event_loop(self):
+        """Inserts and searches run off the event loop thread."""
+        vectors = _random_vectors(400, 32)
+        store = HNSWStore(dim=32, seed=0)
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.001)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        await store.add([str(i) for i in range(400)], vectors.tolist())
+        results = await store.search(vectors[7].tolist(), top_k=1)
+        ticker.cancel()
+
+        assert results[0]["content"] == "7"
+        assert ticks > 5
+
+    @pytest.mark.asyncio
+    async def test_delete(self):
+        """Deleted documents disappear from search."""
+        vectors = _random_vectors(2, 8)
+        store = HNSWStore(dim=8, seed=0)
+        await store.add(["a", "b"], vectors.tolist(), ids=["c1", "c2"])
+
+        await store.delete(["c1"])
+        results = await store.search(vectors[0].tolist(), top_k=5)
+
+        assert [r["id"] for r in results] == ["c2"]
+
+    @pytest.mark.asyncio
+    async def test_filtered_search_only_scans_matching_partition(self):
+        """Filters restrict results to the requested grade/subject."""
+        vectors = _random_vectors(4, 8)
+        store = HNSWStore(dim=8, seed=0)
+        await store.add(
+            ["s3 maths", "s3 science", "s1 maths", "s1 science"],
+            vectors.tolist(),
+            ids=["c1", "c2", "c3", "c4"],
+            metadatas=[
+                {"grade": "S3", "subject": "mathematics"},
+                {"grade": "S3", "subject": "science"},
+                {"grade": "S1", "subject": "mathematics"},
+                {"grade": "S1", "subject": "science"},
+            ],
+        )
+
+        # Query is closest to c4, but the filter only allows S3 mathematics.
+        exact = await store.search(
+            vectors[3].tolist(),
+            top_k=5,
+            filters={"grade": "S3", "subject": "mathematics"},
+        )
+        by_grade = await store.search(
+            vectors[3].tolist(), top_k=5, filters={"grade": "S1"}
+        )
+
+        assert [r["id"] for r in exact] == ["c1"]
+        assert {r["id"] for r in by_grade} == {"c3", "c4"}
+        assert by_grade[0]["id"] == "c4"
+        assert len(store.partitions) == 4
+
+    @pytest.mark.asyncio
+    async def test_search_rejects_unknown_filter(self):
+        """Only partition keys can be used as filters."""
+        store = HNSWStore(dim=8)
+        with pytest.raises(ValueError):
+            await store.search([1.0] * 8, filters={"doc_id": "d1"})
+
+
+class TestSegments:
+    """Test cases for publishing and mapping index segments."""
+
+    @pytest.mark.asyncio
+    async def test_save_and_open_read_only(self, tmp_path):
+        """A published segment opens memory-mapped with identical results."""
+        vectors = _random_vectors(50, 8)
+        store = HNSWStore(dim=8, seed=0, quantization="int8")
+        await store.add(
+            [f"text {i}" for i in range(50)],
+            vectors.tolist(),
+            ids=[f"c{i}" for i in range(50)],
+            metadatas=[{"grade": "S1", "subject": "science"}] * 50,
+        )
+        await store.delete(["c3"])
+
+        store.save(tmp_path)
+        opened = HNSWStore.open(tmp_path)
+
+        expected = await store.search(vectors[10].tolist(), top_k=5)
+        results = await opened.search(vectors[10].tolist(), top_k=5)
+        assert [r["id"] for r in results] == [r["id"] for r in expected]
+        assert results[0]["content"] == "text 10"
+        assert len(opened) == 49
+        assert isinstance(opened._shards[("S1", "science")].index._codes, np.memmap)
+        with pytest.raises(RuntimeError):
+            await opened.add(["x"], [vectors[0].tolist()])
+
+    @pytest.mark.asyncio
+    async def test_refresh_swaps_in_new_segment(self, tmp_path):
+        """Readers pick up a newly published segment on refresh."""
+        vectors = _random_vectors(2, 8)
+        writer = HNSWStore(dim=8, seed=0)
+        await writer.add(["a"], [vectors[0].tolist()], ids=["c1"])
+        writer.save(tmp_path)
+        reader = HNSWStore.open(tmp_path)
+
+        writable = HNSWStore.open(tmp_path, writable=True)
+        await writable.add(["b"], [vectors[1].tolist()], ids=["c2"])
+        writable.save(tmp_path)
+
+        assert reader.refresh() is True
+        assert reader.refresh() is False
+        results = await reader.search(vectors[1].tolist(), top_k=1)
+        assert results[0]["id"] == "c2"
+
+    @pytest.mark.asyncio
+    async def test_published_store_uses_configured_search_settings(
+        self, tmp_path, monkeypatch
+    ):
+        """Query-time settings apply to a published index, across refreshes."""
+        vectors = _random_vectors(2, 8)
+        writer = HNSWStore(dim=8, seed=0)
+        await writer.add(["a"], [vectors[0].tolist()], ids=["c1"])
+        writer.save(tmp_path)
+        monkeypatch.setattr(settings, "vector_backend", "hnsw")
+        monkeypatch.setattr(settings, "vector_index_path", str(tmp_path))
+        monkeypatch.setattr(settings, "hnsw_ef_search", 200)
+        monkeypatch.setattr(settings, "vector_exact_batch_threshold", 7)
+
+        store = get_vector_store(settings)
+        await writer.add(["b"], [vectors[1].tolist()], ids=["c2"])
+        writer.save(tmp_path)
+        assert store.refresh()
+
+        assert store.exact_batch_threshold == 7
+        assert all(shard.index.ef_search == 200 for shard in store._shards.values())
+
+
+class TestBatchSearch:
+    """Test cases for batched multi-query search."""
+
+    @pytest.mark.parametrize("threshold", [0, 50_000])
+    @pytest.mark.asyncio
+    async def test_search_batch_matches_single_search(self, threshold):
+        """Batched results match one-at-a-time search (exact and graph)."""
+        vectors = _random_vectors(200, 16)
+        store = HNSWStore(dim=16, seed=0, exact_batch_threshold=threshold)
+        await store.add(
+            [str(i) for i in range(200)],
+            vectors.tolist(),
+            ids=[f"c{i}" for i in range(200)],
+        )
+        await store.delete(["c4"])
+        queries = vectors[[3, 4, 5]].tolist()
+
+        batched = await store.search_batch(queries, top_k=3)
+
+        assert len(batched) == 3
+        assert batched[0][0]["id"] == "c3"
+        assert "c4" not in [r["id"] for r in batched[1]]
+        assert batched[2][0]["score"] == pytest.approx(1.0, abs=1e-5)
+        for query, results in zip(queries, batched):
+            single = await store.search(query, top_k=3)
+            assert results[0]["id"] == single[0]["id"]
@@ -0,0 +1,57 @@
+"""Token counting utilities.
+
+Uses ``tiktoken`` when it is installed. Otherwise tokens are estimated
+from word pieces, which tracks BPE counts closely enough for budgeting
+prompts (it slightly over-counts, so budgets stay safe).
+"""
+
+import re
+from functools import lru_cache
+
+try:
+    import tiktoken
+
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+DEFAULT_ENCODING = "cl100k_base"
+
+# Words, numbers and single punctuation marks; long words count as one
+# token per four characters, roughly what BPE vocabularies do.
+_PIECE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+@lru_cache(maxsize=8)
+def _encoding(name: str):
+    return tiktoken.get_encoding(name)
+
+
+@lru_cache(maxsize=16384)
+def count_tokens(text: str, encoding: str = DEFAULT_ENCODING) -> int:
+    """Count tokens in text (cached per distinct text)."""
+    if TIKTOKEN_AVAILABLE:
+        return len(_encoding(encoding).encode(text, disallowed_special=()))
+    return sum(
+        max(1, -(-len(piece) // 4)) if piece[0].isalnum() else 1
+        for piece in _PIECE.findall(text)
+    )
+
+
+def truncate_tokens(
+    text: str, max_tokens: int, encoding: str = DEFAULT_ENCODING
+) -> str:
+    """Cut text to at most max_tokens tokens."""
+    if max_tokens <= 0:
+        return ""
+    if TIKTOKEN_AVAILABLE:
+        enc = _encoding(encoding)
+        return enc.decode(enc.encode(text, disallowed_special=())[:max_tokens])
+
+    used = 0
+    for match in _PIECE.finditer(text):
+        piece = match.group()
+        used += max(1, -(-len(piece) // 4)) if piece[0].isalnum() else 1
+        if used > max_tokens:
+            return text[: match.start()].rstrip()
+    return text